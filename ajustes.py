@@ -0,0 +1,69 @@
+"""
+AJUSTES DEL SISTEMA
+
+Opciones de funcionamiento que no forman parte de la configuración del
+consultorio. Se leen de data/ajustes.json y cada una puede sobrescribirse con
+una variable de entorno TURNOS_<CLAVE>, lo que permite comparar variantes sin
+tocar archivos.
+
+- almacenamiento: "json" (por defecto) o "sqlite"
+- libres_virtuales: "no" (por defecto) o "si"; con "si" los meses nuevos del
+  almacén JSON guardan solo las reservas y los turnos libres se calculan
+- traza: "no" (por defecto) o "si"; con "si" se registran tiempos y lecturas
+  y escrituras de cada operación en data/traza.jsonl (ver traza.py)
+"""
+
+import json
+import os
+
+RUTA_AJUSTES = os.path.join("data", "ajustes.json")
+
+POR_DEFECTO = {
+    "almacenamiento": "json",
+    "libres_virtuales": "no",
+    "traza": "no",
+}
+
+_cache = {"firma": None, "ajustes": {}}
+
+
+def _leer_archivo():
+    """Lee data/ajustes.json solo si cambió desde la última lectura"""
+    try:
+        estado = os.stat(RUTA_AJUSTES)
+        firma = (os.path.abspath(RUTA_AJUSTES), estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        return {}
+    if firma != _cache["firma"]:
+        try:
+            with open(RUTA_AJUSTES, "r", encoding="utf-8") as f:
+                _cache["ajustes"] = json.load(f)
+        except (OSError, ValueError):
+            _cache["ajustes"] = {}
+        _cache["firma"] = firma
+    return _cache["ajustes"]
+
+
+def obtener_ajuste(clave):
+    """Devuelve el valor de un ajuste (entorno > archivo > por defecto)"""
+    variable = f"TURNOS_{clave.upper()}"
+    if variable in os.environ:
+        return os.environ[variable]
+    return _leer_archivo().get(clave, POR_DEFECTO.get(clave))
+
+
+def usa_sqlite():
+    """Indica si el almacenamiento elegido es la base SQLite"""
+    return str(obtener_ajuste("almacenamiento")).strip().lower() == "sqlite"
+
+
+def usa_libres_virtuales():
+    """Indica si los meses nuevos se abren sin materializar los turnos libres"""
+    valor = str(obtener_ajuste("libres_virtuales")).strip().lower()
+    return valor in ("si", "sí", "s", "1", "true")
+
+
+def usa_traza():
+    """Indica si se registran las operaciones en la traza"""
+    valor = str(obtener_ajuste("traza")).strip().lower()
+    return valor in ("si", "sí", "s", "1", "true")
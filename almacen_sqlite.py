@@ -0,0 +1,620 @@
+"""
+ALMACENAMIENTO EN SQLITE
+
+Alternativa a los archivos JSON de data/: guarda pacientes, turnos y
+configuración en data/consultorio.db. Se activa con el ajuste
+almacenamiento = "sqlite" (ver ajustes.py).
+
+AlmacenTurnosSQLite ofrece los mismos métodos que AlmacenTurnos, de modo que
+los módulos de menús no cambian; las consultas se resuelven con índices sobre
+(fecha, horario), dni_paciente y estado en lugar de leer todo el archivo.
+El resumen de turnos de un paciente sale del índice por (dni_paciente, fecha,
+horario) y de la tabla cancelaciones_pacientes, que liberar() mantiene.
+
+Para importar por única vez los JSON existentes:
+    python almacen_sqlite.py
+"""
+
+import json
+import os
+import sqlite3
+
+from almacen_turnos import (
+    INEXISTENTE,
+    OCUPADO,
+    OK,
+    DIRECTORIO_DATOS,
+    AlmacenTurnos,
+    marca_tiempo,
+    momento_actual,
+    turnos_libres,
+)
+from grilla_turnos import GrillaMes
+from traza import operacion
+
+RUTA_BASE = os.path.join("data", "consultorio.db")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    dni TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    telefono TEXT NOT NULL,
+    email TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS turnos (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    horario TEXT NOT NULL,
+    dni_paciente TEXT NOT NULL DEFAULT '',
+    estado TEXT NOT NULL DEFAULT 'libre',
+    version INTEGER NOT NULL DEFAULT 0,
+    asignado_en TEXT NOT NULL DEFAULT '',
+    cancelaciones INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_turnos_fecha_horario ON turnos (fecha, horario);
+CREATE INDEX IF NOT EXISTS idx_turnos_dni ON turnos (dni_paciente, fecha, horario);
+CREATE INDEX IF NOT EXISTS idx_turnos_estado ON turnos (estado, fecha);
+CREATE TABLE IF NOT EXISTS cancelaciones_pacientes (
+    dni TEXT PRIMARY KEY,
+    cantidad INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS configuracion (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+LIBRE = "libre"
+ASIGNADO = "asignado"
+
+_conexiones = {}
+
+
+def conectar():
+    """Devuelve la conexión compartida a la base del directorio actual"""
+    ruta = os.path.abspath(RUTA_BASE)
+    conexion = _conexiones.get(ruta)
+    if conexion is None:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        conexion = sqlite3.connect(ruta)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(ESQUEMA)
+        _actualizar_esquema(conexion)
+        _conexiones[ruta] = conexion
+    return conexion
+
+
+def _actualizar_esquema(conexion):
+    """Agrega a una base existente las columnas incorporadas después"""
+    columnas = {fila[1] for fila in conexion.execute("PRAGMA table_info(turnos)")}
+    nuevas = (
+        ("version", "INTEGER NOT NULL DEFAULT 0"),
+        ("asignado_en", "TEXT NOT NULL DEFAULT ''"),
+        ("cancelaciones", "INTEGER NOT NULL DEFAULT 0"),
+    )
+    for columna, definicion in nuevas:
+        if columna not in columnas:
+            with conexion:
+                conexion.execute(
+                    f"ALTER TABLE turnos ADD COLUMN {columna} {definicion}"
+                )
+    # El nombre del paciente ya no se copia en los turnos
+    if "paciente_nombre" in columnas:
+        try:
+            with conexion:
+                conexion.execute("ALTER TABLE turnos DROP COLUMN paciente_nombre")
+        except sqlite3.OperationalError:
+            # SQLite anterior a 3.35: la columna queda sin usar
+            pass
+
+
+#### CONVERSIÓN DE FECHAS ####
+# En la base la fecha se guarda como 'aaaa-mm-dd' para que el orden y los
+# rangos funcionen con el índice; hacia afuera se mantiene 'dd/mm/aaaa'.
+
+
+def a_iso(fecha):
+    return f"{fecha[6:]}-{fecha[3:5]}-{fecha[:2]}"
+
+
+def desde_iso(fecha):
+    return f"{fecha[8:]}/{fecha[5:7]}/{fecha[:4]}"
+
+
+def _limites_mes(mes, anio):
+    return f"{anio:04d}-{mes:02d}-01", f"{anio:04d}-{mes:02d}-31"
+
+
+def _fila_a_turno(fila):
+    id_turno, fecha, horario, dni, version, asignado_en, cancelaciones = fila
+    turno = {
+        "dni_paciente": dni,
+        "fecha": desde_iso(fecha),
+        "horario": horario,
+        "version": version,
+    }
+    # Igual que en el almacén JSON, solo aparecen si tienen valor
+    if asignado_en:
+        turno["asignado_en"] = asignado_en
+    if cancelaciones:
+        turno["cancelaciones"] = cancelaciones
+    return str(id_turno), turno
+
+
+def _fila_a_reserva(fila):
+    """{"id", "fecha", "horario"} de una fila (id, fecha, horario), o None"""
+    if fila is None:
+        return None
+    id_turno, fecha, horario = fila
+    return {"id": str(id_turno), "fecha": desde_iso(fecha), "horario": horario}
+
+
+COLUMNAS = "id, fecha, horario, dni_paciente, version, asignado_en, cancelaciones"
+
+
+class AlmacenTurnosSQLite:
+    """Mismos métodos que AlmacenTurnos, resueltos con consultas indexadas"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def _consultar(self, sql, parametros=()):
+        return [_fila_a_turno(f) for f in self.conexion.execute(sql, parametros)]
+
+    #### SINCRONIZACIÓN ####
+
+    def refrescar(self):
+        """La base siempre está al día: no hay nada que releer"""
+
+    @operacion("turnos.compactar")
+    def compactar(self):
+        """Libera el espacio de filas borradas"""
+        self.conexion.execute("VACUUM")
+
+    #### CONSULTAS ####
+
+    @operacion("turnos.todos")
+    def todos(self):
+        return dict(self._consultar(f"SELECT {COLUMNAS} FROM turnos ORDER BY id"))
+
+    def obtener(self, id_turno):
+        filas = self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE id = ?", (int(id_turno),)
+        )
+        return filas[0][1] if filas else None
+
+    @operacion("turnos.disponibles")
+    def disponibles(self, fecha):
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE estado = ? AND fecha = ? "
+            "ORDER BY horario",
+            (LIBRE, a_iso(fecha)),
+        )
+
+    @operacion("turnos.buscar")
+    def buscar(self, fecha, horario):
+        filas = self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE fecha = ? AND horario = ? "
+            "ORDER BY id LIMIT 1",
+            (a_iso(fecha), horario),
+        )
+        return filas[0] if filas else None
+
+    @operacion("turnos.de_paciente")
+    def de_paciente(self, dni):
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE dni_paciente = ? "
+            "ORDER BY fecha, horario",
+            (dni,),
+        )
+
+    @operacion("turnos.asignados_en_fecha")
+    def asignados_en_fecha(self, fecha):
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE estado = ? AND fecha = ? "
+            "ORDER BY horario",
+            (ASIGNADO, a_iso(fecha)),
+        )
+
+    @operacion("turnos.asignados_en_mes")
+    def asignados_en_mes(self, mes, anio):
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE estado = ? "
+            "AND fecha BETWEEN ? AND ? ORDER BY fecha, horario",
+            (ASIGNADO, *_limites_mes(mes, anio)),
+        )
+
+    def turnos_de_mes(self, mes, anio):
+        return (
+            turno
+            for _, turno in self._consultar(
+                f"SELECT {COLUMNAS} FROM turnos WHERE fecha BETWEEN ? AND ?",
+                _limites_mes(mes, anio),
+            )
+        )
+
+    def asignados_en_rango(
+        self, desde, hasta, dni=None, desde_hora=None, hasta_hora=None
+    ):
+        condiciones = ["estado = ?", "fecha BETWEEN ? AND ?"]
+        parametros = [ASIGNADO, a_iso(desde), a_iso(hasta)]
+        if dni:
+            condiciones.append("dni_paciente = ?")
+            parametros.append(dni)
+        if desde_hora is not None:
+            condiciones.append("horario >= ?")
+            parametros.append(desde_hora)
+        if hasta_hora is not None:
+            condiciones.append("horario < ?")
+            parametros.append(hasta_hora)
+        cursor = self.conexion.execute(
+            f"SELECT {COLUMNAS} FROM turnos WHERE {' AND '.join(condiciones)} "
+            "ORDER BY fecha, horario",
+            parametros,
+        )
+        return (_fila_a_turno(fila) for fila in cursor)
+
+    @operacion("turnos.grilla_mes")
+    def grilla_mes(self, mes, anio):
+        turnos = [
+            {"fecha": desde_iso(fecha), "horario": horario, "dni_paciente": dni}
+            for fecha, horario, dni in self.conexion.execute(
+                "SELECT fecha, horario, dni_paciente FROM turnos "
+                "WHERE fecha BETWEEN ? AND ?",
+                _limites_mes(mes, anio),
+            )
+        ]
+        return GrillaMes(mes, anio, turnos) if turnos else None
+
+    @operacion("turnos.proximos_libres")
+    def proximos_libres(
+        self,
+        fecha,
+        horario="00:00",
+        cantidad=5,
+        dias_semana=None,
+        desde_hora=None,
+        hasta_hora=None,
+        max_dias=None,
+    ):
+        inicio = a_iso(fecha)
+        condiciones = ["estado = ?", "(fecha > ? OR (fecha = ? AND horario >= ?))"]
+        parametros = [LIBRE, inicio, inicio, horario]
+        if max_dias is not None:
+            condiciones.append("fecha <= date(?, ?)")
+            parametros += [inicio, f"+{int(max_dias)} days"]
+        if desde_hora is not None:
+            condiciones.append("horario >= ?")
+            parametros.append(desde_hora)
+        if hasta_hora is not None:
+            condiciones.append("horario < ?")
+            parametros.append(hasta_hora)
+        if dias_semana is not None:
+            # strftime('%w') cuenta desde el domingo (0); weekday() desde el lunes
+            dias = sorted(str((d + 1) % 7) for d in dias_semana)
+            condiciones.append(
+                f"strftime('%w', fecha) IN ({', '.join('?' * len(dias))})"
+            )
+            parametros += dias
+        return self._consultar(
+            f"SELECT {COLUMNAS} FROM turnos WHERE {' AND '.join(condiciones)} "
+            "ORDER BY fecha, horario LIMIT ?",
+            (*parametros, cantidad),
+        )
+
+    @operacion("turnos.tiene_turnos")
+    def tiene_turnos(self, dni):
+        fila = self.conexion.execute(
+            "SELECT 1 FROM turnos WHERE dni_paciente = ? LIMIT 1", (dni,)
+        ).fetchone()
+        return fila is not None
+
+    @operacion("turnos.resumen_paciente")
+    def resumen_paciente(self, dni, ahora=None):
+        """Mismo resumen que AlmacenTurnos.resumen_paciente()"""
+        ahora = ahora or momento_actual()
+        # momento es 'aaaammdd HH:MM'; en la base la fecha es 'aaaa-mm-dd'
+        fecha = f"{ahora[:4]}-{ahora[4:6]}-{ahora[6:8]}"
+        horario = ahora[9:]
+        futuros, total = self.conexion.execute(
+            "SELECT COALESCE(SUM(fecha > ? OR (fecha = ? AND horario >= ?)), 0), "
+            "COUNT(*) FROM turnos WHERE dni_paciente = ?",
+            (fecha, fecha, horario, dni),
+        ).fetchone()
+        proximo = self.conexion.execute(
+            "SELECT id, fecha, horario FROM turnos WHERE dni_paciente = ? "
+            "AND (fecha > ? OR (fecha = ? AND horario >= ?)) "
+            "ORDER BY fecha, horario LIMIT 1",
+            (dni, fecha, fecha, horario),
+        ).fetchone()
+        ultimo = self.conexion.execute(
+            "SELECT id, fecha, horario FROM turnos WHERE dni_paciente = ? "
+            "AND (fecha < ? OR (fecha = ? AND horario < ?)) "
+            "ORDER BY fecha DESC, horario DESC LIMIT 1",
+            (dni, fecha, fecha, horario),
+        ).fetchone()
+        cancelaciones = self.conexion.execute(
+            "SELECT cantidad FROM cancelaciones_pacientes WHERE dni = ?", (dni,)
+        ).fetchone()
+        return {
+            "futuros": futuros,
+            "pasados": total - futuros,
+            "proximo": _fila_a_reserva(proximo),
+            "ultimo": _fila_a_reserva(ultimo),
+            "cancelaciones": cancelaciones[0] if cancelaciones else 0,
+        }
+
+    def mes_generado(self, mes, anio):
+        fila = self.conexion.execute(
+            "SELECT 1 FROM turnos WHERE fecha BETWEEN ? AND ? LIMIT 1",
+            _limites_mes(mes, anio),
+        ).fetchone()
+        return fila is not None
+
+    def siguiente_id(self):
+        (maximo,) = self.conexion.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM turnos"
+        ).fetchone()
+        return maximo + 1
+
+    #### MODIFICACIONES ####
+
+    @operacion("turnos.asignar")
+    def asignar(self, id_turno, dni, version=None):
+        """Asigna el turno solo si sigue libre (y en la versión indicada)"""
+        condicion = "" if version is None else " AND version = ?"
+        parametros = (dni, ASIGNADO, marca_tiempo(), int(id_turno), LIBRE)
+        if version is not None:
+            parametros += (version,)
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "UPDATE turnos SET dni_paciente = ?, estado = ?, asignado_en = ?, "
+                "version = version + 1 WHERE id = ? AND estado = ?" + condicion,
+                parametros,
+            )
+        return OK if cursor.rowcount else self._motivo_rechazo(id_turno)
+
+    @operacion("turnos.asignar_varios")
+    def asignar_varios(self, reservas):
+        """Asigna varios turnos libres en una sola transacción"""
+        resultados = []
+        asignado_en = marca_tiempo()
+        with self.conexion:
+            self.conexion.execute("BEGIN IMMEDIATE")
+            for id_turno, dni in reservas:
+                cursor = self.conexion.execute(
+                    "UPDATE turnos SET dni_paciente = ?, estado = ?, asignado_en = ?, "
+                    "version = version + 1 WHERE id = ? AND estado = ?",
+                    (dni, ASIGNADO, asignado_en, int(id_turno), LIBRE),
+                )
+                resultados.append(
+                    OK if cursor.rowcount else self._motivo_rechazo(id_turno)
+                )
+        return resultados
+
+    @operacion("turnos.liberar")
+    def liberar(self, id_turno, version=None):
+        """Libera el turno solo si no cambió desde la versión indicada"""
+        condicion = "" if version is None else " AND version = ?"
+        parametros = (ASIGNADO, LIBRE, int(id_turno))
+        if version is not None:
+            parametros += (version,)
+        with self.conexion:
+            # El dni se lee en la misma transacción en que se libera
+            self.conexion.execute("BEGIN IMMEDIATE")
+            fila = self.conexion.execute(
+                "SELECT dni_paciente FROM turnos WHERE id = ?", (int(id_turno),)
+            ).fetchone()
+            cursor = self.conexion.execute(
+                "UPDATE turnos SET dni_paciente = '', "
+                "asignado_en = '', cancelaciones = cancelaciones + (estado = ?), "
+                "estado = ?, version = version + 1 WHERE id = ?" + condicion,
+                parametros,
+            )
+            if cursor.rowcount and fila[0]:
+                self.conexion.execute(
+                    "INSERT INTO cancelaciones_pacientes (dni, cantidad) VALUES (?, 1) "
+                    "ON CONFLICT (dni) DO UPDATE SET cantidad = cantidad + 1",
+                    (fila[0],),
+                )
+        return OK if cursor.rowcount else self._motivo_rechazo(id_turno)
+
+    def _motivo_rechazo(self, id_turno):
+        fila = self.conexion.execute(
+            "SELECT 1 FROM turnos WHERE id = ?", (int(id_turno),)
+        ).fetchone()
+        return OCUPADO if fila else INEXISTENTE
+
+    @operacion("turnos.abrir_meses")
+    def abrir_meses(self, aperturas):
+        """Genera los turnos libres de varios meses en una sola transacción
+
+        En la base los turnos libres se guardan siempre como filas (el ajuste
+        libres_virtuales no aplica): están indexadas y las consultas no leen
+        el resto de la tabla.
+        """
+        abiertos = []
+        with self.conexion:
+            # Toma la escritura desde el principio para reservar los ids
+            self.conexion.execute("BEGIN IMMEDIATE")
+            siguiente = self.siguiente_id()
+            for mes, anio, dias, horarios in aperturas:
+                if self.mes_generado(mes, anio):
+                    continue
+                nuevos = turnos_libres(siguiente, dias, sorted(horarios))
+                _insertar_turnos(self.conexion, nuevos)
+                siguiente += len(nuevos)
+                abiertos.append((mes, anio))
+        return abiertos
+
+    @operacion("turnos.agregar")
+    def agregar(self, nuevos):
+        with self.conexion:
+            _insertar_turnos(self.conexion, nuevos)
+
+    @operacion("turnos.reemplazar")
+    def reemplazar(self, turnos):
+        with self.conexion:
+            self.conexion.execute("DELETE FROM turnos")
+            _insertar_turnos(self.conexion, turnos)
+
+
+def _insertar_turnos(conexion, turnos):
+    conexion.executemany(
+        "INSERT OR REPLACE INTO turnos "
+        "(id, fecha, horario, dni_paciente, estado, version, asignado_en, "
+        "cancelaciones) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                int(id_turno),
+                a_iso(t.get("fecha", "")),
+                t.get("horario", ""),
+                t.get("dni_paciente", ""),
+                ASIGNADO if t.get("dni_paciente") else LIBRE,
+                t.get("version", 0),
+                t.get("asignado_en", ""),
+                t.get("cancelaciones", 0),
+            )
+            for id_turno, t in turnos.items()
+        ),
+    )
+
+
+#### PACIENTES ####
+
+
+def cargar_pacientes():
+    return {
+        dni: {"nombre": n, "apellido": a, "telefono": t, "email": e}
+        for dni, n, a, t, e in conectar().execute(
+            "SELECT dni, nombre, apellido, telefono, email FROM pacientes"
+        )
+    }
+
+
+def guardar_pacientes(pacientes):
+    conexion = conectar()
+    with conexion:
+        conexion.execute("DELETE FROM pacientes")
+        _insertar_pacientes(conexion, pacientes)
+
+
+def obtener_paciente(dni):
+    fila = conectar().execute(
+        "SELECT nombre, apellido, telefono, email FROM pacientes WHERE dni = ?",
+        (dni,),
+    ).fetchone()
+    if fila is None:
+        return None
+    nombre, apellido, telefono, email = fila
+    return {
+        "nombre": nombre,
+        "apellido": apellido,
+        "telefono": telefono,
+        "email": email,
+    }
+
+
+def version_pacientes():
+    """Número que cambia con cada escritura de la tabla pacientes
+
+    A diferencia de PRAGMA data_version no cambia con los turnos, así que
+    sirve para saber si hay que volver a cargar los pacientes.
+    """
+    fila = conectar().execute(
+        "SELECT valor FROM metadatos WHERE clave = 'version_pacientes'"
+    ).fetchone()
+    return fila[0] if fila else 0
+
+
+def _insertar_pacientes(conexion, pacientes):
+    conexion.executemany(
+        "INSERT OR REPLACE INTO pacientes (dni, nombre, apellido, telefono, email) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            (dni, p["nombre"], p["apellido"], p["telefono"], p["email"])
+            for dni, p in pacientes.items()
+        ),
+    )
+    # Dentro de la misma transacción que los cambios de pacientes
+    conexion.execute(
+        "INSERT INTO metadatos (clave, valor) VALUES ('version_pacientes', 1) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = valor + 1"
+    )
+
+
+#### CONFIGURACIÓN ####
+
+
+def cargar_configuracion():
+    filas = conectar().execute("SELECT clave, valor FROM configuracion").fetchall()
+    if not filas:
+        return None
+    return {clave: json.loads(valor) for clave, valor in filas}
+
+
+def guardar_configuracion(config):
+    conexion = conectar()
+    with conexion:
+        conexion.execute("DELETE FROM configuracion")
+        conexion.executemany(
+            "INSERT INTO configuracion (clave, valor) VALUES (?, ?)",
+            ((clave, json.dumps(valor)) for clave, valor in config.items()),
+        )
+
+
+#### MIGRACIÓN DESDE JSON ####
+
+
+def _leer_json(ruta, por_defecto):
+    if not os.path.exists(ruta):
+        return por_defecto
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def migrar_desde_json():
+    """Importa data/pacientes.json, turnos y configuracion.json a la base
+
+    Los turnos se leen con el almacén JSON para incluir todas las particiones
+    y sus diarios pendientes; las cancelaciones de cada paciente salen de su
+    índice.
+    Devuelve la cantidad de registros importados de cada tipo.
+    """
+    pacientes = _leer_json(os.path.join("data", "pacientes.json"), {})
+    config = _leer_json(os.path.join("data", "configuracion.json"), None)
+
+    almacen = AlmacenTurnos(DIRECTORIO_DATOS)
+    turnos = almacen.todos()
+    cancelaciones = almacen.indice.cancelaciones
+
+    conexion = conectar()
+    with conexion:
+        _insertar_pacientes(conexion, pacientes)
+        _insertar_turnos(conexion, turnos)
+        conexion.executemany(
+            "INSERT OR REPLACE INTO cancelaciones_pacientes (dni, cantidad) "
+            "VALUES (?, ?)",
+            cancelaciones.items(),
+        )
+    if config:
+        guardar_configuracion(config)
+
+    return {
+        "pacientes": len(pacientes),
+        "turnos": len(turnos),
+        "configuracion": len(config or {}),
+    }
+
+
+if __name__ == "__main__":
+    resultado = migrar_desde_json()
+    print(f"Base creada en {RUTA_BASE}")
+    for tipo, cantidad in resultado.items():
+        print(f"  {tipo}: {cantidad} registros importados")
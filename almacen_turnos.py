@@ -0,0 +1,1207 @@
+"""
+ALMACÉN DE TURNOS
+
+Único punto de acceso a los turnos para todos los módulos.
+
+Los turnos se guardan particionados por mes en data/turnos/aaaa-mm.json, con
+un índice (data/turnos/indice.json) de los meses existentes, sus rangos de
+ids y los meses en los que tiene turnos cada dni. Asignar, cancelar, los
+informes y la verificación de mes generado solo leen la partición necesaria.
+Si existe el data/turnos.json de versiones anteriores se reparte en
+particiones la primera vez y se renombra como turnos.json.migrado.
+
+Cada archivo se mantiene en memoria y se revalida contra su fecha de
+modificación y tamaño: solo se vuelve a leer cuando otro proceso lo cambió.
+Las consultas y modificaciones se hacen a través de los métodos del almacén
+en lugar de recorrer el diccionario a mano.
+
+Cada partición mantiene dos índices secundarios que se actualizan en cada
+asignación o cancelación:
+- fecha -> ids de los turnos del día, ordenados por horario
+- dni -> ids de los turnos del paciente, ordenados por fecha y horario
+
+Las modificaciones no reescriben la partición: se agregan como una línea JSON
+a su diario (aaaa-mm_diario.jsonl, con fsync). Al cargar se aplica el diario
+sobre la instantánea, y cada LIMITE_DIARIO operaciones (o a pedido, con
+compactar()) se reescribe la instantánea de forma atómica y se vacía el diario.
+
+Varias terminales pueden usar el mismo directorio data/: cada escritura se
+hace bajo un bloqueo entre procesos (data/turnos.lock) que solo dura lo que
+tarda la escritura. Cada turno lleva un número de versión y asignar/liberar
+funcionan como comparar-y-cambiar: solo se aplican si el turno sigue en el
+estado (y la versión) que vio el usuario; si no, devuelven OCUPADO.
+
+Cada partición puede dar además su grilla de disponibilidad en bits
+(grilla_turnos.GrillaMes), que se construye al pedirla y se mantiene al día
+con cada asignación o cancelación.
+
+Con el ajuste libres_virtuales activado, abrir_meses() no materializa los
+turnos libres: la partición guarda solo la apertura del mes (primer id, días
+y horarios) y los turnos que alguna vez se modificaron. Los libres se
+calculan al consultarlos, con ids desde + día * cantidad de horarios +
+horario, la misma numeración que al materializarlos.
+
+Al asignar, el turno guarda la fecha y hora de la reserva (asignado_en) y al
+cancelarlo se suma uno a su contador de cancelaciones; con ambos datos se
+calculan la anticipación de las reservas y la tasa de cancelación.
+
+El índice guarda además, por dni, los turnos asignados (fecha y hora, id) en
+orden y la cantidad de cancelaciones del paciente. resumen_paciente() (turnos
+futuros y pasados, próximo, último y cancelaciones) y tiene_turnos() se
+responden desde ahí sin abrir particiones; futuros y pasados se separan con
+una búsqueda binaria por la hora actual, porque cambian solos con el tiempo.
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from itertools import product
+
+from ajustes import usa_libres_virtuales, usa_sqlite
+from bloqueo import BloqueoArchivo
+from calendario import clave_fecha
+from grilla_turnos import GrillaMes
+from traza import contar, medicion, operacion
+
+DIRECTORIO_DATOS = "data"
+
+# Resultados de asignar() y liberar()
+OK = "ok"
+OCUPADO = "ocupado"
+INEXISTENTE = "inexistente"
+
+# Cantidad de operaciones en el diario a partir de la cual se compacta
+LIMITE_DIARIO = 1000
+
+
+def _firma(ruta):
+    """Devuelve (mtime, tamaño) del archivo o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+class ArchivoConDiario:
+    """Instantánea JSON más un diario de operaciones agregadas al final"""
+
+    def __init__(self, ruta, ruta_diario):
+        self.ruta = ruta
+        self.ruta_diario = ruta_diario
+
+    def firmas(self):
+        return _firma(self.ruta), _firma(self.ruta_diario)
+
+    def leer_instantanea(self, por_defecto):
+        if not os.path.exists(self.ruta):
+            return por_defecto
+        with medicion("archivo.cargar", archivo=os.path.basename(self.ruta)):
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+                contar(leidos=f.tell(), cargas=1)
+            return estado
+
+    def leer_diario(self, desde=0):
+        """Devuelve (operaciones, desplazamiento) leyendo desde el byte indicado
+
+        Una última línea incompleta (escritura interrumpida) no se consume y
+        las líneas dañadas se ignoran.
+        """
+        try:
+            with open(self.ruta_diario, "rb") as f:
+                f.seek(desde)
+                datos = f.read()
+        except FileNotFoundError:
+            return [], 0
+        contar(leidos=len(datos))
+        fin = datos.rfind(b"\n") + 1
+        operaciones = []
+        for linea in datos[:fin].splitlines():
+            try:
+                operaciones.append(json.loads(linea))
+            except ValueError:
+                continue
+        return operaciones, desde + fin
+
+    def agregar(self, operaciones):
+        """Agrega operaciones al diario y fuerza la escritura a disco"""
+        lineas = b"".join(
+            json.dumps(op, ensure_ascii=False).encode("utf-8") + b"\n"
+            for op in operaciones
+        )
+        directorio = os.path.dirname(self.ruta_diario)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(self.ruta_diario, "a+b") as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Cierra una línea que quedó a medio escribir
+                    lineas = b"\n" + lineas
+            f.write(lineas)
+            f.flush()
+            os.fsync(f.fileno())
+        contar(escritos=len(lineas))
+
+    def compactar(self, estado):
+        """Escribe la instantánea de forma atómica y vacía el diario"""
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = self.ruta + ".tmp"
+        with medicion("archivo.guardar", archivo=os.path.basename(self.ruta)):
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(estado, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+                contar(escritos=f.tell())
+            os.replace(temporal, self.ruta)
+        # Si se corta aquí el diario se vuelve a aplicar sobre la nueva
+        # instantánea: las operaciones son idempotentes (ver _aplicar de cada
+        # estado), así que el resultado es el mismo.
+        with open(self.ruta_diario, "wb") as f:
+            os.fsync(f.fileno())
+
+
+class EstadoConDiario(ABC):
+    """Estado en memoria reconstruido desde una instantánea y su diario
+
+    Las subclases definen cómo se carga la instantánea (_cargar), cómo se
+    aplica cada operación (_aplicar) y qué se escribe al compactar (_estado).
+    """
+
+    def __init__(self, ruta, ruta_diario):
+        self.archivo = ArchivoConDiario(ruta, ruta_diario)
+        self._firma_instantanea = False
+        self._firma_diario = None
+        self._desplazamiento = 0
+        self._operaciones_diario = 0
+
+    @abstractmethod
+    def _cargar(self, estado):
+        """Reemplaza el estado en memoria por el de la instantánea"""
+
+    @abstractmethod
+    def _aplicar(self, op, indexar=True):
+        """Aplica una operación del diario al estado en memoria"""
+
+    @abstractmethod
+    def _estado(self):
+        """Devuelve lo que se escribe en la instantánea al compactar"""
+
+    def _terminar_carga(self):
+        """Se llama después de una lectura completa (p. ej. para indexar)"""
+
+    def refrescar(self):
+        """Vuelve a leer los archivos solo si cambiaron desde la última lectura
+
+        Si solo creció el diario se aplican únicamente las operaciones nuevas.
+        """
+        firma_instantanea, firma_diario = self.archivo.firmas()
+        tamanio_diario = firma_diario[1] if firma_diario else 0
+        if (
+            firma_instantanea != self._firma_instantanea
+            or tamanio_diario < self._desplazamiento
+        ):
+            self._cargar(self.archivo.leer_instantanea({}))
+            operaciones, self._desplazamiento = self.archivo.leer_diario()
+            for op in operaciones:
+                self._aplicar(op, indexar=False)
+            self._operaciones_diario = len(operaciones)
+            self._terminar_carga()
+        elif firma_diario != self._firma_diario:
+            operaciones, self._desplazamiento = self.archivo.leer_diario(
+                self._desplazamiento
+            )
+            for op in operaciones:
+                self._aplicar(op)
+            self._operaciones_diario += len(operaciones)
+        self._firma_instantanea = firma_instantanea
+        self._firma_diario = firma_diario
+
+    def registrar(self, operaciones):
+        """Escribe las operaciones en el diario y las incorpora a memoria
+
+        Debe llamarse con el bloqueo del almacén tomado.
+        """
+        self.archivo.agregar(operaciones)
+        self.refrescar()
+        if self._operaciones_diario >= LIMITE_DIARIO:
+            self.compactar()
+
+    def compactar(self):
+        """Reescribe la instantánea y vacía el diario (con el bloqueo tomado)"""
+        self.refrescar()
+        if not self._operaciones_diario and self._firma_instantanea:
+            return
+        self.archivo.compactar(self._estado())
+        self._firma_instantanea, self._firma_diario = self.archivo.firmas()
+        self._desplazamiento = 0
+        self._operaciones_diario = 0
+
+
+def marca_tiempo():
+    """Fecha y hora actual (ISO, al segundo) con que se registra una asignación"""
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def momento(fecha, horario):
+    """'dd/mm/aaaa' y 'HH:MM' como 'aaaammdd HH:MM', que se ordena por tiempo"""
+    return f"{clave_fecha(fecha)} {horario}"
+
+
+def momento_actual():
+    return datetime.now().strftime("%Y%m%d %H:%M")
+
+
+def _turno_de_reserva(reserva):
+    """{"id", "fecha", "horario"} de una entrada [momento, id] del índice"""
+    cuando, id_turno = reserva
+    fecha, horario = cuando.split(" ")
+    return {
+        "id": id_turno,
+        "fecha": f"{fecha[6:]}/{fecha[4:6]}/{fecha[:4]}",
+        "horario": horario,
+    }
+
+
+def resumen_de_reservas(reservas, cancelaciones, ahora=None):
+    """Resumen de un paciente a partir de su lista ordenada de [momento, id]
+
+    Los turnos desde ahora (momento_actual() si no se indica) son futuros.
+    """
+    corte = bisect_left(reservas, [ahora or momento_actual()])
+    futuros = len(reservas) - corte
+    return {
+        "futuros": futuros,
+        "pasados": corte,
+        "proximo": _turno_de_reserva(reservas[corte]) if futuros else None,
+        "ultimo": _turno_de_reserva(reservas[corte - 1]) if corte else None,
+        "cancelaciones": cancelaciones,
+    }
+
+
+def turno_libre(fecha, horario):
+    return {"dni_paciente": "", "fecha": fecha, "horario": horario}
+
+
+def _posterior(op, turno):
+    """Indica si la operación deja al turno en una versión más nueva"""
+    return op["version"] > turno.get("version", 0)
+
+
+def _quitar_nombres(turnos):
+    """Quita el paciente_nombre que guardaban las versiones anteriores
+
+    El nombre se resuelve por DNI al mostrarlo (ver indice_pacientes); la
+    copia guardada quedaba desactualizada al modificar al paciente.
+    """
+    for turno in turnos.values():
+        turno.pop("paciente_nombre", None)
+    return turnos
+
+
+def turnos_libres(desde, dias, horarios):
+    """Turnos libres de los días y horarios indicados, numerados desde 'desde'"""
+    return {
+        str(desde + i): turno_libre(fecha, horario)
+        for i, (fecha, horario) in enumerate(product(dias, horarios))
+    }
+
+
+class TurnosAbiertos(Mapping):
+    """Turnos de un mes abierto sin materializar los libres
+
+    Se comporta como el diccionario id -> turno del mes: los turnos guardados
+    (los que alguna vez se asignaron) están en 'reales' y el resto se calcula
+    a partir de la apertura al pedirlo.
+    """
+
+    def __init__(self, apertura, reales):
+        self.apertura = apertura
+        self.desde = apertura["desde"]
+        self.dias = apertura["dias"]
+        self.horarios = apertura["horarios"]
+        self.reales = reales
+        self._calculados = {}
+
+    def _posicion(self, id_turno):
+        """Devuelve (día, horario) del id dentro de la apertura, o None"""
+        if not id_turno.isdigit():
+            return None
+        i = int(id_turno) - self.desde
+        if 0 <= i < len(self.dias) * len(self.horarios):
+            return divmod(i, len(self.horarios))
+        return None
+
+    def __getitem__(self, id_turno):
+        turno = self.reales.get(id_turno)
+        if turno is None:
+            turno = self._calculados.get(id_turno)
+        if turno is None:
+            posicion = self._posicion(id_turno)
+            if posicion is None:
+                raise KeyError(id_turno)
+            dia, horario = posicion
+            turno = self._calculados[id_turno] = turno_libre(
+                self.dias[dia], self.horarios[horario]
+            )
+        return turno
+
+    def __contains__(self, id_turno):
+        return id_turno in self.reales or self._posicion(id_turno) is not None
+
+    def __iter__(self):
+        for i in range(len(self.dias) * len(self.horarios)):
+            yield str(self.desde + i)
+        for id_turno in self.reales:
+            if self._posicion(id_turno) is None:
+                yield id_turno
+
+    def __len__(self):
+        extras = sum(1 for id_turno in self.reales if self._posicion(id_turno) is None)
+        return len(self.dias) * len(self.horarios) + extras
+
+    def materializar(self, id_turno):
+        """Devuelve el turno para modificarlo, pasándolo a los guardados"""
+        turno = self.get(id_turno)
+        if turno is not None and id_turno not in self.reales:
+            self.reales[id_turno] = self._calculados.pop(id_turno, turno)
+        return turno
+
+    def update(self, turnos):
+        self.reales.update(turnos)
+
+    def recorrer(self):
+        """Genera todos los turnos del mes sin guardar los libres calculados"""
+        for id_turno in self:
+            turno = self.reales.get(id_turno) or self._calculados.get(id_turno)
+            if turno is None:
+                dia, horario = self._posicion(id_turno)
+                turno = turno_libre(self.dias[dia], self.horarios[horario])
+            yield turno
+
+    def ids_por_fecha(self):
+        """Índice fecha -> ids ordenados por horario, sin crear los turnos"""
+        cantidad = len(self.horarios)
+        por_fecha = {
+            fecha: [str(self.desde + i * cantidad + j) for j in range(cantidad)]
+            for i, fecha in enumerate(self.dias)
+        }
+        for id_turno, turno in self.reales.items():
+            if self._posicion(id_turno) is None:
+                insort(
+                    por_fecha.setdefault(turno.get("fecha", ""), []),
+                    id_turno,
+                    key=lambda k: self[k].get("horario", ""),
+                )
+        return por_fecha
+
+
+class ParticionMes(EstadoConDiario):
+    """Turnos de un mes con sus índices por fecha y por dni y su grilla"""
+
+    def __init__(self, ruta, ruta_diario, mes=None):
+        super().__init__(ruta, ruta_diario)
+        self.mes = mes
+        self.turnos = {}
+        self._por_fecha = {}
+        self._por_dni = {}
+        self._grilla = None
+
+    def _cargar(self, estado):
+        if "apertura" in estado:
+            self.turnos = TurnosAbiertos(
+                estado["apertura"], _quitar_nombres(estado.get("turnos", {}))
+            )
+        else:
+            self.turnos = _quitar_nombres(estado)
+
+    def _estado(self):
+        if isinstance(self.turnos, TurnosAbiertos):
+            return {"apertura": self.turnos.apertura, "turnos": self.turnos.reales}
+        return self.turnos
+
+    def _terminar_carga(self):
+        self._indexar()
+        self._grilla = None
+
+    def _aplicar(self, op, indexar=True):
+        """Aplica una operación del diario sobre los turnos en memoria
+
+        asignar y liberar llevan la versión que deja el turno y no se aplican
+        sobre un turno que ya está en esa versión o en una posterior: al
+        volver a aplicar el diario sobre una instantánea que ya las incluye
+        (compactación interrumpida) no cambian nada, tampoco el contador de
+        cancelaciones.
+        """
+        match op.get("op"):
+            case "asignar":
+                turno = self._para_modificar(op["id"])
+                if turno is None or not _posterior(op, turno):
+                    return
+                if indexar and turno.get("dni_paciente"):
+                    self._desindexar_dni(op["id"], turno["dni_paciente"])
+                turno["dni_paciente"] = op["dni"]
+                turno["version"] = op.get("version", turno.get("version", 0) + 1)
+                if "asignado_en" in op:
+                    turno["asignado_en"] = op["asignado_en"]
+                if indexar:
+                    self._indexar_dni(op["id"], op["dni"])
+                    self._marcar(turno)
+            case "liberar":
+                turno = self._para_modificar(op["id"])
+                if turno is None or not _posterior(op, turno):
+                    return
+                if turno.get("dni_paciente"):
+                    turno["cancelaciones"] = turno.get("cancelaciones", 0) + 1
+                    if indexar:
+                        self._desindexar_dni(op["id"], turno["dni_paciente"])
+                turno.pop("asignado_en", None)
+                turno["dni_paciente"] = ""
+                turno["version"] = op.get("version", turno.get("version", 0) + 1)
+                if indexar:
+                    self._marcar(turno)
+            case "agregar":
+                self.turnos.update(_quitar_nombres(op["turnos"]))
+                if indexar:
+                    for id_turno, turno in op["turnos"].items():
+                        insort(
+                            self._por_fecha.setdefault(turno.get("fecha", ""), []),
+                            id_turno,
+                            key=self._clave_horario,
+                        )
+                        if turno.get("dni_paciente"):
+                            self._indexar_dni(id_turno, turno["dni_paciente"])
+                        self._marcar(turno)
+
+    def _para_modificar(self, id_turno):
+        """Devuelve el turno a modificar; en un mes abierto pasa a guardarse"""
+        if isinstance(self.turnos, TurnosAbiertos):
+            return self.turnos.materializar(id_turno)
+        return self.turnos.get(id_turno)
+
+    #### ÍNDICES ####
+
+    def _clave_horario(self, id_turno):
+        return self.turnos[id_turno].get("horario", "")
+
+    def _clave_cronologica(self, id_turno):
+        turno = self.turnos[id_turno]
+        return (clave_fecha(turno.get("fecha", "")), turno.get("horario", ""))
+
+    def _indexar(self):
+        """Reconstruye los índices por fecha y por dni"""
+        self._por_fecha = {}
+        self._por_dni = {}
+        if isinstance(self.turnos, TurnosAbiertos):
+            # Mes abierto: los días salen de la numeración, sin crear los turnos
+            self._por_fecha = self.turnos.ids_por_fecha()
+            guardados = self.turnos.reales
+        else:
+            guardados = self.turnos
+            for id_turno, turno in guardados.items():
+                self._por_fecha.setdefault(turno.get("fecha", ""), []).append(id_turno)
+            for ids in self._por_fecha.values():
+                ids.sort(key=self._clave_horario)
+        for id_turno, turno in guardados.items():
+            dni = turno.get("dni_paciente", "")
+            if dni:
+                self._por_dni.setdefault(dni, []).append(id_turno)
+        for ids in self._por_dni.values():
+            ids.sort(key=self._clave_cronologica)
+
+    def _indexar_dni(self, id_turno, dni):
+        ids = self._por_dni.setdefault(dni, [])
+        insort(ids, id_turno, key=self._clave_cronologica)
+
+    def _desindexar_dni(self, id_turno, dni):
+        ids = self._por_dni.get(dni)
+        if ids and id_turno in ids:
+            ids.remove(id_turno)
+            if not ids:
+                del self._por_dni[dni]
+
+    def _marcar(self, turno):
+        """Actualiza la grilla, si ya fue construida, con el estado del turno"""
+        if self._grilla is not None and not self._grilla.marcar(
+            turno["fecha"], turno["horario"], not turno.get("dni_paciente")
+        ):
+            # Fecha u horario fuera de la grilla: se reconstruye al pedirla
+            self._grilla = None
+
+    def grilla(self):
+        """Devuelve la grilla de disponibilidad del mes"""
+        if self._grilla is None:
+            anio, mes = (int(parte) for parte in self.mes.split("-"))
+            if isinstance(self.turnos, TurnosAbiertos):
+                self._grilla = GrillaMes(
+                    mes,
+                    anio,
+                    self.turnos.reales.values(),
+                    (self.turnos.dias, self.turnos.horarios),
+                )
+            else:
+                self._grilla = GrillaMes(mes, anio, self.turnos.values())
+        return self._grilla
+
+    #### CONSULTAS ####
+
+    def de_fecha(self, fecha, asignados):
+        """Lista de (id, turno) de la fecha, libres o asignados, por horario"""
+        turnos = self.turnos
+        return [
+            (id_turno, turnos[id_turno])
+            for id_turno in self._por_fecha.get(fecha, ())
+            if bool(turnos[id_turno].get("dni_paciente")) == asignados
+        ]
+
+    def id_de(self, fecha, horario):
+        """Id del turno de esa fecha y horario, o None"""
+        ids = self._por_fecha.get(fecha, ())
+        i = bisect_left(ids, horario, key=self._clave_horario)
+        if i < len(ids) and self._clave_horario(ids[i]) == horario:
+            return ids[i]
+        return None
+
+    def fechas(self):
+        """Fechas con turnos en el mes, en orden cronológico"""
+        return sorted(self._por_fecha, key=clave_fecha)
+
+    def de_paciente(self, dni):
+        turnos = self.turnos
+        return [(id_turno, turnos[id_turno]) for id_turno in self._por_dni.get(dni, ())]
+
+
+class IndiceParticiones(EstadoConDiario):
+    """Índice de particiones: meses, rangos de ids y reservas de cada dni
+
+    reservas guarda por dni la lista ordenada de [momento, id] de sus turnos
+    asignados y cancelaciones la cantidad de turnos que canceló.
+    """
+
+    def __init__(self, ruta, ruta_diario):
+        super().__init__(ruta, ruta_diario)
+        self._cargar({})
+
+    def _cargar(self, estado):
+        self.meses = estado.get("meses", {})
+        self.siguiente_id = estado.get("siguiente_id", 1)
+        self.reservas = estado.get("reservas", {})
+        self.cancelaciones = estado.get("cancelaciones", {})
+
+    def _estado(self):
+        return {
+            "siguiente_id": self.siguiente_id,
+            "meses": self.meses,
+            "reservas": self.reservas,
+            "cancelaciones": self.cancelaciones,
+        }
+
+    def _aplicar(self, op, indexar=True):
+        """Aplica una operación del diario
+
+        Aplicar dos veces la misma operación da el mismo resultado: reserva y
+        cancelacion agregan o quitan la entrada solo si falta o está, y
+        cancelacion trae la cantidad total de cancelaciones del paciente en
+        lugar de sumar una.
+        """
+        match op.get("op"):
+            case "mes":
+                self.meses[op["mes"]] = [op["desde"], op["hasta"]]
+                self.siguiente_id = max(self.siguiente_id, op["hasta"] + 1)
+            case "reserva":
+                reservas = self.reservas.setdefault(op["dni"], [])
+                entrada = [op["momento"], op["id"]]
+                posicion = bisect_left(reservas, entrada)
+                if posicion == len(reservas) or reservas[posicion] != entrada:
+                    reservas.insert(posicion, entrada)
+            case "cancelacion":
+                reservas = self.reservas.get(op["dni"], [])
+                entrada = [op["momento"], op["id"]]
+                posicion = bisect_left(reservas, entrada)
+                if posicion < len(reservas) and reservas[posicion] == entrada:
+                    del reservas[posicion]
+                    if not reservas:
+                        del self.reservas[op["dni"]]
+                self.cancelaciones[op["dni"]] = op["cancelaciones"]
+
+    def meses_de_paciente(self, dni):
+        """Meses ('aaaa-mm') en los que el paciente tiene turnos asignados"""
+        return sorted(
+            {f"{cuando[:4]}-{cuando[4:6]}" for cuando, _ in self.reservas.get(dni, ())}
+        )
+
+    def existe(self):
+        return self._firma_instantanea is not None or self._operaciones_diario > 0
+
+    def meses_de_id(self, id_turno):
+        """Meses cuyo rango de ids incluye al id indicado"""
+        if not id_turno.isdigit():
+            return []
+        numero = int(id_turno)
+        return sorted(
+            mes
+            for mes, (desde, hasta) in self.meses.items()
+            if desde <= numero <= hasta
+        )
+
+
+def _operacion_reserva(op, id_turno, turno, dni):
+    """Operación "reserva" o "cancelacion" del diario del índice"""
+    return {
+        "op": op,
+        "dni": dni,
+        "id": id_turno,
+        "momento": momento(turno["fecha"], turno["horario"]),
+    }
+
+
+def clave_mes(fecha):
+    """Convierte 'dd/mm/aaaa' en la clave de partición 'aaaa-mm'"""
+    return f"{fecha[6:]}-{fecha[3:5]}"
+
+
+def _rango_ids(turnos):
+    ids = [int(k) for k in turnos if k.isdigit()]
+    return (min(ids), max(ids)) if ids else (0, 0)
+
+
+def _agrupar_por_mes(turnos):
+    grupos = {}
+    for id_turno, turno in turnos.items():
+        grupos.setdefault(clave_mes(turno.get("fecha", "")), {})[id_turno] = turno
+    return grupos
+
+
+class AlmacenTurnos:
+    """Turnos particionados por mes en data/turnos/, con índice y diarios
+
+    Cada mes vive en data/turnos/aaaa-mm.json (más su diario) y solo se lee
+    cuando una consulta o modificación lo necesita. data/turnos/indice.json
+    guarda los meses existentes, el rango de ids de cada uno, el próximo id y
+    los turnos asignados y cancelaciones de cada dni.
+    """
+
+    def __init__(self, directorio_datos="data"):
+        self.directorio = os.path.join(directorio_datos, "turnos")
+        self.ruta_anterior = os.path.join(directorio_datos, "turnos.json")
+        self.ruta_diario_anterior = os.path.join(
+            directorio_datos, "turnos_diario.jsonl"
+        )
+        self.bloqueo = BloqueoArchivo(os.path.join(directorio_datos, "turnos.lock"))
+        self.indice = IndiceParticiones(
+            os.path.join(self.directorio, "indice.json"),
+            os.path.join(self.directorio, "indice_diario.jsonl"),
+        )
+        self._particiones = {}
+
+    #### PARTICIONES ####
+
+    def _particion(self, mes):
+        """Devuelve la partición del mes ('aaaa-mm'), actualizada"""
+        particion = self._particiones.get(mes)
+        if particion is None:
+            particion = self._particiones[mes] = ParticionMes(
+                os.path.join(self.directorio, f"{mes}.json"),
+                os.path.join(self.directorio, f"{mes}_diario.jsonl"),
+                mes,
+            )
+        particion.refrescar()
+        return particion
+
+    def refrescar(self):
+        """Actualiza el índice (y migra el turnos.json anterior si hace falta)"""
+        self.indice.refrescar()
+        if not self.indice.existe() and os.path.exists(self.ruta_anterior):
+            with self.bloqueo:
+                self.indice.refrescar()
+                if not self.indice.existe():
+                    self._migrar_archivo_anterior()
+
+    def _guardar_indice(self):
+        """Reescribe la instantánea del índice con lo que tiene en memoria"""
+        self.indice.archivo.compactar(self.indice._estado())
+        self.indice._firma_instantanea = False
+        self.indice.refrescar()
+
+    def _migrar_archivo_anterior(self):
+        """Reparte el turnos.json único (y su diario) en particiones por mes"""
+        anterior = ParticionMes(self.ruta_anterior, self.ruta_diario_anterior)
+        anterior.refrescar()
+        self._escribir_todo(anterior.turnos)
+        for ruta in (self.ruta_anterior, self.ruta_diario_anterior):
+            if os.path.exists(ruta):
+                os.replace(ruta, ruta + ".migrado")
+
+    def _escribir_todo(self, turnos):
+        """Reescribe todas las particiones y el índice a partir de un dict"""
+        grupos = _agrupar_por_mes(turnos)
+        for mes in set(self.indice.meses) - set(grupos):
+            for sufijo in (".json", "_diario.jsonl"):
+                ruta = os.path.join(self.directorio, mes + sufijo)
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+        reservas = {}
+        meses = {}
+        for mes, turnos_mes in grupos.items():
+            ArchivoConDiario(
+                os.path.join(self.directorio, f"{mes}.json"),
+                os.path.join(self.directorio, f"{mes}_diario.jsonl"),
+            ).compactar(turnos_mes)
+            meses[mes] = list(_rango_ids(turnos_mes))
+            for id_turno, turno in turnos_mes.items():
+                if turno.get("dni_paciente"):
+                    reservas.setdefault(turno["dni_paciente"], []).append(
+                        [momento(turno["fecha"], turno["horario"]), id_turno]
+                    )
+        for lista in reservas.values():
+            lista.sort()
+        self.indice.meses = meses
+        self.indice.reservas = reservas
+        self.indice.siguiente_id = _rango_ids(turnos)[1] + 1
+        self._guardar_indice()
+        self._particiones = {}
+
+    def _particion_de_id(self, id_turno):
+        """Devuelve la partición que contiene el id, o None"""
+        for mes in self.indice.meses_de_id(id_turno):
+            particion = self._particion(mes)
+            if id_turno in particion.turnos:
+                return particion
+        return None
+
+    @operacion("turnos.compactar")
+    def compactar(self):
+        """Compacta los diarios del índice y de las particiones cargadas"""
+        with self.bloqueo:
+            self.refrescar()
+            self.indice.compactar()
+            for mes in list(self._particiones):
+                self._particion(mes).compactar()
+
+    #### CONSULTAS ####
+    # Los diccionarios devueltos pertenecen al almacén: no deben modificarse.
+
+    @operacion("turnos.todos")
+    def todos(self):
+        """Devuelve un diccionario id -> turno con todas las particiones"""
+        self.refrescar()
+        turnos = {}
+        for mes in sorted(self.indice.meses):
+            turnos.update(self._particion(mes).turnos)
+        return turnos
+
+    def obtener(self, id_turno):
+        """Devuelve el turno con ese id o None"""
+        self.refrescar()
+        particion = self._particion_de_id(id_turno)
+        return particion.turnos[id_turno] if particion else None
+
+    @operacion("turnos.disponibles")
+    def disponibles(self, fecha):
+        """Lista de (id, turno) libres de una fecha, ordenada por horario"""
+        self.refrescar()
+        mes = clave_mes(fecha)
+        if mes not in self.indice.meses:
+            return []
+        return self._particion(mes).de_fecha(fecha, asignados=False)
+
+    @operacion("turnos.buscar")
+    def buscar(self, fecha, horario):
+        """Devuelve (id, turno) del turno de esa fecha y horario, o None"""
+        self.refrescar()
+        mes = clave_mes(fecha)
+        if mes not in self.indice.meses:
+            return None
+        particion = self._particion(mes)
+        id_turno = particion.id_de(fecha, horario)
+        return None if id_turno is None else (id_turno, particion.turnos[id_turno])
+
+    @operacion("turnos.asignados_en_fecha")
+    def asignados_en_fecha(self, fecha):
+        """Lista de (id, turno) asignados en una fecha, ordenada por horario"""
+        self.refrescar()
+        mes = clave_mes(fecha)
+        if mes not in self.indice.meses:
+            return []
+        return self._particion(mes).de_fecha(fecha, asignados=True)
+
+    @operacion("turnos.asignados_en_mes")
+    def asignados_en_mes(self, mes, anio):
+        """Lista de (id, turno) asignados en un mes, en orden cronológico"""
+        self.refrescar()
+        clave = f"{anio:04d}-{mes:02d}"
+        if clave not in self.indice.meses:
+            return []
+        particion = self._particion(clave)
+        return [
+            par
+            for fecha in particion.fechas()
+            for par in particion.de_fecha(fecha, asignados=True)
+        ]
+
+    def turnos_de_mes(self, mes, anio):
+        """Genera todos los turnos del mes, libres y asignados, sin orden"""
+        self.refrescar()
+        clave = f"{anio:04d}-{mes:02d}"
+        if clave not in self.indice.meses:
+            return iter(())
+        turnos = self._particion(clave).turnos
+        if isinstance(turnos, TurnosAbiertos):
+            return turnos.recorrer()
+        return iter(turnos.values())
+
+    def asignados_en_rango(
+        self, desde, hasta, dni=None, desde_hora=None, hasta_hora=None
+    ):
+        """Genera (id, turno) asignados entre dos fechas incluidas, en orden
+
+        Solo abre los meses del rango (o, con dni, los meses del paciente) y
+        dentro de cada uno solo los días que la grilla marca con asignados.
+        La franja horaria incluye desde_hora y excluye hasta_hora.
+        """
+        self.refrescar()
+        inicio, fin = clave_fecha(desde), clave_fecha(hasta)
+        meses = self.indice.meses_de_paciente(dni) if dni else self.indice.meses
+        for mes in sorted(meses):
+            if not clave_mes(desde) <= mes <= clave_mes(hasta):
+                continue
+            if mes not in self.indice.meses:
+                continue
+            particion = self._particion(mes)
+            if dni:
+                pares = particion.de_paciente(dni)
+            else:
+                pares = (
+                    par
+                    for fecha in particion.grilla().dias_con_asignados()
+                    if inicio <= clave_fecha(fecha) <= fin
+                    for par in particion.de_fecha(fecha, asignados=True)
+                )
+            for id_turno, turno in pares:
+                if not inicio <= clave_fecha(turno["fecha"]) <= fin:
+                    continue
+                if desde_hora is not None and turno["horario"] < desde_hora:
+                    continue
+                if hasta_hora is not None and turno["horario"] >= hasta_hora:
+                    continue
+                yield id_turno, turno
+
+    @operacion("turnos.grilla_mes")
+    def grilla_mes(self, mes, anio):
+        """Grilla de disponibilidad del mes, o None si no fue generado"""
+        self.refrescar()
+        clave = f"{anio:04d}-{mes:02d}"
+        if clave not in self.indice.meses:
+            return None
+        return self._particion(clave).grilla()
+
+    @operacion("turnos.proximos_libres")
+    def proximos_libres(
+        self,
+        fecha,
+        horario="00:00",
+        cantidad=5,
+        dias_semana=None,
+        desde_hora=None,
+        hasta_hora=None,
+        max_dias=None,
+    ):
+        """Primeros turnos libres desde la fecha y hora indicadas
+
+        Recorre las grillas de los meses generados en orden, sin listar los
+        turnos de cada día. dias_semana es un conjunto (0 = lunes), la franja
+        incluye desde_hora y excluye hasta_hora, y max_dias limita cuántos
+        días hacia adelante se busca. Devuelve una lista de (id, turno).
+        """
+        self.refrescar()
+        limite = None
+        if max_dias is not None:
+            limite = datetime.strptime(fecha, "%d/%m/%Y") + timedelta(days=max_dias)
+            limite = limite.strftime("%Y%m%d")
+        resultado = []
+        for clave in sorted(self.indice.meses):
+            if clave < clave_mes(fecha):
+                continue
+            if limite is not None and clave.replace("-", "") + "01" > limite:
+                break
+            particion = self._particion(clave)
+            for dia, hora in particion.grilla().libres_desde(
+                fecha, horario, dias_semana, desde_hora, hasta_hora
+            ):
+                if limite is not None and clave_fecha(dia) > limite:
+                    return resultado
+                id_turno = particion.id_de(dia, hora)
+                resultado.append((id_turno, particion.turnos[id_turno]))
+                if len(resultado) >= cantidad:
+                    return resultado
+        return resultado
+
+    @operacion("turnos.de_paciente")
+    def de_paciente(self, dni):
+        """Lista de (id, turno) de un paciente, ordenada por fecha y horario"""
+        self.refrescar()
+        return [
+            par
+            for mes in self.indice.meses_de_paciente(dni)
+            for par in self._particion(mes).de_paciente(dni)
+        ]
+
+    @operacion("turnos.tiene_turnos")
+    def tiene_turnos(self, dni):
+        """Indica si el paciente tiene al menos un turno asignado"""
+        self.refrescar()
+        return bool(self.indice.reservas.get(dni))
+
+    @operacion("turnos.resumen_paciente")
+    def resumen_paciente(self, dni, ahora=None):
+        """Turnos futuros y pasados, próximo, último y cancelaciones del dni
+
+        Devuelve {"futuros", "pasados", "proximo", "ultimo", "cancelaciones"};
+        proximo y ultimo son {"id", "fecha", "horario"} o None. Se responde
+        con el índice, sin leer las particiones.
+        """
+        self.refrescar()
+        return resumen_de_reservas(
+            self.indice.reservas.get(dni, []),
+            self.indice.cancelaciones.get(dni, 0),
+            ahora,
+        )
+
+    def mes_generado(self, mes, anio):
+        """Indica si ya existen turnos para el mes indicado"""
+        self.refrescar()
+        return f"{anio:04d}-{mes:02d}" in self.indice.meses
+
+    def siguiente_id(self):
+        """Devuelve el próximo id numérico libre"""
+        self.refrescar()
+        return self.indice.siguiente_id
+
+    #### MODIFICACIONES ####
+
+    @operacion("turnos.asignar")
+    def asignar(self, id_turno, dni, version=None):
+        """Asigna el turno si sigue libre (y en la versión indicada)
+
+        Devuelve OK, OCUPADO si otra terminal lo tomó o lo modificó, o
+        INEXISTENTE si el turno no existe.
+        """
+        with self.bloqueo:
+            self.refrescar()
+            particion = self._particion_de_id(id_turno)
+            if particion is None:
+                return INEXISTENTE
+            turno = particion.turnos[id_turno]
+            version_actual = turno.get("version", 0)
+            if turno.get("dni_paciente") or (
+                version is not None and version != version_actual
+            ):
+                return OCUPADO
+            # Primero el índice: si se corta entre ambas escrituras el índice
+            # queda con un turno de más, nunca de menos.
+            self.indice.registrar([_operacion_reserva("reserva", id_turno, turno, dni)])
+            particion.registrar(
+                [
+                    {
+                        "op": "asignar",
+                        "id": id_turno,
+                        "dni": dni,
+                        "version": version_actual + 1,
+                        "asignado_en": marca_tiempo(),
+                    }
+                ]
+            )
+            return OK
+
+    @operacion("turnos.asignar_varios")
+    def asignar_varios(self, reservas):
+        """Asigna varios turnos libres con una sola escritura por partición
+
+        reservas es una lista de (id, dni). Devuelve el resultado de
+        cada una (OK, OCUPADO o INEXISTENTE) en el mismo orden; un turno que
+        aparece dos veces queda asignado a la primera.
+        """
+        with self.bloqueo:
+            self.refrescar()
+            resultados = []
+            tomados = set()
+            operaciones_indice = []
+            por_particion = {}
+            asignado_en = marca_tiempo()
+            for id_turno, dni in reservas:
+                particion = self._particion_de_id(id_turno)
+                if particion is None:
+                    resultados.append(INEXISTENTE)
+                    continue
+                turno = particion.turnos[id_turno]
+                if turno.get("dni_paciente") or id_turno in tomados:
+                    resultados.append(OCUPADO)
+                    continue
+                tomados.add(id_turno)
+                operaciones_indice.append(
+                    _operacion_reserva("reserva", id_turno, turno, dni)
+                )
+                por_particion.setdefault(particion, []).append(
+                    {
+                        "op": "asignar",
+                        "id": id_turno,
+                        "dni": dni,
+                        "version": turno.get("version", 0) + 1,
+                        "asignado_en": asignado_en,
+                    }
+                )
+                resultados.append(OK)
+            # Igual que en asignar(): primero el índice y después los turnos
+            if operaciones_indice:
+                self.indice.registrar(operaciones_indice)
+            for particion, operaciones in por_particion.items():
+                particion.registrar(operaciones)
+            return resultados
+
+    @operacion("turnos.liberar")
+    def liberar(self, id_turno, version=None):
+        """Deja el turno disponible si no cambió desde la versión indicada
+
+        Devuelve OK, OCUPADO si otra terminal lo modificó, o INEXISTENTE.
+        """
+        with self.bloqueo:
+            self.refrescar()
+            particion = self._particion_de_id(id_turno)
+            if particion is None:
+                return INEXISTENTE
+            turno = particion.turnos[id_turno]
+            version_actual = turno.get("version", 0)
+            if version is not None and version != version_actual:
+                return OCUPADO
+            dni = turno.get("dni_paciente")
+            particion.registrar(
+                [{"op": "liberar", "id": id_turno, "version": version_actual + 1}]
+            )
+            if dni:
+                # Al revés que en asignar(): después de la partición, para
+                # que el índice nunca quede con un turno de menos
+                cancelacion = _operacion_reserva("cancelacion", id_turno, turno, dni)
+                cancelacion["cancelaciones"] = self.indice.cancelaciones.get(dni, 0) + 1
+                self.indice.registrar([cancelacion])
+            return OK
+
+    @operacion("turnos.abrir_meses")
+    def abrir_meses(self, aperturas):
+        """Genera los turnos libres de varios meses con una sola escritura
+
+        aperturas es una lista de (mes, anio, dias, horarios). Los meses que ya
+        existen se saltean; devuelve la lista de (mes, anio) abiertos. Con el
+        ajuste libres_virtuales solo se guarda la apertura de cada mes; si no,
+        se materializan todos sus turnos.
+        """
+        with self.bloqueo:
+            self.refrescar()
+            siguiente = self.indice.siguiente_id
+            virtuales = usa_libres_virtuales()
+            abiertos = []
+            nuevos = {}
+            operaciones = []
+            for mes, anio, dias, horarios in aperturas:
+                clave = f"{anio:04d}-{mes:02d}"
+                if clave in self.indice.meses:
+                    continue
+                dias = sorted(dias, key=clave_fecha)
+                horarios = sorted(horarios)
+                cantidad = len(dias) * len(horarios)
+                if virtuales:
+                    apertura = {"desde": siguiente, "dias": dias, "horarios": horarios}
+                    ArchivoConDiario(
+                        os.path.join(self.directorio, f"{clave}.json"),
+                        os.path.join(self.directorio, f"{clave}_diario.jsonl"),
+                    ).compactar({"apertura": apertura, "turnos": {}})
+                    operaciones.append(
+                        {
+                            "op": "mes",
+                            "mes": clave,
+                            "desde": siguiente,
+                            "hasta": siguiente + cantidad - 1,
+                        }
+                    )
+                else:
+                    nuevos.update(turnos_libres(siguiente, dias, horarios))
+                siguiente += cantidad
+                abiertos.append((mes, anio))
+            if nuevos:
+                self.agregar(nuevos)
+            if operaciones:
+                self.indice.registrar(operaciones)
+            return abiertos
+
+    @operacion("turnos.agregar")
+    def agregar(self, nuevos):
+        """Agrega un diccionario id -> turno, repartido en sus meses
+
+        Cada mes nuevo se escribe como una partición completa y el índice se
+        actualiza con una sola escritura al final, aunque sean varios meses.
+        """
+        with self.bloqueo:
+            self.refrescar()
+            operaciones = []
+            for mes, turnos_mes in sorted(_agrupar_por_mes(nuevos).items()):
+                desde, hasta = _rango_ids(turnos_mes)
+                if mes in self.indice.meses:
+                    self._particion(mes).registrar(
+                        [{"op": "agregar", "turnos": turnos_mes}]
+                    )
+                    desde = min(desde, self.indice.meses[mes][0])
+                    hasta = max(hasta, self.indice.meses[mes][1])
+                else:
+                    # Mes nuevo: se escribe la partición completa de una vez
+                    ArchivoConDiario(
+                        os.path.join(self.directorio, f"{mes}.json"),
+                        os.path.join(self.directorio, f"{mes}_diario.jsonl"),
+                    ).compactar(turnos_mes)
+                operaciones.append(
+                    {"op": "mes", "mes": mes, "desde": desde, "hasta": hasta}
+                )
+                for id_turno, turno in turnos_mes.items():
+                    if turno.get("dni_paciente"):
+                        operaciones.append(
+                            _operacion_reserva(
+                                "reserva", id_turno, turno, turno["dni_paciente"]
+                            )
+                        )
+            if operaciones:
+                self.indice.registrar(operaciones)
+
+    @operacion("turnos.reemplazar")
+    def reemplazar(self, turnos):
+        """Reemplaza todos los turnos por los indicados"""
+        with self.bloqueo:
+            self.refrescar()
+            self._escribir_todo(turnos)
+
+
+_almacenes = {}
+
+
+def obtener_almacen():
+    """Devuelve el almacén compartido del directorio de datos actual
+
+    Según el ajuste "almacenamiento" es el almacén JSON o el de SQLite.
+    """
+    if usa_sqlite():
+        from almacen_sqlite import RUTA_BASE, AlmacenTurnosSQLite, conectar
+
+        ruta = os.path.abspath(RUTA_BASE)
+        almacen = _almacenes.get(ruta)
+        if almacen is None:
+            almacen = _almacenes[ruta] = AlmacenTurnosSQLite(conectar())
+        return almacen
+
+    ruta = os.path.abspath(DIRECTORIO_DATOS)
+    almacen = _almacenes.get(ruta)
+    if almacen is None:
+        almacen = _almacenes[ruta] = AlmacenTurnos(ruta)
+    return almacen
@@ -0,0 +1,16 @@
+"""
+BENCHMARK DEL SISTEMA DE TURNOS
+
+Genera datos sintéticos a escala (pacientes, años de turnos y configuración)
+en un directorio temporal y mide las funciones más usadas del sistema:
+latencia (p50, p95, p99), memoria pico y tamaño de los archivos de datos.
+Los resultados se guardan en un JSON para comparar corridas.
+
+Uso, desde la raíz del proyecto:
+    python -m benchmark --pacientes 100000 --anios 5 --intervalo 15
+    python -m benchmark --solo-generar --destino /tmp/datos_grandes
+
+- generador.py: datos sintéticos con el formato de data/
+- medicion.py: cronometraje, percentiles, memoria pico y tamaños
+- __main__.py: línea de comandos y casos medidos
+"""
@@ -0,0 +1,211 @@
+"""
+Ejecuta el benchmark: genera los datos, mide cada caso y guarda el JSON.
+
+Todo corre en un directorio temporal (o en una copia del indicado con
+--datos), así que los datos reales de data/ no se tocan. Respeta los ajustes
+de ajustes.py, por ejemplo TURNOS_ALMACENAMIENTO=sqlite.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Los módulos del sistema están en la raíz del proyecto
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from benchmark.generador import generar_datos  # noqa: E402
+from benchmark.medicion import medir, tamanios_archivos  # noqa: E402
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Benchmark del sistema de turnos con datos sintéticos",
+    )
+    parser.add_argument("--pacientes", type=int, default=10000)
+    parser.add_argument("--anios", type=int, default=1, help="años de turnos")
+    parser.add_argument("--intervalo", type=int, default=30, choices=(15, 20, 30))
+    parser.add_argument("--hora-inicio", type=int, default=8)
+    parser.add_argument("--hora-fin", type=int, default=18)
+    parser.add_argument("--ocupacion", type=float, default=0.6)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--datos", help="directorio con data/ ya generado")
+    parser.add_argument("--destino", help="dónde dejar los datos generados")
+    parser.add_argument("--solo-generar", action="store_true")
+    parser.add_argument("--salida", help="archivo JSON de resultados")
+    return parser
+
+
+def casos(repeticiones, azar):
+    """Lista de (nombre, función, argumentos, repeticiones) a medir
+
+    Las funciones que reescriben archivos o generan meses se repiten menos.
+    """
+    from almacen_turnos import obtener_almacen
+    from configuracion import cargar_configuracion, generar_turnos_rango
+    from interfaz_reportes import (
+        escribir_informe,
+        lineas_informe,
+        obtener_turnos_informe,
+    )
+    from pacientes import cargar_pacientes, obtener_paciente
+    from turnos import (
+        cargar_turnos,
+        guardar_turnos,
+        obtener_turnos_disponibles,
+        obtener_turnos_paciente,
+    )
+
+    turnos = cargar_turnos()
+    dnis = list(cargar_pacientes())
+    fechas = sorted({t["fecha"] for t in turnos.values()})
+    meses = sorted({(int(f[3:5]), int(f[6:])) for f in fechas})
+    config = cargar_configuracion()
+    pesadas = max(3, repeticiones // 10)
+
+    # generar_turnos_mes abre cada vez un mes nuevo después del último
+    siguientes = iter(range(1, pesadas + 2))
+    ultimo_mes, ultimo_anio = max(meses, key=lambda m: (m[1], m[0]))
+
+    def mes_nuevo():
+        indice = ultimo_anio * 12 + ultimo_mes - 1 + next(siguientes)
+        mes, anio = indice % 12 + 1, indice // 12
+        return mes, anio, mes, anio, config
+
+    def informe_mes(mes, anio):
+        turnos_mes = [t for _, t in obtener_turnos_informe(mes, anio)]
+        encabezado = f"INFORME DE TURNOS DEL MES {mes:02d}/{anio}"
+        escribir_informe(
+            lineas_informe(encabezado, turnos_mes, False),
+            os.path.join("informes", f"turnos_mes_{mes:02d}_{anio}.txt"),
+        )
+
+    return [
+        ("cargar_turnos", cargar_turnos, lambda: (), repeticiones),
+        ("guardar_turnos", guardar_turnos, lambda: (turnos,), pesadas),
+        (
+            "obtener_turnos_disponibles",
+            obtener_turnos_disponibles,
+            lambda: (azar.choice(fechas),),
+            repeticiones,
+        ),
+        (
+            "obtener_turnos_paciente",
+            obtener_turnos_paciente,
+            lambda: (azar.choice(dnis),),
+            repeticiones,
+        ),
+        (
+            "obtener_paciente",
+            obtener_paciente,
+            lambda: (azar.choice(dnis),),
+            repeticiones,
+        ),
+        ("generar_turnos_mes", generar_turnos_rango, mes_nuevo, pesadas),
+        ("generar_informe", informe_mes, lambda: azar.choice(meses), pesadas),
+        ("compactar", obtener_almacen().compactar, lambda: (), pesadas),
+    ]
+
+
+def ejecutar(args):
+    inicio = time.perf_counter()
+    if args.solo_generar:
+        destino = args.destino or tempfile.mkdtemp(prefix="turnos_datos_")
+        resumen = generar_datos(
+            destino,
+            args.pacientes,
+            args.anios,
+            args.intervalo,
+            args.hora_inicio,
+            args.hora_fin,
+            args.ocupacion,
+            semilla=args.semilla,
+        )
+        print(json.dumps({"destino": destino, **resumen}, ensure_ascii=False))
+        return 0
+
+    salida = os.path.abspath(
+        args.salida or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    trabajo = tempfile.mkdtemp(prefix="turnos_benchmark_")
+    anterior = os.getcwd()
+    try:
+        if args.datos:
+            shutil.copytree(
+                os.path.join(args.datos, "data"), os.path.join(trabajo, "data")
+            )
+            generados = None
+        else:
+            generados = generar_datos(
+                trabajo,
+                args.pacientes,
+                args.anios,
+                args.intervalo,
+                args.hora_inicio,
+                args.hora_fin,
+                args.ocupacion,
+                semilla=args.semilla,
+            )
+        os.chdir(trabajo)
+        archivos_iniciales = tamanios_archivos("data")
+
+        from ajustes import obtener_ajuste, usa_sqlite
+        from almacen_turnos import obtener_almacen
+
+        # Primer uso: se reparte turnos.json en particiones (o se migra a SQLite)
+        preparacion = time.perf_counter()
+        if usa_sqlite():
+            import almacen_sqlite
+
+            almacen_sqlite.migrar_desde_json()
+        obtener_almacen().refrescar()
+        preparacion = time.perf_counter() - preparacion
+
+        azar = random.Random(args.semilla)
+        resultados = {}
+        for nombre, funcion, argumentos, repeticiones in casos(args.repeticiones, azar):
+            resultados[nombre] = medir(funcion, argumentos, repeticiones)
+            r = resultados[nombre]
+            print(
+                f"{nombre:<28} p50 {r['p50_ms']:>9.3f} ms  p95 {r['p95_ms']:>9.3f} ms"
+                f"  p99 {r['p99_ms']:>9.3f} ms  pico {r['memoria_pico_kb']:>9.1f} KB"
+            )
+
+        informe = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": vars(args),
+            "ajustes": {
+                clave: obtener_ajuste(clave)
+                for clave in ("almacenamiento", "libres_virtuales")
+            },
+            "datos_generados": generados,
+            "preparacion_s": round(preparacion, 3),
+            "archivos_iniciales": archivos_iniciales,
+            "archivos_finales": tamanios_archivos("data"),
+            "casos": resultados,
+            "duracion_s": round(time.perf_counter() - inicio, 3),
+        }
+    finally:
+        os.chdir(anterior)
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en: {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(ejecutar(crear_parser().parse_args()))
@@ -0,0 +1,130 @@
+"""
+GENERADOR DE DATOS SINTÉTICOS
+
+Escribe en <directorio>/data los mismos archivos que usa el sistema:
+pacientes.json, configuracion.json y turnos.json (el formato de un solo
+archivo; el almacén lo reparte en particiones por mes la primera vez que se
+usa, igual que con datos reales de versiones anteriores).
+
+Los turnos cubren días laborables de varios años con los horarios de la
+configuración y una fracción de ellos queda asignada a pacientes al azar,
+con algunas cancelaciones y la fecha de reserva días antes del turno.
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from calendario import generar_horarios, obtener_dias_laborables
+
+NOMBRES = (
+    "Ana Juan María Carlos Lucía Pedro Sofía Diego Valentina Martín Camila "
+    "Jorge Paula Lucas Julieta Andrés Florencia Gabriel Romina Nicolás"
+).split()
+APELLIDOS = (
+    "González Rodríguez Gómez Fernández López Díaz Martínez Pérez García "
+    "Sánchez Romero Sosa Álvarez Torres Ruiz Ramírez Flores Benítez Acosta Medina"
+).split()
+DOMINIOS = ("gmail.com", "hotmail.com", "yahoo.com.ar", "outlook.com")
+
+
+def generar_pacientes(cantidad, azar):
+    """Diccionario dni -> datos con DNI únicos de 8 dígitos"""
+    pacientes = {}
+    for dni in azar.sample(range(10_000_000, 99_999_999), cantidad):
+        nombre = azar.choice(NOMBRES)
+        apellido = azar.choice(APELLIDOS)
+        pacientes[str(dni)] = {
+            "nombre": nombre,
+            "apellido": apellido,
+            "telefono": f"11{azar.randrange(10**8):08d}",
+            "email": f"{nombre.lower()}.{dni}@{azar.choice(DOMINIOS)}",
+        }
+    return pacientes
+
+
+def generar_turnos(pacientes, config, desde_anio, anios, ocupacion, azar):
+    """Diccionario id -> turno de todos los meses del rango"""
+    horarios = generar_horarios(
+        config["hora_inicio"], config["hora_fin"], config["intervalo_minutos"]
+    )
+    dnis = list(pacientes)
+    turnos = {}
+    id_turno = 1
+    for anio in range(desde_anio, desde_anio + anios):
+        for mes in range(1, 13):
+            for fecha in obtener_dias_laborables(mes, anio):
+                dia = datetime.strptime(fecha, "%d/%m/%Y")
+                for horario in horarios:
+                    turno = {
+                        "dni_paciente": "",
+                        "fecha": fecha,
+                        "horario": horario,
+                        "version": 0,
+                    }
+                    if azar.random() < ocupacion:
+                        dni = azar.choice(dnis)
+                        reserva = dia - timedelta(
+                            days=azar.randint(0, 60), minutes=azar.randint(0, 1439)
+                        )
+                        turno["dni_paciente"] = dni
+                        turno["version"] = 1
+                        turno["asignado_en"] = reserva.isoformat(
+                            sep=" ", timespec="seconds"
+                        )
+                    if azar.random() < 0.05:
+                        turno["cancelaciones"] = 1
+                        turno["version"] += 2
+                    turnos[str(id_turno)] = turno
+                    id_turno += 1
+    return turnos
+
+
+def generar_datos(
+    directorio,
+    pacientes=1000,
+    anios=1,
+    intervalo=30,
+    hora_inicio=8,
+    hora_fin=18,
+    ocupacion=0.6,
+    desde_anio=None,
+    semilla=1,
+):
+    """Genera los archivos de datos en <directorio>/data
+
+    Por defecto los años empiezan de modo que la mitad queda en el pasado y
+    la mitad en el futuro. Devuelve las cantidades generadas y el rango.
+    """
+    azar = random.Random(semilla)
+    if desde_anio is None:
+        desde_anio = datetime.now().year - anios // 2
+    config = {
+        "hora_inicio": hora_inicio,
+        "hora_fin": hora_fin,
+        "intervalo_minutos": intervalo,
+    }
+    datos_pacientes = generar_pacientes(pacientes, azar)
+    datos_turnos = generar_turnos(
+        datos_pacientes, config, desde_anio, anios, ocupacion, azar
+    )
+
+    carpeta = os.path.join(directorio, "data")
+    os.makedirs(carpeta, exist_ok=True)
+    for nombre, datos in (
+        ("pacientes.json", datos_pacientes),
+        ("configuracion.json", config),
+        ("turnos.json", datos_turnos),
+    ):
+        with open(os.path.join(carpeta, nombre), "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+
+    return {
+        "pacientes": len(datos_pacientes),
+        "turnos": len(datos_turnos),
+        "asignados": sum(1 for t in datos_turnos.values() if t["dni_paciente"]),
+        "desde_anio": desde_anio,
+        "hasta_anio": desde_anio + anios - 1,
+        "configuracion": config,
+    }
@@ -0,0 +1,68 @@
+"""
+MEDICIÓN
+
+Cronometra una función varias veces con perf_counter y resume las
+latencias en milisegundos. La memoria pico se toma en una ejecución aparte
+con tracemalloc, para que su costo no se sume a los tiempos.
+"""
+
+import os
+import statistics
+import time
+import tracemalloc
+
+
+def resumir(tiempos):
+    """Mínimo, promedio, p50, p95, p99 y máximo (ms) de una lista de segundos"""
+    ms = sorted(t * 1000 for t in tiempos)
+    if len(ms) > 1:
+        cuantiles = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = cuantiles[49], cuantiles[94], cuantiles[98]
+    else:
+        p50 = p95 = p99 = ms[0]
+    return {
+        "ejecuciones": len(ms),
+        "min_ms": round(ms[0], 3),
+        "promedio_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def medir(funcion, argumentos, repeticiones):
+    """Mide funcion(*argumentos()) repeticiones veces
+
+    argumentos es una función que devuelve la tupla de argumentos de cada
+    ejecución (por ejemplo, un DNI distinto cada vez); se llama fuera del
+    tiempo medido. La primera ejecución se informa aparte porque incluye la
+    carga de archivos que las siguientes encuentran en memoria.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        args = argumentos()
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    resultado = {"primera_ms": round(tiempos[0] * 1000, 3), **resumir(tiempos)}
+
+    args = argumentos()
+    tracemalloc.start()
+    try:
+        funcion(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    resultado["memoria_pico_kb"] = round(pico / 1024, 1)
+    return resultado
+
+
+def tamanios_archivos(directorio):
+    """Tamaño en bytes de cada archivo bajo el directorio, con ruta relativa"""
+    tamanios = {}
+    for raiz, _, archivos in os.walk(directorio):
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            tamanios[os.path.relpath(ruta, directorio)] = os.path.getsize(ruta)
+    return dict(sorted(tamanios.items()))
@@ -0,0 +1,59 @@
+"""
+BLOQUEO ENTRE PROCESOS
+
+Permite que varias terminales de recepción trabajen sobre el mismo
+directorio data/ sin pisarse: las modificaciones de los archivos se hacen
+dentro de un bloqueo exclusivo sobre un archivo auxiliar (.lock).
+
+El bloqueo es reentrante dentro del mismo proceso y se mantiene solo
+mientras dura la escritura, nunca durante la interacción con el usuario.
+"""
+
+import os
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo sobre un archivo, usable con 'with'"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = None
+        self._nivel = 0
+
+    def __enter__(self):
+        if self._nivel == 0:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            archivo = open(self.ruta, "a+b")
+            try:
+                if os.name == "nt":
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                archivo.close()
+                raise
+            self._archivo = archivo
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            archivo, self._archivo = self._archivo, None
+            try:
+                if os.name == "nt":
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+            finally:
+                archivo.close()
+        return False
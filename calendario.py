@@ -0,0 +1,42 @@
+"""
+CALENDARIO DEL CONSULTORIO
+
+Días laborables de un mes, horarios de atención de un día y orden de
+fechas 'dd/mm/aaaa'. No depende de ningún otro módulo del sistema, así lo
+pueden usar tanto la configuración como el almacén de turnos.
+"""
+
+from datetime import datetime, timedelta
+
+
+def clave_fecha(fecha):
+    """Convierte 'dd/mm/aaaa' en 'aaaammdd' para ordenar cronológicamente"""
+    return fecha[6:] + fecha[3:5] + fecha[:2]
+
+
+def generar_horarios(hora_inicio, hora_fin, intervalo):
+    horarios = []
+    hora = hora_inicio
+    minutos = 0
+    while hora < hora_fin:
+        horarios.append(f"{hora:02d}:{minutos:02d}")
+        minutos += intervalo
+        if minutos >= 60:
+            hora += 1
+            minutos = 0
+    return horarios
+
+
+def obtener_dias_laborables(mes, anio):
+    primer_dia = datetime(anio, mes, 1)
+    if mes == 12:
+        ultimo_dia = datetime(anio + 1, 1, 1) - timedelta(days=1)
+    else:
+        ultimo_dia = datetime(anio, mes + 1, 1) - timedelta(days=1)
+    dias = []
+    actual = primer_dia
+    while actual <= ultimo_dia:
+        if actual.weekday() < 5:
+            dias.append(actual.strftime("%d/%m/%Y"))
+        actual += timedelta(days=1)
+    return dias
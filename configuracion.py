@@ -1,29 +1,13 @@
 import json
 import os
-import shutil
-from datetime import datetime, timedelta
-
-# FUNCIONES DE PANTALLA
-
-
-def limpiar_pantalla():
-    os.system("cls" if os.name == "nt" else "clear")
-
-
-def centrar_texto(texto):
-    try:
-        ancho_terminal = shutil.get_terminal_size().columns
-    except:
-        ancho_terminal = 80
-    if len(texto) >= ancho_terminal:
-        return texto
-    espacios = (ancho_terminal - len(texto)) // 2
-    return " " * espacios + texto
-
-
-def pausar():
-    input(centrar_texto("Presione Enter para continuar..."))
+import time
+from datetime import datetime
 
+from ajustes import usa_sqlite
+from almacen_turnos import obtener_almacen
+from calendario import generar_horarios, obtener_dias_laborables
+from pantalla import centrar_texto, limpiar_pantalla, pausar
+from traza import accion, contar, operacion
 
 #### MENÚ DE CONFIGURACIÓN Y LOGICA ####
 
@@ -36,16 +20,19 @@ def menu_configuracion():
         print(centrar_texto("=" * 50))
         print()
         print(centrar_texto("1. Generar turnos del mes"))
-        print(centrar_texto("2. Configurar horarios"))
-        print(centrar_texto("3. Volver al menú principal"))
+        print(centrar_texto("2. Generar turnos de varios meses"))
+        print(centrar_texto("3. Configurar horarios"))
+        print(centrar_texto("4. Volver al menú principal"))
         print()
-        opcion = input(centrar_texto("Seleccione una opción (1-3): ")).strip()
+        opcion = input(centrar_texto("Seleccione una opción (1-4): ")).strip()
         match opcion:
             case "1":
                 generar_turnos_mes()
             case "2":
-                configurar_horarios()
+                generar_turnos_varios_meses()
             case "3":
+                configurar_horarios()
+            case "4":
                 break
             case _:
                 print(centrar_texto("❌ Opción inválida"))
@@ -55,41 +42,35 @@ def menu_configuracion():
 #### FUNCIONES DE ARCHIVO ####
 
 
+@operacion("configuracion.cargar")
 def cargar_configuracion():
     try:
+        if usa_sqlite():
+            import almacen_sqlite
+
+            return almacen_sqlite.cargar_configuracion()
         if os.path.exists("data/configuracion.json"):
             with open("data/configuracion.json", "r", encoding="utf-8") as f:
-                return json.load(f)
+                config = json.load(f)
+                contar(leidos=f.tell(), cargas=1)
+            return config
         return None
     except:
         return None
 
 
+@operacion("configuracion.guardar")
 def guardar_configuracion(config):
     try:
+        if usa_sqlite():
+            import almacen_sqlite
+
+            almacen_sqlite.guardar_configuracion(config)
+            return True
         os.makedirs("data", exist_ok=True)
         with open("data/configuracion.json", "w", encoding="utf-8") as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
-        return True
-    except:
-        return False
-
-
-def cargar_turnos():
-    try:
-        if os.path.exists("data/turnos.json"):
-            with open("data/turnos.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-    except:
-        return {}
-
-
-def guardar_turnos(turnos):
-    try:
-        os.makedirs("data", exist_ok=True)
-        with open("data/turnos.json", "w", encoding="utf-8") as f:
-            json.dump(turnos, f, ensure_ascii=False, indent=2)
+            contar(escritos=f.tell())
         return True
     except:
         return False
@@ -98,47 +79,74 @@ def guardar_turnos(turnos):
 #### FUNCIONES AUXILIARES ####
 
 
-def obtener_siguiente_id():
-    turnos = cargar_turnos()
-    if not turnos:
-        return 1
-    ids = [
-        int(k) for k in turnos.keys() if k.isdigit()
-    ]  # convierto en lista las claves de turnos.
-    return max(ids) + 1 if ids else 1
-
-
-def generar_horarios(hora_inicio, hora_fin, intervalo):
-    horarios = []
-    hora = hora_inicio
-    minutos = 0
-    while hora < hora_fin:
-        horarios.append(f"{hora:02d}:{minutos:02d}")
-        minutos += intervalo
-        if minutos >= 60:
-            hora += 1
-            minutos = 0
-    return horarios
-
-
-def obtener_dias_laborables(mes, anio):
-    primer_dia = datetime(anio, mes, 1)
-    if mes == 12:
-        ultimo_dia = datetime(anio + 1, 1, 1) - timedelta(days=1)
-    else:
-        ultimo_dia = datetime(anio, mes + 1, 1) - timedelta(days=1)
-    dias = []
-    actual = primer_dia
-    while actual <= ultimo_dia:
-        if actual.weekday() < 5:
-            dias.append(actual.strftime("%d/%m/%Y"))
-        actual += timedelta(days=1)
-    return dias
+def establecer_horarios(hora_inicio, hora_fin, intervalo):
+    """Valida y guarda la configuración de horarios; devuelve (ok, mensaje)"""
+    if hora_inicio < 1 or hora_inicio > 23:
+        return False, "Hora de inicio inválida"
+    if hora_fin <= hora_inicio or hora_fin > 23:
+        return False, "Hora de fin inválida"
+    if intervalo not in (15, 20, 30):
+        return False, "El intervalo debe ser de 15, 20 o 30 minutos"
+    config = {
+        "hora_inicio": hora_inicio,
+        "hora_fin": hora_fin,
+        "intervalo_minutos": intervalo,
+    }
+    if not guardar_configuracion(config):
+        return False, "Error al guardar"
+    return True, "Configuración guardada"
+
+
+def meses_en_rango(mes_desde, anio_desde, mes_hasta, anio_hasta):
+    """Lista de (mes, anio) entre dos meses, ambos incluidos"""
+    inicio = anio_desde * 12 + mes_desde - 1
+    fin = anio_hasta * 12 + mes_hasta - 1
+    return [(i % 12 + 1, i // 12) for i in range(inicio, fin + 1)]
+
+
+def validar_rango_meses(mes_desde, anio_desde, mes_hasta, anio_hasta):
+    """Devuelve el motivo por el que el rango no puede generarse, o None"""
+    anio_actual = datetime.now().year
+    if not (1 <= mes_desde <= 12 and 1 <= mes_hasta <= 12):
+        return "Mes inválido"
+    if anio_desde < anio_actual:
+        return f"El año debe ser mayor o igual a {anio_actual}"
+    if (anio_hasta, mes_hasta) < (anio_desde, mes_desde):
+        return "El mes final no puede ser anterior al inicial"
+    return None
+
+
+def generar_turnos_rango(mes_desde, anio_desde, mes_hasta, anio_hasta, config):
+    """Genera los turnos de un rango de meses salteando los ya generados
+
+    Los meses existentes se detectan con el índice de meses del almacén y
+    todos los nuevos se guardan con una única escritura. Devuelve una lista
+    de (mes, anio, generados), con generados en None para los meses que ya
+    existían, y los segundos que llevó la generación.
+    """
+    inicio = time.perf_counter()
+    almacen = obtener_almacen()
+    horarios = generar_horarios(
+        config["hora_inicio"], config["hora_fin"], config["intervalo_minutos"]
+    )
+    meses = meses_en_rango(mes_desde, anio_desde, mes_hasta, anio_hasta)
+    aperturas = [
+        (m, a, obtener_dias_laborables(m, a), horarios)
+        for m, a in meses
+        if not almacen.mes_generado(m, a)
+    ]
+    abiertos = set(almacen.abrir_meses(aperturas))
+    cantidades = {(m, a): len(dias) * len(horarios) for m, a, dias, _ in aperturas}
+    resumen = [
+        (m, a, cantidades[(m, a)] if (m, a) in abiertos else None) for m, a in meses
+    ]
+    return resumen, time.perf_counter() - inicio
 
 
 # GENERAR TURNOS DEL MES
 
 
+@accion
 def generar_turnos_mes():
     limpiar_pantalla()
     print(centrar_texto("=== GENERAR TURNOS DEL MES ==="))
@@ -167,8 +175,9 @@ def generar_turnos_mes():
         if anio_input == "0":
             return
         anio = int(anio_input)
-        if anio < anio_actual:
-            print(centrar_texto(f"❌ El año debe ser mayor o igual a {anio_actual}"))
+        error = validar_rango_meses(mes, anio, mes, anio)
+        if error:
+            print(centrar_texto(f"❌ {error}"))
             pausar()
             return
 
@@ -177,39 +186,30 @@ def generar_turnos_mes():
         pausar()
         return
 
-    turnos = cargar_turnos()
+    almacen = obtener_almacen()
 
-    for t in turnos.values():
-        fecha = t.get("fecha", "")
-        if fecha.endswith(f"/{mes:02d}/{anio}"):
-            print()
-            print(
-                centrar_texto(
-                    f"⚠️ Ya fueron generados los turnos del mes {mes:02d} año {anio}"
-                )
+    if almacen.mes_generado(mes, anio):
+        print()
+        print(
+            centrar_texto(
+                f"⚠️ Ya fueron generados los turnos del mes {mes:02d} año {anio}"
             )
-            pausar()
-            return
+        )
+        pausar()
+        return
 
     dias = obtener_dias_laborables(mes, anio)
     horarios = generar_horarios(
         config["hora_inicio"], config["hora_fin"], config["intervalo_minutos"]
     )
-    siguiente_id = obtener_siguiente_id()
-    generados = 0
-
-    for fecha in dias:
-        for horario in horarios:
-            turnos[str(siguiente_id)] = {
-                "dni_paciente": "",
-                "fecha": fecha,
-                "horario": horario,
-                "paciente_nombre": "",
-            }
-            siguiente_id += 1
-            generados += 1
-
-    if guardar_turnos(turnos):
+    generados = len(dias) * len(horarios)
+
+    try:
+        guardado = bool(almacen.abrir_meses([(mes, anio, dias, horarios)]))
+    except Exception:
+        guardado = False
+
+    if guardado:
         limpiar_pantalla()
         print(centrar_texto("=== TURNOS GENERADOS EXITOSAMENTE ==="))
         print(centrar_texto(f"Mes: {mes:02d}/{anio}"))
@@ -221,9 +221,70 @@ def generar_turnos_mes():
     pausar()
 
 
+@accion
+def generar_turnos_varios_meses():
+    limpiar_pantalla()
+    print(centrar_texto("=== GENERAR TURNOS DE VARIOS MESES ==="))
+    print()
+
+    config = cargar_configuracion()
+    if not config:
+        print(centrar_texto("❌ Primero debe configurar los horarios"))
+        pausar()
+        return
+
+    try:
+        valores = []
+        for etiqueta in (
+            "Mes inicial (1-12)",
+            "Año inicial",
+            "Mes final (1-12)",
+            "Año final",
+        ):
+            valor = input(centrar_texto(f"{etiqueta} o 0 para volver: ")).strip()
+            if valor == "0":
+                return
+            valores.append(int(valor))
+    except ValueError:
+        print(centrar_texto("❌ Ingrese números válidos"))
+        pausar()
+        return
+
+    mes_desde, anio_desde, mes_hasta, anio_hasta = valores
+    error = validar_rango_meses(mes_desde, anio_desde, mes_hasta, anio_hasta)
+    if error:
+        print(centrar_texto(f"❌ {error}"))
+        pausar()
+        return
+
+    try:
+        resumen, segundos = generar_turnos_rango(
+            mes_desde, anio_desde, mes_hasta, anio_hasta, config
+        )
+    except Exception:
+        print(centrar_texto("❌ Error al guardar turnos"))
+        pausar()
+        return
+
+    limpiar_pantalla()
+    print(centrar_texto("=== TURNOS GENERADOS ==="))
+    print()
+    total = 0
+    for mes, anio, generados in resumen:
+        if generados is None:
+            print(centrar_texto(f"{mes:02d}/{anio}: ya generado, se omitió"))
+        else:
+            print(centrar_texto(f"{mes:02d}/{anio}: {generados} turnos"))
+            total += generados
+    print()
+    print(centrar_texto(f"Total generado: {total} turnos en {segundos:.2f} s"))
+    pausar()
+
+
 #### CONFIGURAR HORARIOS ####
 
 
+@accion
 def configurar_horarios():
     limpiar_pantalla()
     print(centrar_texto("=== CONFIGURAR HORARIOS ==="))
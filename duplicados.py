@@ -0,0 +1,201 @@
+"""
+PACIENTES DUPLICADOS
+
+Busca pacientes que probablemente sean la misma persona cargada dos veces
+(un DNI mal tipeado, el apellido escrito de otra forma, etc.).
+
+Comparar todos contra todos crece con el cuadrado de la cantidad de
+pacientes, así que cada paciente se reparte primero en bloques por claves
+baratas de calcular:
+
+- teléfono: los últimos 8 dígitos del teléfono normalizado
+- email: la parte anterior a la @, sin puntos ni sufijos "+algo"
+- DNI: el DNI completo y el DNI sin cada uno de sus dígitos, de modo que
+  dos DNI con un dígito cambiado, de más o dos vecinos invertidos comparten
+  un bloque
+
+y solo se comparan los pacientes que comparten algún bloque. Un bloque con
+más de MAXIMO_BLOQUE pacientes (un teléfono o un usuario de email de una
+institución) no distingue a nadie: se omite y se informa.
+
+Un nombre igual no alcanza porque hay muchos homónimos: un par es candidato
+si coincide el teléfono o el email y el nombre completo se parece al menos
+en SIMILITUD_MINIMA, o si el DNI es casi igual y el nombre se parece al
+menos en SIMILITUD_NOMBRE (entre miles de DNI hay muchos casi iguales por
+azar). Por eso no hay bloques por apellido: cada candidato ya comparte
+alguno de los bloques de arriba, y los de apellido (miles de pacientes con
+un apellido común) sumaban casi todas las comparaciones sin aportar pares.
+"""
+
+import time
+from difflib import SequenceMatcher
+
+from almacen_turnos import obtener_almacen
+from indice_pacientes import normalizar, normalizar_telefono
+from traza import operacion
+
+DIGITOS_TELEFONO = 8
+MAXIMO_BLOQUE = 200
+
+# Similitud del nombre completo (0 a 1): mínima para un candidato y a partir
+# de la cual se informa como "nombre similar"
+SIMILITUD_MINIMA = 0.6
+SIMILITUD_NOMBRE = 0.85
+
+
+def usuario_email(email):
+    """Parte local del email sin puntos ni sufijo "+etiqueta" """
+    local = email.strip().lower().partition("@")[0]
+    return local.partition("+")[0].replace(".", "")
+
+
+def ficha(datos):
+    """Datos normalizados que se usan para formar bloques y comparar"""
+    return {
+        "nombre": normalizar(f"{datos['apellido']} {datos['nombre']}"),
+        "telefono": normalizar_telefono(datos["telefono"]),
+        "email": datos["email"].strip().lower(),
+        "usuario": usuario_email(datos["email"]),
+    }
+
+
+def claves_bloqueo(dni, datos):
+    """Claves de los bloques del paciente, a partir de su ficha"""
+    variantes = [dni] + [dni[:i] + dni[i + 1 :] for i in range(len(dni))]
+    # Dígitos repetidos dan la misma variante más de una vez
+    claves = [("dni", variante) for variante in dict.fromkeys(variantes)]
+    if len(datos["telefono"]) >= DIGITOS_TELEFONO:
+        claves.append(("telefono", datos["telefono"][-DIGITOS_TELEFONO:]))
+    if datos["usuario"]:
+        claves.append(("email", datos["usuario"]))
+    return claves
+
+
+def dni_parecido(dni_a, dni_b):
+    """Un dígito distinto, dos dígitos vecinos invertidos o uno de más/menos"""
+    if len(dni_a) == len(dni_b):
+        distintos = [i for i, (a, b) in enumerate(zip(dni_a, dni_b)) if a != b]
+        if len(distintos) == 1:
+            return True
+        return (
+            len(distintos) == 2
+            and distintos[1] == distintos[0] + 1
+            and dni_a[distintos[0]] == dni_b[distintos[1]]
+            and dni_a[distintos[1]] == dni_b[distintos[0]]
+        )
+    corto, largo = sorted((dni_a, dni_b), key=len)
+    if len(largo) - len(corto) != 1:
+        return False
+    return any(largo[:i] + largo[i + 1 :] == corto for i in range(len(largo)))
+
+
+def comparar(dni_a, ficha_a, dni_b, ficha_b):
+    """(similitud, motivos) si el par es candidato a duplicado, o None
+
+    Recibe las fichas de ficha(), no los datos tal como se guardan.
+    """
+    motivos = []
+    if ficha_a["telefono"] and ficha_a["telefono"] == ficha_b["telefono"]:
+        motivos.append("mismo teléfono")
+    if ficha_a["email"] == ficha_b["email"]:
+        motivos.append("mismo email")
+    elif ficha_a["usuario"] and ficha_a["usuario"] == ficha_b["usuario"]:
+        motivos.append("mismo usuario de email")
+    if dni_parecido(dni_a, dni_b):
+        motivos.append("DNI parecido")
+    if not motivos:
+        return None
+
+    comparador = SequenceMatcher(None, ficha_a["nombre"], ficha_b["nombre"])
+    if comparador.real_quick_ratio() < SIMILITUD_MINIMA:
+        return None
+    similitud = comparador.ratio()
+    if similitud < SIMILITUD_MINIMA:
+        return None
+    if similitud < SIMILITUD_NOMBRE and motivos == ["DNI parecido"]:
+        return None
+    if similitud >= SIMILITUD_NOMBRE:
+        motivos.insert(0, "nombre similar" if similitud < 1 else "mismo nombre")
+    return similitud, motivos
+
+
+@operacion("duplicados.detectar")
+def detectar_duplicados(pacientes):
+    """Pares de pacientes candidatos a ser la misma persona
+
+    Devuelve un diccionario con los pares (primero los de más motivos y
+    nombres más parecidos; cada uno con los DNI, la similitud y los
+    motivos), la cantidad de bloques y de comparaciones hechas, los bloques
+    omitidos por grandes y el tiempo en segundos.
+    """
+    inicio = time.perf_counter()
+    fichas = {dni: ficha(datos) for dni, datos in pacientes.items()}
+    bloques = {}
+    for dni, datos in fichas.items():
+        for clave in claves_bloqueo(dni, datos):
+            bloques.setdefault(clave, []).append(dni)
+
+    comparados = set()
+    pares = []
+    omitidos = []
+    for clave, dnis in bloques.items():
+        if len(dnis) < 2:
+            continue
+        if len(dnis) > MAXIMO_BLOQUE:
+            omitidos.append({"clave": ":".join(clave), "pacientes": len(dnis)})
+            continue
+        for i, dni_a in enumerate(dnis):
+            for dni_b in dnis[i + 1 :]:
+                primero, segundo = sorted((dni_a, dni_b))
+                # Un mismo par puede compartir varios bloques
+                if (primero, segundo) in comparados:
+                    continue
+                comparados.add((primero, segundo))
+                resultado = comparar(primero, fichas[primero], segundo, fichas[segundo])
+                if resultado is not None:
+                    similitud, motivos = resultado
+                    pares.append(
+                        {
+                            "dni_a": primero,
+                            "dni_b": segundo,
+                            "similitud": round(similitud, 3),
+                            "motivos": motivos,
+                        }
+                    )
+
+    pares.sort(key=lambda p: (-len(p["motivos"]), -p["similitud"], p["dni_a"]))
+    omitidos.sort(key=lambda b: -b["pacientes"])
+    return {
+        "pacientes": len(pacientes),
+        "bloques": sum(1 for dnis in bloques.values() if len(dnis) > 1),
+        "comparaciones": len(comparados),
+        "pares": pares,
+        "bloques_omitidos": omitidos,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def contar_turnos(dnis):
+    """Cantidad de turnos asignados de cada DNI (solo de los pedidos)"""
+    almacen = obtener_almacen()
+    cantidades = {}
+    for dni in dnis:
+        resumen = almacen.resumen_paciente(dni)
+        cantidades[dni] = resumen["futuros"] + resumen["pasados"]
+    return cantidades
+
+
+def informe_duplicados(pacientes):
+    """detectar_duplicados con el nombre y la cantidad de turnos de cada DNI"""
+    resultado = detectar_duplicados(pacientes)
+    turnos = contar_turnos(
+        {p["dni_a"] for p in resultado["pares"]}
+        | {p["dni_b"] for p in resultado["pares"]}
+    )
+    for par in resultado["pares"]:
+        for lado in ("a", "b"):
+            dni = par[f"dni_{lado}"]
+            datos = pacientes[dni]
+            par[f"nombre_{lado}"] = f"{datos['nombre']} {datos['apellido']}"
+            par[f"turnos_{lado}"] = turnos[dni]
+    return resultado
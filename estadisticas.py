@@ -0,0 +1,254 @@
+"""
+ESTADÍSTICAS DE OCUPACIÓN
+
+Calcula qué tan llena está la agenda en un rango de meses: ocupación por
+día, por día de la semana, por franja horaria y por mes, la tasa de
+cancelación y la anticipación con que se reservan los turnos.
+
+Los turnos se recorren una sola vez y se pasan a columnas paralelas
+(array de la biblioteca estándar): día, día de la semana, hora, mes,
+asignado, cancelaciones y anticipación. Cada agrupación es después una
+suma por clave sobre esas columnas; si numpy está instalado se resuelve
+con bincount sin volver a recorrer los turnos en Python.
+
+La anticipación es el tiempo entre la reserva (asignado_en) y el turno; los
+turnos asignados antes de que se registrara ese dato no la tienen y quedan
+fuera de ese cálculo.
+"""
+
+import csv
+import os
+import time
+from array import array
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy es opcional: sin él las sumas se hacen recorriendo las columnas
+    np = None
+
+from almacen_turnos import obtener_almacen
+from configuracion import meses_en_rango
+from traza import operacion
+
+DIAS_SEMANA = (
+    "Lunes",
+    "Martes",
+    "Miércoles",
+    "Jueves",
+    "Viernes",
+    "Sábado",
+    "Domingo",
+)
+
+COLUMNAS_CSV = (
+    "grupo",
+    "clave",
+    "turnos",
+    "asignados",
+    "ocupacion_pct",
+    "cancelaciones",
+    "anticipacion_promedio_dias",
+)
+
+
+class ColumnasTurnos:
+    """Turnos de un rango como columnas paralelas, una posición por turno
+
+    Día y mes se guardan como posición desde el primer mes del rango, de modo
+    que sirven directamente de clave para las sumas por grupo.
+    """
+
+    def __init__(self, mes_desde, anio_desde):
+        self.primer_dia = date(anio_desde, mes_desde, 1).toordinal()
+        self.primer_mes = anio_desde * 12 + mes_desde - 1
+        self.dia = array("l")
+        self.dia_semana = array("l")  # 0 = lunes
+        self.hora = array("l")  # hora de inicio (franja de una hora)
+        self.mes = array("l")
+        self.asignado = array("l")  # 1 si está asignado
+        self.cancelaciones = array("l")
+        self.con_anticipacion = array("l")  # 1 si se conoce la anticipación
+        self.anticipacion = array("d")  # días entre la reserva y el turno
+        self._ordinales = {}
+
+    def __len__(self):
+        return len(self.dia)
+
+    def _ordinal(self, fecha):
+        ordinal = self._ordinales.get(fecha)
+        if ordinal is None:
+            ordinal = date(int(fecha[6:]), int(fecha[3:5]), int(fecha[:2])).toordinal()
+            self._ordinales[fecha] = ordinal
+        return ordinal
+
+    def agregar(self, turno):
+        fecha = turno["fecha"]
+        ordinal = self._ordinal(fecha)
+        hora, minutos = int(turno["horario"][:2]), int(turno["horario"][3:5])
+        asignado = bool(turno.get("dni_paciente"))
+        self.dia.append(ordinal - self.primer_dia)
+        self.dia_semana.append((ordinal - 1) % 7)
+        self.hora.append(hora)
+        self.mes.append(int(fecha[6:]) * 12 + int(fecha[3:5]) - 1 - self.primer_mes)
+        self.asignado.append(asignado)
+        self.cancelaciones.append(turno.get("cancelaciones", 0))
+        anticipacion = 0.0
+        if asignado and turno.get("asignado_en"):
+            reserva = datetime.fromisoformat(turno["asignado_en"])
+            minutos_turno = (ordinal * 24 + hora) * 60 + minutos
+            minutos_reserva = (
+                reserva.toordinal() * 24 + reserva.hour
+            ) * 60 + reserva.minute
+            anticipacion = max(0, minutos_turno - minutos_reserva) / 1440
+            self.con_anticipacion.append(1)
+        else:
+            self.con_anticipacion.append(0)
+        self.anticipacion.append(anticipacion)
+
+
+def _sumar_por(claves, largo, pesos=None):
+    """Suma los pesos (o cuenta, sin pesos) por clave entera de 0 a largo - 1"""
+    if np is not None:
+        return np.bincount(
+            np.frombuffer(claves, dtype=claves.typecode),
+            weights=None if pesos is None else np.frombuffer(pesos, pesos.typecode),
+            minlength=largo,
+        ).tolist()
+    totales = [0] * largo
+    if pesos is None:
+        for clave in claves:
+            totales[clave] += 1
+    else:
+        for clave, peso in zip(claves, pesos):
+            totales[clave] += peso
+    return totales
+
+
+def _agrupar(columnas, claves, largo, etiqueta):
+    """Filas de ocupación, cancelaciones y anticipación promedio por grupo"""
+    turnos = _sumar_por(claves, largo)
+    asignados = _sumar_por(claves, largo, columnas.asignado)
+    cancelaciones = _sumar_por(claves, largo, columnas.cancelaciones)
+    reservas = _sumar_por(claves, largo, columnas.con_anticipacion)
+    dias = _sumar_por(claves, largo, columnas.anticipacion)
+    return [
+        {
+            "clave": etiqueta(i),
+            "turnos": int(turnos[i]),
+            "asignados": int(asignados[i]),
+            "ocupacion_pct": round(100 * asignados[i] / turnos[i], 1),
+            "cancelaciones": int(cancelaciones[i]),
+            "anticipacion_promedio_dias": (
+                round(dias[i] / reservas[i], 1) if reservas[i] else None
+            ),
+        }
+        for i in range(largo)
+        if turnos[i]
+    ]
+
+
+def _resumen_anticipacion(columnas):
+    """Promedio, mediana y percentil 90 (en días) de la anticipación conocida"""
+    if np is not None:
+        valores = np.frombuffer(columnas.anticipacion, dtype="d")
+        conocidas = np.frombuffer(columnas.con_anticipacion, dtype="l") == 1
+        valores = np.sort(valores[conocidas]).tolist()
+    else:
+        valores = sorted(
+            v for v, c in zip(columnas.anticipacion, columnas.con_anticipacion) if c
+        )
+    if not valores:
+        return {"reservas": 0, "promedio": None, "mediana": None, "p90": None}
+    return {
+        "reservas": len(valores),
+        "promedio": round(sum(valores) / len(valores), 1),
+        "mediana": round(valores[(len(valores) - 1) // 2], 1),
+        "p90": round(valores[min(len(valores) - 1, len(valores) * 9 // 10)], 1),
+    }
+
+
+def leer_columnas(mes_desde, anio_desde, mes_hasta, anio_hasta):
+    """Recorre una vez los turnos de los meses del rango y arma las columnas"""
+    almacen = obtener_almacen()
+    columnas = ColumnasTurnos(mes_desde, anio_desde)
+    for mes, anio in meses_en_rango(mes_desde, anio_desde, mes_hasta, anio_hasta):
+        for turno in almacen.turnos_de_mes(mes, anio):
+            columnas.agregar(turno)
+    return columnas
+
+
+@operacion("informes.ocupacion")
+def calcular_ocupacion(mes_desde, anio_desde, mes_hasta, anio_hasta):
+    """Ocupación, cancelaciones y anticipación de un rango de meses
+
+    Devuelve un diccionario con los totales, la anticipación resumida y las
+    filas por mes, día, día de la semana y franja horaria, o None si el
+    rango no tiene turnos generados.
+    """
+    inicio = time.perf_counter()
+    columnas = leer_columnas(mes_desde, anio_desde, mes_hasta, anio_hasta)
+    if not len(columnas):
+        return None
+
+    primer_dia, primer_mes = columnas.primer_dia, columnas.primer_mes
+    asignados = sum(columnas.asignado)
+    cancelaciones = sum(columnas.cancelaciones)
+    reservas = asignados + cancelaciones
+    return {
+        "turnos": len(columnas),
+        "asignados": asignados,
+        "ocupacion_pct": round(100 * asignados / len(columnas), 1),
+        "cancelaciones": cancelaciones,
+        "tasa_cancelacion_pct": (
+            round(100 * cancelaciones / reservas, 1) if reservas else 0.0
+        ),
+        "anticipacion_dias": _resumen_anticipacion(columnas),
+        "por_mes": _agrupar(
+            columnas,
+            columnas.mes,
+            max(columnas.mes) + 1,
+            lambda i: f"{(primer_mes + i) % 12 + 1:02d}/{(primer_mes + i) // 12}",
+        ),
+        "por_dia": _agrupar(
+            columnas,
+            columnas.dia,
+            max(columnas.dia) + 1,
+            lambda i: date.fromordinal(primer_dia + i).strftime("%d/%m/%Y"),
+        ),
+        "por_dia_semana": _agrupar(
+            columnas, columnas.dia_semana, 7, lambda i: DIAS_SEMANA[i]
+        ),
+        "por_franja": _agrupar(
+            columnas,
+            columnas.hora,
+            24,
+            lambda i: f"{i:02d}:00-{(i + 1) % 24:02d}:00",
+        ),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def exportar_csv(resultado, ruta_archivo):
+    """Escribe las filas de cada agrupación y el total en un CSV"""
+    os.makedirs(os.path.dirname(ruta_archivo) or ".", exist_ok=True)
+    with open(ruta_archivo, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUMNAS_CSV)
+        escritor.writeheader()
+        for grupo in ("por_mes", "por_dia", "por_dia_semana", "por_franja"):
+            for fila in resultado[grupo]:
+                escritor.writerow({"grupo": grupo[4:], **fila})
+        escritor.writerow(
+            {
+                "grupo": "total",
+                "clave": "",
+                "turnos": resultado["turnos"],
+                "asignados": resultado["asignados"],
+                "ocupacion_pct": resultado["ocupacion_pct"],
+                "cancelaciones": resultado["cancelaciones"],
+                "anticipacion_promedio_dias": resultado["anticipacion_dias"][
+                    "promedio"
+                ],
+            }
+        )
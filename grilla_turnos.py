@@ -0,0 +1,166 @@
+"""
+GRILLA DE DISPONIBILIDAD
+
+Representa la disponibilidad de un mes como una grilla días x horarios de
+bits: cada día es un entero donde el bit j indica el estado del horario j.
+Se mantienen dos grillas, la de turnos existentes y la de turnos libres, de
+modo que "¿está libre?", "¿cuántos libres quedan el día D?" y "¿qué días
+tienen lugar?" son operaciones de bits en lugar de recorrer los turnos.
+
+Los días salen de obtener_dias_laborables() (más cualquier fecha con turnos
+fuera de ese calendario) y los horarios de los turnos generados para el mes,
+que a su vez vienen de generar_horarios().
+"""
+
+from datetime import datetime
+
+from calendario import clave_fecha, obtener_dias_laborables
+
+
+class GrillaMes:
+    """Turnos existentes y libres de un mes, un entero de bits por día"""
+
+    def __init__(self, mes, anio, turnos, abiertos=None):
+        """Construye la grilla a partir de un iterable de turnos del mes
+
+        abiertos = (dias, horarios) indica un mes abierto sin materializar:
+        todos esos turnos existen y están libres salvo lo que digan los
+        turnos recibidos.
+        """
+        turnos = list(turnos)
+        fechas = set(obtener_dias_laborables(mes, anio))
+        fechas.update(t["fecha"] for t in turnos)
+        horarios = {t["horario"] for t in turnos}
+        if abiertos is not None:
+            fechas.update(abiertos[0])
+            horarios.update(abiertos[1])
+        self.mes = mes
+        self.anio = anio
+        self.dias = sorted(fechas, key=clave_fecha)
+        self.horarios = sorted(horarios)
+        self._pos_dia = {fecha: i for i, fecha in enumerate(self.dias)}
+        self._pos_horario = {horario: j for j, horario in enumerate(self.horarios)}
+        self.existentes = [0] * len(self.dias)
+        self.libres = [0] * len(self.dias)
+        if abiertos is not None:
+            completa = 0
+            for horario in abiertos[1]:
+                completa |= 1 << self._pos_horario[horario]
+            for fecha in abiertos[0]:
+                i = self._pos_dia[fecha]
+                self.existentes[i] = self.libres[i] = completa
+        for turno in turnos:
+            self.marcar(turno["fecha"], turno["horario"], not turno.get("dni_paciente"))
+
+    def marcar(self, fecha, horario, libre):
+        """Registra un turno existente como libre u ocupado
+
+        Devuelve False si la fecha o el horario no están en la grilla.
+        """
+        i = self._pos_dia.get(fecha)
+        j = self._pos_horario.get(horario)
+        if i is None or j is None:
+            return False
+        bit = 1 << j
+        self.existentes[i] |= bit
+        if libre:
+            self.libres[i] |= bit
+        else:
+            self.libres[i] &= ~bit
+        return True
+
+    #### CONSULTAS ####
+
+    def esta_libre(self, fecha, horario):
+        i = self._pos_dia.get(fecha)
+        j = self._pos_horario.get(horario)
+        if i is None or j is None:
+            return False
+        return bool(self.libres[i] >> j & 1)
+
+    def libres_en(self, fecha):
+        """Cantidad de turnos libres en la fecha"""
+        i = self._pos_dia.get(fecha)
+        return 0 if i is None else self.libres[i].bit_count()
+
+    def existentes_en(self, fecha):
+        """Cantidad de turnos generados en la fecha"""
+        i = self._pos_dia.get(fecha)
+        return 0 if i is None else self.existentes[i].bit_count()
+
+    def horarios_libres(self, fecha):
+        """Horarios libres de la fecha, en orden"""
+        i = self._pos_dia.get(fecha)
+        if i is None:
+            return []
+        fila = self.libres[i]
+        return [h for j, h in enumerate(self.horarios) if fila >> j & 1]
+
+    def dias_con_lugar(self):
+        """Fechas del mes que todavía tienen algún turno libre"""
+        return [fecha for fecha, fila in zip(self.dias, self.libres) if fila]
+
+    def dias_con_asignados(self):
+        """Fechas del mes con al menos un turno asignado"""
+        filas = zip(self.dias, self.existentes, self.libres)
+        return [fecha for fecha, existentes, libres in filas if existentes & ~libres]
+
+    def libres_desde(
+        self, fecha, horario="00:00", dias_semana=None, desde_hora=None, hasta_hora=None
+    ):
+        """Genera (fecha, horario) libres a partir de la fecha y hora dadas
+
+        dias_semana es un conjunto de días (0 = lunes) y la franja horaria
+        incluye desde_hora y excluye hasta_hora; None significa sin filtro.
+        """
+        mascara = 0
+        for j, h in enumerate(self.horarios):
+            if (desde_hora is None or h >= desde_hora) and (
+                hasta_hora is None or h < hasta_hora
+            ):
+                mascara |= 1 << j
+        inicio = clave_fecha(fecha)
+        for dia, fila in zip(self.dias, self.libres):
+            fila &= mascara
+            clave = clave_fecha(dia)
+            if not fila or clave < inicio:
+                continue
+            if (
+                dias_semana is not None
+                and datetime.strptime(dia, "%d/%m/%Y").weekday() not in dias_semana
+            ):
+                continue
+            for j, h in enumerate(self.horarios):
+                if fila >> j & 1 and (clave > inicio or h >= horario):
+                    yield dia, h
+
+    def total_libres(self):
+        return sum(fila.bit_count() for fila in self.libres)
+
+    def total_existentes(self):
+        return sum(fila.bit_count() for fila in self.existentes)
+
+    #### PRESENTACIÓN ####
+
+    def calendario(self):
+        """Líneas de un calendario lunes a viernes con los libres de cada día
+
+        Cada celda muestra 'dd:nn' (día y turnos libres); '--' indica que ese
+        día no tiene turnos generados.
+        """
+        lineas = [" ".join(d.center(7) for d in ("Lun", "Mar", "Mié", "Jue", "Vie"))]
+        semana = [""] * 5
+        for fecha in self.dias:
+            dia_semana = datetime.strptime(fecha, "%d/%m/%Y").weekday()
+            if dia_semana > 4:
+                continue
+            if dia_semana == 0 and any(semana):
+                lineas.append(" ".join(c.center(7) for c in semana))
+                semana = [""] * 5
+            if self.existentes_en(fecha):
+                semana[dia_semana] = f"{fecha[:2]}:{self.libres_en(fecha):2d}"
+            else:
+                semana[dia_semana] = f"{fecha[:2]}:--"
+        if any(semana):
+            lineas.append(" ".join(c.center(7) for c in semana))
+        return lineas
@@ -0,0 +1,216 @@
+"""
+IMPORTACIÓN MASIVA
+
+Carga en bloque registros que hoy se ingresan de a uno desde los menús.
+
+Pacientes: el archivo (CSV con encabezado dni,nombre,apellido,telefono,email
+o JSONL con un objeto por línea con esas claves) se lee registro a registro,
+se valida con las mismas reglas que el alta, los DNI repetidos se detectan
+contra los pacientes cargados en memoria y todos los aceptados se guardan con
+una única escritura. Los rechazados se escriben en un archivo CSV junto al
+original con el número de registro, el DNI y el motivo.
+
+Reservas: cada registro (dni, fecha, horario) se resuelve a su turno con la
+búsqueda por fecha y horario del almacén y el paciente se verifica contra
+una única carga de pacientes. Las reservas válidas se aplican juntas con
+asignar_varios() y se escribe un CSV con el resultado de cada registro.
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+import indice_pacientes
+from traza import operacion
+
+CAMPOS_PACIENTE = ("dni", "nombre", "apellido", "telefono", "email")
+CAMPOS_RESERVA = ("dni", "fecha", "horario")
+
+# Resultados por registro de la importación de reservas
+ASIGNADO = "asignado"
+YA_ASIGNADO = "ya asignado"
+TURNO_INEXISTENTE = "turno inexistente"
+PACIENTE_INEXISTENTE = "paciente inexistente"
+FORMATO_INVALIDO = "formato inválido"
+
+
+def leer_registros(ruta):
+    """Genera (número, registro) de un archivo CSV o JSONL sin cargarlo entero
+
+    El formato se elige por la extensión: .csv es CSV con encabezado y
+    cualquier otra se lee como JSONL. Una línea JSON inválida se devuelve
+    como registro None para que el llamador la rechace.
+    """
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        if ruta.lower().endswith(".csv"):
+            for numero, fila in enumerate(csv.DictReader(f), 1):
+                yield numero, fila
+            return
+        numero = 0
+        for linea in f:
+            if not linea.strip():
+                continue
+            numero += 1
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                registro = None
+            yield numero, registro if isinstance(registro, dict) else None
+
+
+def ruta_derivada(ruta, sufijo):
+    """Archivo de salida junto al original (datos.csv -> datos_<sufijo>.csv)"""
+    base, _ = os.path.splitext(ruta)
+    return f"{base}_{sufijo}.csv"
+
+
+class ArchivoRechazos:
+    """CSV de rechazos que solo se crea si hay al menos uno"""
+
+    def __init__(self, ruta, columnas):
+        self.ruta = ruta
+        self.columnas = columnas
+        self.cantidad = 0
+        self._archivo = None
+        self._escritor = None
+
+    def agregar(self, *valores):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "w", encoding="utf-8", newline="")
+            self._escritor = csv.writer(self._archivo)
+            self._escritor.writerow(self.columnas)
+        self._escritor.writerow(valores)
+        self.cantidad += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._archivo is not None:
+            self._archivo.close()
+        return False
+
+
+@operacion("importacion.pacientes")
+def importar_pacientes(ruta, ruta_salida=None):
+    """Importa pacientes desde un archivo CSV o JSONL
+
+    Devuelve un resumen con las cantidades leídas, aceptadas y rechazadas,
+    la ruta del archivo de rechazos, si se pudo guardar y el tiempo total.
+    """
+    from pacientes import cargar_pacientes, guardar_pacientes, validar_paciente
+
+    inicio = time.perf_counter()
+    ruta_salida = ruta_salida or ruta_derivada(ruta, "rechazos")
+    pacientes = cargar_pacientes()
+    existentes = set(pacientes)
+    leidos = 0
+    aceptados = 0
+
+    with ArchivoRechazos(ruta_salida, ("registro", "dni", "motivo")) as rechazos:
+        for numero, registro in leer_registros(ruta):
+            leidos += 1
+            if registro is None:
+                rechazos.agregar(numero, "", "Registro con formato inválido")
+                continue
+            valores = [str(registro.get(c) or "").strip() for c in CAMPOS_PACIENTE]
+            dni = valores[0]
+            if dni in existentes:
+                rechazos.agregar(numero, dni, "Ya existe un paciente con ese DNI")
+                continue
+            datos, motivo = validar_paciente(*valores)
+            if datos is None:
+                rechazos.agregar(numero, dni, motivo)
+                continue
+            existentes.add(dni)
+            pacientes[dni] = datos
+            aceptados += 1
+
+    guardado = guardar_pacientes(pacientes) if aceptados else True
+    if aceptados:
+        indice_pacientes.invalidar()
+    return {
+        "leidos": leidos,
+        "aceptados": aceptados if guardado else 0,
+        "rechazados": rechazos.cantidad,
+        "ruta_rechazos": ruta_salida if rechazos.cantidad else None,
+        "guardado": guardado,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def _normalizar_reserva(registro):
+    """Devuelve (dni, fecha, horario) normalizados o None si no son válidos"""
+    dni, fecha, horario = (str(registro.get(c) or "").strip() for c in CAMPOS_RESERVA)
+    try:
+        fecha = datetime.strptime(fecha, "%d/%m/%Y").strftime("%d/%m/%Y")
+        horario = datetime.strptime(horario, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+    return dni, fecha, horario
+
+
+@operacion("importacion.reservas")
+def importar_reservas(ruta, ruta_salida=None):
+    """Asigna en bloque los turnos de un archivo CSV o JSONL (dni, fecha, horario)
+
+    Escribe un CSV con el resultado de cada registro: asignado, ya asignado,
+    turno inexistente, paciente inexistente o formato inválido. Devuelve la
+    cantidad de registros por resultado, la ruta del CSV y el tiempo total.
+    """
+    from almacen_turnos import OK, OCUPADO, obtener_almacen
+
+    inicio = time.perf_counter()
+    ruta_salida = ruta_salida or ruta_derivada(ruta, "resultado")
+    pacientes = indice_pacientes.obtener_pacientes()
+    almacen = obtener_almacen()
+    filas = []
+    pendientes = []
+
+    for numero, registro in leer_registros(ruta):
+        reserva = None if registro is None else _normalizar_reserva(registro)
+        if reserva is None:
+            dni = "" if registro is None else str(registro.get("dni") or "")
+            filas.append([numero, dni, "", "", "", FORMATO_INVALIDO])
+            continue
+        dni, fecha, horario = reserva
+        fila = [numero, dni, fecha, horario, "", ""]
+        filas.append(fila)
+        if dni not in pacientes:
+            fila[5] = PACIENTE_INEXISTENTE
+            continue
+        encontrado = almacen.buscar(fecha, horario)
+        if encontrado is None:
+            fila[5] = TURNO_INEXISTENTE
+            continue
+        id_turno, turno = encontrado
+        fila[4] = id_turno
+        if turno.get("dni_paciente"):
+            fila[5] = YA_ASIGNADO
+            continue
+        pendientes.append((fila, (id_turno, dni)))
+
+    resultados = almacen.asignar_varios([reserva for _, reserva in pendientes])
+    for (fila, _), resultado in zip(pendientes, resultados):
+        if resultado == OK:
+            fila[5] = ASIGNADO
+        elif resultado == OCUPADO:
+            fila[5] = YA_ASIGNADO
+        else:
+            fila[5] = TURNO_INEXISTENTE
+
+    cantidades = {}
+    with open(ruta_salida, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(("registro", "dni", "fecha", "horario", "id", "resultado"))
+        escritor.writerows(filas)
+    for fila in filas:
+        cantidades[fila[5]] = cantidades.get(fila[5], 0) + 1
+    return {
+        "leidos": len(filas),
+        "resultados": cantidades,
+        "ruta_resultado": ruta_salida,
+        "segundos": time.perf_counter() - inicio,
+    }
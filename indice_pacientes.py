@@ -0,0 +1,321 @@
+"""
+ÍNDICE DE PACIENTES
+
+Pacientes en memoria para resolver el nombre de un DNI (los turnos guardan
+solo el DNI), búsqueda por prefijo de nombre y apellido sin distinguir
+mayúsculas ni acentos ("gonz" encuentra a González, "mar lop" a María
+López) y búsqueda directa por teléfono o email.
+
+Los pacientes se cargan una vez y se guardan en memoria junto con la firma
+del origen de datos (el archivo pacientes.json o, en SQLite, el contador
+de escrituras de la tabla pacientes): si otro proceso los cambia, la
+próxima consulta los vuelve a cargar.
+
+El índice de nombres es una lista ordenada de (palabra normalizada, dni) con
+una entrada por cada palabra del nombre y del apellido; un prefijo se
+resuelve con bisect en la lista, sin recorrer todos los pacientes. Se arma
+en la primera búsqueda después de cada carga.
+
+Teléfono y email se indexan en diccionarios (valor normalizado -> DNI) para
+avisar en el alta y la modificación si ya pertenecen a otro paciente, que
+suele ser la misma persona cargada con un DNI mal tipeado.
+
+Las altas, modificaciones y bajas hechas desde pacientes.py actualizan los
+pacientes en memoria y el índice en el lugar con actualizar() y quitar(),
+siempre que estuvieran al día con la firma tomada antes de guardar; si otro
+proceso los había cambiado se descartan. La importación masiva los descarta
+con invalidar().
+"""
+
+import os
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from ajustes import usa_sqlite
+
+RUTA_PACIENTES = os.path.join("data", "pacientes.json")
+
+# Mayor que cualquier carácter de una palabra: cierra el rango de un prefijo
+ULTIMO_CARACTER = "\U0010ffff"
+
+# Nombre que se muestra para un DNI que no está entre los pacientes
+SIN_NOMBRE = "N/A"
+
+_cache = {"pacientes": None, "indice": None, "firma": None}
+
+
+# Los nombres y apellidos se repiten mucho entre pacientes
+@lru_cache(maxsize=65536)
+def normalizar(texto):
+    """Texto en minúsculas y sin acentos ("Ñandú" -> "nandu")"""
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.casefold()
+
+
+def palabras(texto):
+    """Palabras normalizadas de un texto; los guiones también separan"""
+    return _separar(normalizar(texto))
+
+
+def _separar(normalizado):
+    return normalizado.replace("-", " ").split()
+
+
+def normalizar_telefono(telefono):
+    """Solo los dígitos, sin prefijo internacional (54, 549) ni 0 inicial
+
+    Así "+54 9 11 3111-2345", "011 3111 2345" y "1131112345" coinciden.
+    """
+    digitos = "".join(c for c in telefono if c.isdigit())
+    if digitos.startswith("54") and len(digitos) > 11:
+        digitos = digitos[2:]
+        if digitos.startswith("9") and len(digitos) == 11:
+            digitos = digitos[1:]
+    return digitos.lstrip("0")
+
+
+def normalizar_email(email):
+    return email.strip().lower()
+
+
+# Campos de contacto indexados: campo -> función de normalización
+CONTACTOS = {"telefono": normalizar_telefono, "email": normalizar_email}
+
+
+class IndicePacientes:
+    """Palabras de nombre y apellido (ordenadas) y contactos de cada paciente"""
+
+    def __init__(self, pacientes=None):
+        self._entradas = []
+        self._palabras = {}
+        self._orden = {}
+        self._datos = {}
+        self._claves = {}
+        self._contactos = {campo: {} for campo in CONTACTOS}
+        for dni, datos in (pacientes or {}).items():
+            self._registrar(dni, datos)
+        self._entradas.sort()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def paciente(self, dni):
+        """Datos del paciente tal como se indexaron, o None"""
+        return self._datos.get(dni)
+
+    def _registrar(self, dni, datos):
+        apellido = normalizar(datos["apellido"])
+        nombre = normalizar(datos["nombre"])
+        propias = tuple(dict.fromkeys(_separar(apellido) + _separar(nombre)))
+        self._palabras[dni] = propias
+        self._datos[dni] = datos
+        self._orden[dni] = (apellido, nombre, dni)
+        claves = tuple(norma(datos[campo]) for campo, norma in CONTACTOS.items())
+        self._claves[dni] = claves
+        # Casi siempre hay un solo DNI por valor: tuplas en lugar de conjuntos
+        for campo, clave in zip(CONTACTOS, claves):
+            if clave:
+                por_valor = self._contactos[campo]
+                por_valor[clave] = por_valor.get(clave, ()) + (dni,)
+        self._entradas.extend((palabra, dni) for palabra in propias)
+
+    def quitar(self, dni):
+        """Saca al paciente del índice (no hace nada si no estaba)"""
+        for palabra in self._palabras.pop(dni, ()):
+            entrada = (palabra, dni)
+            posicion = bisect_left(self._entradas, entrada)
+            if posicion < len(self._entradas) and self._entradas[posicion] == entrada:
+                del self._entradas[posicion]
+        self._orden.pop(dni, None)
+        for campo, clave in zip(CONTACTOS, self._claves.pop(dni, ())):
+            por_valor = self._contactos[campo]
+            restantes = tuple(otro for otro in por_valor.get(clave, ()) if otro != dni)
+            if restantes:
+                por_valor[clave] = restantes
+            else:
+                por_valor.pop(clave, None)
+        self._datos.pop(dni, None)
+
+    def actualizar(self, dni, datos):
+        """Agrega al paciente o reemplaza sus datos si ya estaba"""
+        self.quitar(dni)
+        inicio = len(self._entradas)
+        self._registrar(dni, datos)
+        nuevas = self._entradas[inicio:]
+        del self._entradas[inicio:]
+        for entrada in nuevas:
+            insort(self._entradas, entrada)
+
+    def por_contacto(self, campo, valor):
+        """DNI de los pacientes con ese teléfono o email, ordenados"""
+        clave = CONTACTOS[campo](valor)
+        return sorted(self._contactos[campo].get(clave, ()))
+
+    def _rango(self, prefijo):
+        """Posiciones [inicio, fin) de las entradas que empiezan con el prefijo"""
+        inicio = bisect_left(self._entradas, (prefijo,))
+        fin = bisect_left(self._entradas, (prefijo + ULTIMO_CARACTER,), inicio)
+        return inicio, fin
+
+    def buscar(self, texto):
+        """Lista de (dni, datos) de los pacientes que coinciden con el texto
+
+        Cada palabra buscada debe ser el comienzo de alguna palabra del
+        nombre o del apellido. El resultado se ordena por apellido y nombre.
+        """
+        buscadas = palabras(texto)
+        if not buscadas:
+            return []
+        # Cada palabra es un tramo contiguo de la lista; se intersecan
+        # empezando por el tramo más corto
+        rangos = sorted(
+            (self._rango(palabra) for palabra in dict.fromkeys(buscadas)),
+            key=lambda rango: rango[1] - rango[0],
+        )
+        candidatos = None
+        for inicio, fin in rangos:
+            tramo = {dni for _, dni in self._entradas[inicio:fin]}
+            candidatos = tramo if candidatos is None else candidatos & tramo
+            if not candidatos:
+                return []
+        datos = self._datos
+        return [
+            (dni, datos[dni])
+            for dni in sorted(candidatos, key=self._orden.__getitem__)
+        ]
+
+
+def firma_pacientes():
+    """Identifica el estado actual de los pacientes guardados"""
+    if usa_sqlite():
+        import almacen_sqlite
+
+        # Solo las escrituras de pacientes (no las de turnos) cambian la firma
+        return (
+            "sqlite",
+            os.path.abspath(almacen_sqlite.RUTA_BASE),
+            almacen_sqlite.version_pacientes(),
+        )
+    try:
+        estado = os.stat(RUTA_PACIENTES)
+    except OSError:
+        return ("json", os.path.abspath(RUTA_PACIENTES), None)
+    return (
+        "json",
+        os.path.abspath(RUTA_PACIENTES),
+        estado.st_mtime_ns,
+        estado.st_size,
+    )
+
+
+def obtener_pacientes():
+    """Diccionario dni -> datos de los pacientes guardados
+
+    Se carga de nuevo solo si los pacientes cambiaron. Pertenece al módulo:
+    no debe modificarse.
+    """
+    firma = firma_pacientes()
+    if _cache["pacientes"] is None or firma != _cache["firma"]:
+        from pacientes import cargar_pacientes
+
+        _cache["pacientes"] = cargar_pacientes()
+        _cache["indice"] = None
+        _cache["firma"] = firma
+    return _cache["pacientes"]
+
+
+def nombre_paciente(dni, pacientes=None):
+    """Nombre y apellido del paciente del DNI, o SIN_NOMBRE
+
+    Para muchos turnos seguidos conviene pasar pacientes (de
+    obtener_pacientes()) y no consultar la firma en cada uno.
+    """
+    if pacientes is None:
+        pacientes = obtener_pacientes()
+    datos = pacientes.get(dni)
+    if datos is None:
+        return SIN_NOMBRE
+    return f"{datos['nombre']} {datos['apellido']}"
+
+
+def obtener_indice():
+    """Índice de los pacientes guardados, armado de nuevo solo si cambiaron"""
+    pacientes = obtener_pacientes()
+    if _cache["indice"] is None:
+        _cache["indice"] = IndicePacientes(pacientes)
+    return _cache["indice"]
+
+
+def buscar_pacientes(texto):
+    """Lista de (dni, datos) de los pacientes que coinciden con el texto"""
+    return obtener_indice().buscar(texto)
+
+
+def buscar_por_telefono(telefono):
+    """Lista de (dni, datos) de los pacientes con ese teléfono"""
+    indice = obtener_indice()
+    return [
+        (dni, indice.paciente(dni)) for dni in indice.por_contacto("telefono", telefono)
+    ]
+
+
+def coincidencias_contacto(datos, dni=None, campos=tuple(CONTACTOS)):
+    """Otros pacientes con el mismo teléfono o email que datos
+
+    Devuelve una lista de (campo, dni, datos); dni es el del propio paciente
+    (en una modificación), que no cuenta como coincidencia.
+    """
+    indice = obtener_indice()
+    return [
+        (campo, otro, indice.paciente(otro))
+        for campo in campos
+        for otro in indice.por_contacto(campo, datos[campo])
+        if otro != dni
+    ]
+
+
+def _al_dia(firma_anterior):
+    """Indica si lo que hay en memoria se puede modificar en el lugar
+
+    firma_anterior es firma_pacientes() tomada antes de guardar. Si no
+    coincide con la de la última carga, otro proceso cambió los pacientes y
+    la memoria no tiene ese cambio: se descarta y se carga en la próxima
+    consulta.
+    """
+    if _cache["pacientes"] is None:
+        return False
+    if _cache["firma"] != firma_anterior:
+        invalidar()
+        return False
+    return True
+
+
+def actualizar(dni, datos, firma_anterior):
+    """Refleja un alta o modificación ya guardada en los datos en memoria"""
+    if not _al_dia(firma_anterior):
+        return
+    _cache["pacientes"][dni] = datos
+    if _cache["indice"] is not None:
+        _cache["indice"].actualizar(dni, datos)
+    _cache["firma"] = firma_pacientes()
+
+
+def quitar(dni, firma_anterior):
+    """Refleja una baja ya guardada en los datos en memoria"""
+    if not _al_dia(firma_anterior):
+        return
+    _cache["pacientes"].pop(dni, None)
+    if _cache["indice"] is not None:
+        _cache["indice"].quitar(dni)
+    _cache["firma"] = firma_pacientes()
+
+
+def invalidar():
+    """Descarta los pacientes en memoria; se cargan en la próxima consulta"""
+    _cache["pacientes"] = None
+    _cache["indice"] = None
+    _cache["firma"] = None
@@ -1,41 +1,233 @@
+import hashlib
 import json
 import os
-import shutil
 from datetime import datetime
+from itertools import chain, groupby
+from operator import itemgetter
+
+from almacen_turnos import obtener_almacen
+from indice_pacientes import nombre_paciente, obtener_pacientes
+from pantalla import centrar_texto, limpiar_pantalla, pausar
+from traza import accion, contar, operacion
+
+CARPETA_INFORMES = "informes"
+RUTA_CACHE = os.path.join(CARPETA_INFORMES, ".cache_informes.json")
+
+
+def obtener_turnos_informe(mes, anio, dia=None):
+    """Lista de (id, turno) asignados del día indicado o, sin día, del mes"""
+    almacen = obtener_almacen()
+    if dia is not None:
+        return almacen.asignados_en_fecha(f"{dia:02d}/{mes:02d}/{anio}")
+    return almacen.asignados_en_mes(mes, anio)
+
+
+#### CACHÉ DE INFORMES ####
+#
+# Cada archivo de informe se registra con una suma de los turnos que lo
+# alimentan (id, horario, DNI, paciente y versión). Si al volver a pedirlo la
+# suma coincide y el archivo sigue en informes/, no se vuelve a escribir. Las
+# sumas se guardan en informes/.cache_informes.json para que valgan entre
+# ejecuciones y se releen solo si ese archivo cambió.
+
+_cache = {"firma": None, "sumas": {}}
+
+
+def suma_turnos(turnos):
+    """Suma de control de los datos de los turnos que se vuelcan a un informe
+
+    Incluye el nombre actual de cada paciente: si se modifica, los informes
+    donde aparece cambian aunque sus turnos no.
+    """
+    pacientes = obtener_pacientes()
+    datos = [
+        (
+            t.get("fecha"),
+            t.get("horario"),
+            t.get("dni_paciente"),
+            nombre_paciente(t.get("dni_paciente"), pacientes),
+            t.get("version"),
+        )
+        for t in turnos
+    ]
+    return hashlib.sha1(json.dumps(datos).encode("utf-8")).hexdigest()
+
+
+def _sumas_guardadas():
+    """Sumas de los informes generados, releídas solo si el archivo cambió"""
+    try:
+        estado = os.stat(RUTA_CACHE)
+        firma = (os.path.abspath(RUTA_CACHE), estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        firma = None
+    if firma != _cache["firma"]:
+        _cache["sumas"] = {}
+        if firma is not None:
+            try:
+                with open(RUTA_CACHE, "r", encoding="utf-8") as f:
+                    _cache["sumas"] = json.load(f)
+            except (OSError, ValueError):
+                pass
+        _cache["firma"] = firma
+    return _cache["sumas"]
 
 
-def limpiar_pantalla():
-    os.system("cls" if os.name == "nt" else "clear")
-
-
-def centrar_texto(texto):
+def _guardar_sumas(sumas):
     try:
-        ancho_terminal = shutil.get_terminal_size().columns
-    except:
-        ancho_terminal = 80
+        os.makedirs(CARPETA_INFORMES, exist_ok=True)
+        temporal = RUTA_CACHE + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(sumas, f, indent=2, sort_keys=True)
+        os.replace(temporal, RUTA_CACHE)
+        estado = os.stat(RUTA_CACHE)
+        _cache["firma"] = (
+            os.path.abspath(RUTA_CACHE),
+            estado.st_mtime_ns,
+            estado.st_size,
+        )
+    except OSError:
+        # Sin caché en disco el informe igual queda generado; se rehará luego
+        _cache["firma"] = None
+    _cache["sumas"] = sumas
+
+
+def informe_vigente(nombre_archivo, suma):
+    """Indica si el archivo ya existe y se generó con los mismos turnos"""
+    ruta_archivo = os.path.join(CARPETA_INFORMES, nombre_archivo)
+    guardada = _sumas_guardadas().get(nombre_archivo)
+    return guardada == suma and os.path.exists(ruta_archivo)
+
+
+def registrar_informes(generados, eliminados=()):
+    """Guarda las sumas de los informes escritos y olvida los eliminados"""
+    sumas = dict(_sumas_guardadas())
+    sumas.update(generados)
+    for nombre_archivo in eliminados:
+        sumas.pop(nombre_archivo, None)
+    _guardar_sumas(sumas)
+
+
+def mostrar_archivo(ruta_archivo):
+    """Muestra un informe ya generado sin volver a construirlo"""
+    with open(ruta_archivo, "r", encoding="utf-8") as f:
+        for linea in f:
+            print(centrar_texto(linea.rstrip("\n")))
+
+
+@operacion("informes.reconstruir_mes")
+def reconstruir_informes_mes(mes, anio):
+    """Regenera los informes diarios y mensual de un mes que hayan cambiado
+
+    Recorre una vez los turnos asignados del mes, calcula la suma de cada día
+    y solo reescribe los días cuya suma difiere de la guardada (o cuyo archivo
+    falta). El informe mensual se rehace si cambió algún día. Los informes de
+    días que ya no tienen turnos asignados se eliminan.
+
+    Devuelve (regenerados, sin_cambios, eliminados) con nombres de archivo.
+    """
+    sumas = _sumas_guardadas()
+    turnos_mes = [t for _, t in obtener_turnos_informe(mes, anio)]
+    sufijo = f"_{mes:02d}_{anio}.txt"
+    nombre_mes = f"turnos_mes{sufijo}"
+    regenerados = {}
+    sin_cambios = []
+    vigentes = set()
+
+    for fecha, grupo in groupby(turnos_mes, key=itemgetter("fecha")):
+        turnos_dia = list(grupo)
+        nombre_archivo = f"turnos_dia_{fecha.replace('/', '_')}.txt"
+        vigentes.add(nombre_archivo)
+        suma = suma_turnos(turnos_dia)
+        if informe_vigente(nombre_archivo, suma):
+            sin_cambios.append(nombre_archivo)
+            continue
+        escribir_informe(
+            lineas_informe(f"INFORME DE TURNOS DEL DÍA {fecha}", turnos_dia, True),
+            os.path.join(CARPETA_INFORMES, nombre_archivo),
+        )
+        regenerados[nombre_archivo] = suma
+
+    eliminados = [
+        nombre_archivo
+        for nombre_archivo in sumas
+        if nombre_archivo.startswith("turnos_dia_")
+        and nombre_archivo.endswith(sufijo)
+        and nombre_archivo not in vigentes
+    ]
+    if not turnos_mes and nombre_mes in sumas:
+        eliminados.append(nombre_mes)
+    for nombre_archivo in eliminados:
+        try:
+            os.remove(os.path.join(CARPETA_INFORMES, nombre_archivo))
+        except FileNotFoundError:
+            pass
+
+    if turnos_mes:
+        suma = suma_turnos(turnos_mes)
+        if informe_vigente(nombre_mes, suma):
+            sin_cambios.append(nombre_mes)
+        else:
+            escribir_informe(
+                lineas_informe(
+                    f"INFORME DE TURNOS DEL MES {mes:02d}/{anio}", turnos_mes, False
+                ),
+                os.path.join(CARPETA_INFORMES, nombre_mes),
+            )
+            regenerados[nombre_mes] = suma
 
-    if len(texto) >= ancho_terminal:
-        return texto
+    if regenerados or eliminados:
+        registrar_informes(regenerados, eliminados)
+    return sorted(regenerados), sin_cambios, eliminados
 
-    espacios = (ancho_terminal - len(texto)) // 2
-    return " " * espacios + texto
 
+@accion
+def reconstruir_informes():
+    limpiar_pantalla()
+    print(centrar_texto("=== RECONSTRUIR INFORMES DE UN MES ==="))
+    print()
 
-def pausar():
-    input(centrar_texto("Presione Enter para continuar..."))
+    try:
+        mes_input = input(centrar_texto("Ingrese mes (1-12) o 0 para volver: ")).strip()
+        if mes_input == "0":
+            return
+        mes = int(mes_input)
+        anio_input = input(centrar_texto("Ingrese año o 0 para volver: ")).strip()
+        if anio_input == "0":
+            return
+        anio = int(anio_input)
+    except ValueError:
+        print(centrar_texto("❌ Error en los datos ingresados"))
+        pausar()
+        return
 
+    if mes < 1 or mes > 12:
+        print(centrar_texto("❌ Mes inválido"))
+        pausar()
+        return
 
-def cargar_turnos():
     try:
-        if os.path.exists("data/turnos.json"):
-            with open("data/turnos.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        print(centrar_texto(f"Error al cargar turnos: {e}"))
-        return {}
+        regenerados, sin_cambios, eliminados = reconstruir_informes_mes(mes, anio)
+    except OSError as e:
+        print(centrar_texto(f"❌ Error al guardar los informes: {e}"))
+        pausar()
+        return
 
+    print()
+    for nombre_archivo in regenerados:
+        print(centrar_texto(f"✅ Regenerado: {nombre_archivo}"))
+    for nombre_archivo in eliminados:
+        print(centrar_texto(f"🗑️ Eliminado (sin turnos): {nombre_archivo}"))
+    print()
+    print(
+        centrar_texto(
+            f"Regenerados: {len(regenerados)} - Sin cambios: {len(sin_cambios)}"
+            f" - Eliminados: {len(eliminados)}"
+        )
+    )
+    pausar()
 
+
+@accion
 def generar_informe(tipo="dia"):
     limpiar_pantalla()
     es_informe_dia = tipo == "dia"
@@ -84,124 +276,426 @@ def generar_informe(tipo="dia"):
         pausar()
         return
 
-    turnos = cargar_turnos()
-    turnos_filtrados = []
+    turnos_filtrados = [t for _, t in obtener_turnos_informe(mes, anio, dia)]
 
-    for turno in turnos.values():
-        if turno.get("dni_paciente", "") == "":
-            continue
+    if es_informe_dia:
+        encabezado = f"INFORME DE TURNOS DEL DÍA {fecha_buscar}"
+        nombre_archivo = f"turnos_dia_{dia:02d}_{mes:02d}_{anio}.txt"
+    else:
+        encabezado = f"INFORME DE TURNOS DEL MES {mes:02d}/{anio}"
+        nombre_archivo = f"turnos_mes_{mes:02d}_{anio}.txt"
 
-        fecha_turno = turno.get("fecha", "")
-        if not fecha_turno:
-            continue
+    ruta_archivo = os.path.join(CARPETA_INFORMES, nombre_archivo)
+    lineas = lineas_informe(encabezado, turnos_filtrados, es_informe_dia)
 
+    limpiar_pantalla()
+
+    if not turnos_filtrados:
+        for linea in lineas:
+            print(centrar_texto(linea))
+        print()
         if es_informe_dia:
-            if fecha_turno == fecha_buscar:
-                turnos_filtrados.append(turno)
+            print(
+                centrar_texto(
+                    "⚠️ No hay turnos para la fecha indicada. No se generó archivo."
+                )
+            )
         else:
-            try:
-                partes_fecha = fecha_turno.split("/")
-                if len(partes_fecha) == 3:
-                    mes_turno = int(partes_fecha[1])
-                    anio_turno = int(partes_fecha[2])
+            print(
+                centrar_texto(
+                    "⚠️ No hay turnos para el mes indicado. No se generó archivo."
+                )
+            )
+        pausar()
+        return
 
-                    if mes_turno == mes and anio_turno == anio:
-                        turnos_filtrados.append(turno)
-            except:
-                continue
+    suma = suma_turnos(turnos_filtrados)
+    if informe_vigente(nombre_archivo, suma):
+        mostrar_archivo(ruta_archivo)
+        print()
+        print(centrar_texto(f"✅ Informe sin cambios: {ruta_archivo}"))
+        pausar()
+        return
 
-    if es_informe_dia:
-        turnos_filtrados.sort(key=lambda x: x.get("horario", ""))
-    else:
-        turnos_filtrados.sort(key=lambda x: (x.get("fecha", ""), x.get("horario", "")))
+    if mostrar_y_guardar(lineas, ruta_archivo):
+        registrar_informes({nombre_archivo: suma})
+    pausar()
 
-    contenido = []
-    contenido.append("=" * 60)
 
-    if es_informe_dia:
-        contenido.append(f"INFORME DE TURNOS DEL DÍA {fecha_buscar}")
+@operacion("informes.generar")
+def mostrar_y_guardar(lineas, ruta_archivo):
+    """Muestra cada línea del informe y la escribe en el archivo apenas se genera
+
+    Devuelve True si el archivo quedó guardado.
+    """
+    archivo = None
+    error = None
+    try:
+        os.makedirs(CARPETA_INFORMES, exist_ok=True)
+        archivo = open(ruta_archivo, "w", encoding="utf-8")
+    except Exception as e:
+        error = e
+
+    try:
+        for linea in lineas:
+            print(centrar_texto(linea))
+            if archivo is not None:
+                archivo.write(linea + "\n")
+    except Exception as e:
+        error = e
+    finally:
+        if archivo is not None:
+            contar(escritos=archivo.tell())
+            archivo.close()
+
+    print()
+    if error is None:
+        print(centrar_texto(f"✅ Informe guardado en: {ruta_archivo}"))
     else:
-        contenido.append(f"INFORME DE TURNOS DEL MES {mes:02d}/{anio}")
+        print(centrar_texto(f"❌ Error al guardar el informe: {error}"))
+    return error is None
 
-    contenido.append("=" * 60)
-    contenido.append(f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    contenido.append("")
 
-    if turnos_filtrados:
-        contenido.append(f"Total de turnos: {len(turnos_filtrados)}")
-        contenido.append("")
+@operacion("informes.escribir")
+def escribir_informe(lineas, ruta_archivo):
+    """Escribe el informe en el archivo sin mostrarlo"""
+    os.makedirs(CARPETA_INFORMES, exist_ok=True)
+    with open(ruta_archivo, "w", encoding="utf-8") as f:
+        for linea in lineas:
+            f.write(linea + "\n")
+        contar(escritos=f.tell())
 
+
+def lineas_informe(encabezado, turnos, es_informe_dia):
+    """Genera las líneas del informe a medida que se recorren los turnos
+
+    Los turnos llegan en orden cronológico desde el almacén, así que el
+    informe del mes se agrupa por fecha en una sola pasada.
+    """
+    yield "=" * 60
+    yield encabezado
+    yield "=" * 60
+    yield f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
+    yield ""
+
+    if not turnos:
         if es_informe_dia:
-            contenido.append("DETALLE DE TURNOS:")
-            contenido.append("-" * 40)
-
-            for turno in turnos_filtrados:
-                contenido.append(f"Horario: {turno.get('horario', 'N/A')}")
-                contenido.append(f"Paciente: {turno.get('paciente_nombre', 'N/A')}")
-                contenido.append(f"DNI: {turno.get('dni_paciente', 'N/A')}")
-                contenido.append("-" * 40)
+            yield "No hay turnos programados para esta fecha."
         else:
-            fechas_unicas = sorted(
-                list(set(t.get("fecha", "") for t in turnos_filtrados))
+            yield "No hay turnos asignados para este mes."
+        yield "Fin del informe"
+        return
+
+    yield f"Total de turnos: {len(turnos)}"
+    yield ""
+
+    if es_informe_dia:
+        pacientes = obtener_pacientes()
+        yield "DETALLE DE TURNOS:"
+        yield "-" * 40
+        for turno in turnos:
+            yield f"Horario: {turno.get('horario', 'N/A')}"
+            yield f"Paciente: {nombre_paciente(turno.get('dni_paciente'), pacientes)}"
+            yield f"DNI: {turno.get('dni_paciente', 'N/A')}"
+            yield "-" * 40
+    else:
+        for fecha, turnos_dia in groupby(turnos, key=itemgetter("fecha")):
+            yield from lineas_de_fecha(fecha, turnos_dia)
+
+    yield "Fin del informe"
+
+
+def lineas_de_fecha(fecha, turnos_dia):
+    pacientes = obtener_pacientes()
+    yield f"TURNOS DEL {fecha}:"
+    yield "-" * 30
+    for turno in turnos_dia:
+        yield (
+            f"  {turno.get('horario', 'N/A')} - "
+            f"{nombre_paciente(turno.get('dni_paciente'), pacientes)} "
+            f"(DNI: {turno.get('dni_paciente', 'N/A')})"
+        )
+    yield ""
+
+
+#### INFORME POR RANGO DE FECHAS ####
+
+
+def ruta_informe_rango(desde, hasta, dni=None, desde_hora=None, hasta_hora=None):
+    """Ruta del informe de un rango ('dd/mm/aaaa'), con sus filtros en el nombre
+
+    Así un informe filtrado por paciente o por franja horaria no reemplaza al
+    del mismo rango sin filtros. Por ejemplo, con DNI 11111111 y de 09:00 a
+    12:00: turnos_rango_01_07_2025_31_07_2025_dni11111111_0900-1200.txt. Una
+    franja abierta usa "inicio" o "fin".
+    """
+    nombre_archivo = f"turnos_rango_{desde.replace('/', '_')}_{hasta.replace('/', '_')}"
+    if dni:
+        nombre_archivo += f"_dni{''.join(c for c in dni if c.isalnum())}"
+    if desde_hora or hasta_hora:
+        inicio = desde_hora.replace(":", "") if desde_hora else "inicio"
+        fin = hasta_hora.replace(":", "") if hasta_hora else "fin"
+        nombre_archivo += f"_{inicio}-{fin}"
+    return os.path.join(CARPETA_INFORMES, nombre_archivo + ".txt")
+
+
+def obtener_turnos_rango(desde, hasta, dni=None, desde_hora=None, hasta_hora=None):
+    """Genera (id, turno) asignados entre dos fechas, en orden cronológico"""
+    return obtener_almacen().asignados_en_rango(
+        desde, hasta, dni=dni, desde_hora=desde_hora, hasta_hora=hasta_hora
+    )
+
+
+def lineas_informe_rango(encabezado, filtros, turnos):
+    """Genera las líneas del informe por rango mientras recorre los turnos
+
+    El total se conoce al final, así que se informa al cierre.
+    """
+    yield "=" * 60
+    yield encabezado
+    yield "=" * 60
+    yield f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
+    for filtro in filtros:
+        yield filtro
+    yield ""
+
+    total = 0
+    for fecha, grupo in groupby(turnos, key=itemgetter("fecha")):
+        turnos_dia = list(grupo)
+        total += len(turnos_dia)
+        yield from lineas_de_fecha(fecha, turnos_dia)
+
+    yield f"Total de turnos: {total}"
+    yield "Fin del informe"
+
+
+@accion
+def generar_informe_rango():
+    limpiar_pantalla()
+    print(centrar_texto("=== INFORME DE TURNOS POR RANGO DE FECHAS ==="))
+    print()
+
+    desde_input = input(
+        centrar_texto("Fecha inicial (dd/mm/aaaa) o 0 para volver: ")
+    ).strip()
+    if desde_input == "0":
+        return
+    hasta_input = input(
+        centrar_texto("Fecha final (dd/mm/aaaa) o 0 para volver: ")
+    ).strip()
+    if hasta_input == "0":
+        return
+    print(centrar_texto("Filtros opcionales (Enter para omitir)"))
+    dni = input(centrar_texto("DNI del paciente: ")).strip() or None
+    desde_hora = input(centrar_texto("Desde la hora (HH:MM): ")).strip() or None
+    hasta_hora = input(centrar_texto("Hasta la hora (HH:MM): ")).strip() or None
+
+    try:
+        desde = datetime.strptime(desde_input, "%d/%m/%Y")
+        hasta = datetime.strptime(hasta_input, "%d/%m/%Y")
+        if desde_hora is not None:
+            desde_hora = datetime.strptime(desde_hora, "%H:%M").strftime("%H:%M")
+        if hasta_hora is not None:
+            hasta_hora = datetime.strptime(hasta_hora, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        print(centrar_texto("❌ Error en los datos ingresados"))
+        pausar()
+        return
+
+    if hasta < desde:
+        print(centrar_texto("❌ La fecha final no puede ser anterior a la inicial"))
+        pausar()
+        return
+
+    desde_str = desde.strftime("%d/%m/%Y")
+    hasta_str = hasta.strftime("%d/%m/%Y")
+    filtros = []
+    if dni:
+        filtros.append(f"Paciente: DNI {dni}")
+    if desde_hora or hasta_hora:
+        franja = f"{desde_hora or 'inicio'} a {hasta_hora or 'fin'}"
+        filtros.append(f"Franja horaria: {franja}")
+
+    pares = obtener_turnos_rango(desde_str, hasta_str, dni, desde_hora, hasta_hora)
+    turnos = (t for _, t in pares)
+    # Se mira el primer turno para no crear el archivo si el informe queda vacío
+    primero = next(turnos, None)
+
+    limpiar_pantalla()
+    if primero is None:
+        print(centrar_texto(f"INFORME DE TURNOS DEL {desde_str} AL {hasta_str}"))
+        print()
+        print(
+            centrar_texto(
+                "⚠️ No hay turnos para el rango indicado. No se generó archivo."
             )
+        )
+        pausar()
+        return
 
-            for fecha in fechas_unicas:
-                turnos_dia = [t for t in turnos_filtrados if t.get("fecha") == fecha]
+    lineas = lineas_informe_rango(
+        f"INFORME DE TURNOS DEL {desde_str} AL {hasta_str}",
+        filtros,
+        chain([primero], turnos),
+    )
+    mostrar_y_guardar(
+        lineas,
+        ruta_informe_rango(desde_str, hasta_str, dni, desde_hora, hasta_hora),
+    )
+    pausar()
 
-                contenido.append(f"TURNOS DEL {fecha}:")
-                contenido.append("-" * 30)
 
-                for turno in turnos_dia:
-                    contenido.append(
-                        f"  {turno.get('horario', 'N/A')} - {turno.get('paciente_nombre', 'N/A')} (DNI: {turno.get('dni_paciente', 'N/A')})"
-                    )
+#### OCUPACIÓN DE LA AGENDA ####
 
-                contenido.append("")
+
+def ruta_informe_ocupacion(mes_desde, anio_desde, mes_hasta, anio_hasta):
+    nombre_archivo = (
+        f"ocupacion_{mes_desde:02d}_{anio_desde}_{mes_hasta:02d}_{anio_hasta}.csv"
+    )
+    return os.path.join(CARPETA_INFORMES, nombre_archivo)
+
+
+def lineas_ocupacion(encabezado, resultado):
+    """Líneas del resumen de ocupación: totales, meses, días de semana y franjas"""
+    anticipacion = resultado["anticipacion_dias"]
+    yield "=" * 60
+    yield encabezado
+    yield "=" * 60
+    yield f"Turnos generados: {resultado['turnos']}"
+    yield (
+        f"Turnos asignados: {resultado['asignados']} "
+        f"({resultado['ocupacion_pct']}% de ocupación)"
+    )
+    yield (
+        f"Cancelaciones: {resultado['cancelaciones']} "
+        f"({resultado['tasa_cancelacion_pct']}% de las reservas)"
+    )
+    if anticipacion["reservas"]:
+        yield (
+            f"Anticipación de reserva (días): promedio {anticipacion['promedio']}, "
+            f"mediana {anticipacion['mediana']}, p90 {anticipacion['p90']}"
+        )
     else:
-        if es_informe_dia:
-            contenido.append("No hay turnos programados para esta fecha.")
+        yield "Anticipación de reserva: sin datos"
+    for titulo, grupo in (
+        ("POR MES", "por_mes"),
+        ("POR DÍA DE LA SEMANA", "por_dia_semana"),
+        ("POR FRANJA HORARIA", "por_franja"),
+    ):
+        yield ""
+        yield titulo
+        yield "-" * 40
+        for fila in resultado[grupo]:
+            yield (
+                f"  {fila['clave']:<12} {fila['asignados']:>5}/{fila['turnos']:<5} "
+                f"{fila['ocupacion_pct']:>5}%  cancel.: {fila['cancelaciones']}"
+            )
+
+
+@accion
+def generar_informe_ocupacion():
+    from estadisticas import calcular_ocupacion, exportar_csv
+
+    limpiar_pantalla()
+    print(centrar_texto("=== OCUPACIÓN Y UTILIZACIÓN DE LA AGENDA ==="))
+    print()
+
+    try:
+        mes_input = input(centrar_texto("Mes inicial (1-12) o 0 para volver: ")).strip()
+        if mes_input == "0":
+            return
+        mes_desde = int(mes_input)
+        anio_desde = int(input(centrar_texto("Año inicial: ")).strip())
+        mes_input = input(centrar_texto("Mes final (Enter = el mismo): ")).strip()
+        if mes_input:
+            mes_hasta = int(mes_input)
+            anio_hasta = int(input(centrar_texto("Año final: ")).strip())
         else:
-            contenido.append("No hay turnos asignados para este mes.")
+            mes_hasta, anio_hasta = mes_desde, anio_desde
+    except ValueError:
+        print(centrar_texto("❌ Error en los datos ingresados"))
+        pausar()
+        return
 
-    contenido.append("Fin del informe")
+    if not (1 <= mes_desde <= 12 and 1 <= mes_hasta <= 12):
+        print(centrar_texto("❌ Mes inválido"))
+        pausar()
+        return
+    if (anio_hasta, mes_hasta) < (anio_desde, mes_desde):
+        print(centrar_texto("❌ El mes final no puede ser anterior al inicial"))
+        pausar()
+        return
 
+    resultado = calcular_ocupacion(mes_desde, anio_desde, mes_hasta, anio_hasta)
     limpiar_pantalla()
-    for linea in contenido:
+    encabezado = (
+        f"OCUPACIÓN DE {mes_desde:02d}/{anio_desde} A {mes_hasta:02d}/{anio_hasta}"
+    )
+    if resultado is None:
+        print(centrar_texto(encabezado))
+        print()
+        print(centrar_texto("⚠️ No hay turnos generados en el rango indicado."))
+        pausar()
+        return
+
+    for linea in lineas_ocupacion(encabezado, resultado):
         print(centrar_texto(linea))
+    print()
+    ruta_archivo = ruta_informe_ocupacion(mes_desde, anio_desde, mes_hasta, anio_hasta)
+    try:
+        exportar_csv(resultado, ruta_archivo)
+        print(centrar_texto(f"✅ Detalle por día guardado en: {ruta_archivo}"))
+    except OSError as e:
+        print(centrar_texto(f"❌ Error al guardar el detalle: {e}"))
+    pausar()
 
-    if es_informe_dia:
-        nombre_archivo = f"turnos_dia_{dia:02d}_{mes:02d}_{anio}.txt"
-    else:
-        nombre_archivo = f"turnos_mes_{mes:02d}_{anio}.txt"
 
-    ruta_archivo = os.path.join("informes", nombre_archivo)
+RUTA_INFORME_DUPLICADOS = os.path.join(CARPETA_INFORMES, "pacientes_duplicados.txt")
 
-    if not turnos_filtrados:
-        print()
-        if es_informe_dia:
-            print(
-                centrar_texto(
-                    "⚠️ No hay turnos para la fecha indicada. No se generó archivo."
-                )
-            )
-        else:
-            print(
-                centrar_texto(
-                    "⚠️ No hay turnos para el mes indicado. No se generó archivo."
-                )
+
+def lineas_duplicados(resultado):
+    """Líneas del informe de pacientes duplicados: un bloque por par"""
+    yield "=" * 60
+    yield "POSIBLES PACIENTES DUPLICADOS"
+    yield "=" * 60
+    yield (
+        f"Pacientes: {resultado['pacientes']} - bloques: {resultado['bloques']} - "
+        f"comparaciones: {resultado['comparaciones']}"
+    )
+    yield f"Pares candidatos: {len(resultado['pares'])}"
+    for bloque in resultado["bloques_omitidos"]:
+        yield (
+            f"⚠️ Bloque {bloque['clave']} omitido por grande "
+            f"({bloque['pacientes']} pacientes)"
+        )
+    for numero, par in enumerate(resultado["pares"], 1):
+        yield ""
+        motivos = ", ".join(par["motivos"])
+        yield f"{numero}. Similitud del nombre {par['similitud']:.0%}: {motivos}"
+        for lado in ("a", "b"):
+            yield (
+                f"   DNI {par[f'dni_{lado}']:>8}  {par[f'nombre_{lado}']:<30} "
+                f"{par[f'turnos_{lado}']} turnos"
             )
+
+
+@accion
+def generar_informe_duplicados():
+    from duplicados import informe_duplicados
+    from pacientes import cargar_pacientes
+
+    limpiar_pantalla()
+    print(centrar_texto("=== PACIENTES DUPLICADOS ==="))
+    print()
+    pacientes = cargar_pacientes()
+    if not pacientes:
+        print(centrar_texto("❌ No hay pacientes registrados"))
         pausar()
         return
 
-    try:
-        os.makedirs("informes", exist_ok=True)
-        with open(ruta_archivo, "w", encoding="utf-8") as f:
-            for linea in contenido:
-                f.write(linea + "\n")
-        print()
-        print(centrar_texto(f"✅ Informe guardado en: {ruta_archivo}"))
-    except Exception as e:
-        print(centrar_texto(f"❌ Error al guardar el informe: {e}"))
+    resultado = informe_duplicados(pacientes)
+    limpiar_pantalla()
+    mostrar_y_guardar(lineas_duplicados(resultado), RUTA_INFORME_DUPLICADOS)
     pausar()
 
 
@@ -214,16 +708,28 @@ def menu_informes():
         print(centrar_texto(""))
         print(centrar_texto("1. Informe de turnos del día"))
         print(centrar_texto("2. Informe de turnos del mes"))
-        print(centrar_texto("3. Volver al menú principal"))
+        print(centrar_texto("3. Informe de turnos por rango de fechas"))
+        print(centrar_texto("4. Reconstruir informes de un mes"))
+        print(centrar_texto("5. Ocupación y utilización de la agenda"))
+        print(centrar_texto("6. Posibles pacientes duplicados"))
+        print(centrar_texto("7. Volver al menú principal"))
         print(centrar_texto(""))
 
-        opcion = input(centrar_texto("Seleccione una opción (1-3): ")).strip()
+        opcion = input(centrar_texto("Seleccione una opción (1-7): ")).strip()
 
         if opcion == "1":
             generar_informe(tipo="dia")
         elif opcion == "2":
             generar_informe(tipo="mes")
         elif opcion == "3":
+            generar_informe_rango()
+        elif opcion == "4":
+            reconstruir_informes()
+        elif opcion == "5":
+            generar_informe_ocupacion()
+        elif opcion == "6":
+            generar_informe_duplicados()
+        elif opcion == "7":
             break
         else:
             print(centrar_texto("❌ Opción inválida"))
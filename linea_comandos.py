@@ -0,0 +1,443 @@
+"""
+MODO COMANDO
+
+Permite usar el sistema sin menús, desde scripts o tareas programadas:
+
+    python main.py turnos asignar --dni 11111111 --fecha 05/10/2026 --horario 13:00
+    python main.py pacientes alta --dni 44444444 --nombre Ana --apellido Gil \\
+        --telefono 3434123456 --email ana@mail.com
+    python main.py config generar --mes 10 --anio 2026
+    python main.py informes mes --mes 10 --anio 2026
+
+Cada comando usa las mismas funciones que los menús, sin limpiar la pantalla
+ni pedir confirmaciones, e imprime un único objeto JSON con "ok" y el
+resultado o el "error". El código de salida es 0 si la operación se realizó
+y 1 si no. Solo se importa el módulo que necesita el comando pedido.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+
+def _fecha(texto):
+    try:
+        return datetime.strptime(texto, "%d/%m/%Y").strftime("%d/%m/%Y")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida: {texto} (dd/mm/aaaa)")
+
+
+def _horario(texto):
+    try:
+        return datetime.strptime(texto, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"horario inválido: {texto} (HH:MM)")
+
+
+def _turno(id_turno, turno):
+    datos = {"id": id_turno, **turno}
+    # Los turnos guardan solo el DNI; el nombre se agrega para la salida
+    if turno.get("dni_paciente"):
+        from indice_pacientes import nombre_paciente
+
+        datos["paciente_nombre"] = nombre_paciente(turno["dni_paciente"])
+    return datos
+
+
+def _resultado(ok, mensaje, **datos):
+    if ok:
+        return {"ok": True, "mensaje": mensaje, **datos}
+    return {"ok": False, "error": mensaje, **datos}
+
+
+#### TURNOS ####
+
+
+def comando_turnos_asignar(args):
+    from turnos import reservar_turno, validar_fecha
+
+    dia, mes, anio = args.fecha.split("/")
+    valida, mensaje = validar_fecha(dia, mes, anio)
+    if not valida:
+        return _resultado(False, mensaje)
+    ok, mensaje, id_turno = reservar_turno(args.dni, args.fecha, args.horario)
+    return _resultado(ok, mensaje, id=id_turno)
+
+
+def comando_turnos_cancelar(args):
+    from turnos import anular_turno
+
+    ok, mensaje, id_turno = anular_turno(args.dni, args.fecha, args.horario)
+    return _resultado(ok, mensaje, id=id_turno)
+
+
+def comando_turnos_paciente(args):
+    from turnos import obtener_turnos_paciente
+
+    turnos = obtener_turnos_paciente(args.dni)
+    return {"ok": True, "turnos": [_turno(i, t) for i, t in turnos]}
+
+
+def comando_turnos_libres(args):
+    from turnos import obtener_proximos_libres
+
+    turnos = obtener_proximos_libres(
+        args.desde,
+        cantidad=args.cantidad,
+        dias_semana=None if args.dia_semana is None else {args.dia_semana - 1},
+        desde_hora=args.desde_hora,
+        hasta_hora=args.hasta_hora,
+        max_dias=args.dias,
+    )
+    return {"ok": True, "turnos": [_turno(i, t) for i, t in turnos]}
+
+
+def comando_turnos_importar(args):
+    from importacion import importar_reservas
+
+    resumen = importar_reservas(args.archivo, args.resultado)
+    resumen["segundos"] = round(resumen["segundos"], 3)
+    return {"ok": True, **resumen}
+
+
+#### PACIENTES ####
+
+
+def comando_pacientes_alta(args):
+    from pacientes import registrar_paciente
+
+    return _resultado(
+        *registrar_paciente(
+            args.dni, args.nombre, args.apellido, args.telefono, args.email
+        )
+    )
+
+
+def comando_pacientes_importar(args):
+    from importacion import importar_pacientes
+
+    resumen = importar_pacientes(args.archivo, args.rechazos)
+    resumen["segundos"] = round(resumen["segundos"], 3)
+    return {"ok": resumen["guardado"], **resumen}
+
+
+def comando_pacientes_ver(args):
+    from pacientes import obtener_paciente
+    from turnos import resumen_turnos_paciente
+
+    paciente = obtener_paciente(args.dni)
+    if paciente is None:
+        return _resultado(False, "No existe un paciente con ese DNI")
+    return {
+        "ok": True,
+        "paciente": {"dni": args.dni, **paciente},
+        "turnos": resumen_turnos_paciente(args.dni),
+    }
+
+
+def comando_pacientes_telefono(args):
+    from indice_pacientes import buscar_por_telefono
+
+    encontrados = [
+        {"dni": dni, **paciente} for dni, paciente in buscar_por_telefono(args.telefono)
+    ]
+    if not encontrados:
+        return _resultado(False, "No hay pacientes con ese teléfono")
+    return {"ok": True, "pacientes": encontrados}
+
+
+def comando_pacientes_eliminar(args):
+    from pacientes import quitar_paciente
+
+    return _resultado(*quitar_paciente(args.dni))
+
+
+#### CONFIGURACIÓN ####
+
+
+def comando_config_ver(args):
+    from configuracion import cargar_configuracion
+
+    config = cargar_configuracion()
+    if not config:
+        return _resultado(False, "No hay horarios configurados")
+    return {"ok": True, "configuracion": config}
+
+
+def comando_config_horarios(args):
+    from configuracion import establecer_horarios
+
+    return _resultado(*establecer_horarios(args.inicio, args.fin, args.intervalo))
+
+
+def comando_config_generar(args):
+    from configuracion import (
+        cargar_configuracion,
+        generar_turnos_rango,
+        validar_rango_meses,
+    )
+
+    config = cargar_configuracion()
+    if not config:
+        return _resultado(False, "Primero debe configurar los horarios")
+    mes_hasta = args.hasta_mes or args.mes
+    anio_hasta = args.hasta_anio or args.anio
+    error = validar_rango_meses(args.mes, args.anio, mes_hasta, anio_hasta)
+    if error:
+        return _resultado(False, error)
+    resumen, segundos = generar_turnos_rango(
+        args.mes, args.anio, mes_hasta, anio_hasta, config
+    )
+    return {
+        "ok": True,
+        "meses": [
+            {"mes": mes, "anio": anio, "generados": generados}
+            for mes, anio, generados in resumen
+        ],
+        "total": sum(generados or 0 for _, _, generados in resumen),
+        "segundos": round(segundos, 3),
+    }
+
+
+#### INFORMES ####
+
+
+def comando_informes_dia(args):
+    from interfaz_reportes import obtener_turnos_informe
+
+    dia, mes, anio = (int(parte) for parte in args.fecha.split("/"))
+    turnos = obtener_turnos_informe(mes, anio, dia)
+    return {
+        "ok": True,
+        "fecha": args.fecha,
+        "turnos": [_turno(i, t) for i, t in turnos],
+    }
+
+
+def comando_informes_mes(args):
+    from interfaz_reportes import obtener_turnos_informe
+
+    if not 1 <= args.mes <= 12:
+        return _resultado(False, "Mes inválido")
+    turnos = obtener_turnos_informe(args.mes, args.anio)
+    return {
+        "ok": True,
+        "mes": args.mes,
+        "anio": args.anio,
+        "turnos": [_turno(i, t) for i, t in turnos],
+    }
+
+
+def comando_informes_rango(args):
+    from interfaz_reportes import obtener_turnos_rango
+
+    turnos = obtener_turnos_rango(
+        args.desde, args.hasta, args.dni, args.desde_hora, args.hasta_hora
+    )
+    return {
+        "ok": True,
+        "desde": args.desde,
+        "hasta": args.hasta,
+        "turnos": [_turno(i, t) for i, t in turnos],
+    }
+
+
+def comando_informes_reconstruir(args):
+    from interfaz_reportes import reconstruir_informes_mes
+
+    if not 1 <= args.mes <= 12:
+        return _resultado(False, "Mes inválido")
+    regenerados, sin_cambios, eliminados = reconstruir_informes_mes(
+        args.mes, args.anio
+    )
+    return {
+        "ok": True,
+        "regenerados": regenerados,
+        "sin_cambios": sin_cambios,
+        "eliminados": eliminados,
+    }
+
+
+def comando_informes_ocupacion(args):
+    from estadisticas import calcular_ocupacion, exportar_csv
+    from interfaz_reportes import ruta_informe_ocupacion
+
+    mes_hasta = args.hasta_mes or args.mes
+    anio_hasta = args.hasta_anio or args.anio
+    if not (1 <= args.mes <= 12 and 1 <= mes_hasta <= 12):
+        return _resultado(False, "Mes inválido")
+    if (anio_hasta, mes_hasta) < (args.anio, args.mes):
+        return _resultado(False, "El mes final no puede ser anterior al inicial")
+    resultado = calcular_ocupacion(args.mes, args.anio, mes_hasta, anio_hasta)
+    if resultado is None:
+        return _resultado(False, "No hay turnos generados en el rango indicado")
+    ruta_csv = args.csv or ruta_informe_ocupacion(
+        args.mes, args.anio, mes_hasta, anio_hasta
+    )
+    exportar_csv(resultado, ruta_csv)
+    resultado["segundos"] = round(resultado["segundos"], 3)
+    return {"ok": True, "ruta_csv": ruta_csv, **resultado}
+
+
+def comando_informes_duplicados(args):
+    from duplicados import informe_duplicados
+    from interfaz_reportes import (
+        RUTA_INFORME_DUPLICADOS,
+        escribir_informe,
+        lineas_duplicados,
+    )
+    from pacientes import cargar_pacientes
+
+    resultado = informe_duplicados(cargar_pacientes())
+    escribir_informe(lineas_duplicados(resultado), RUTA_INFORME_DUPLICADOS)
+    resultado["segundos"] = round(resultado["segundos"], 3)
+    return {"ok": True, "archivo": RUTA_INFORME_DUPLICADOS, **resultado}
+
+
+#### TRAZA ####
+
+
+def comando_traza_resumen(args):
+    from traza import RUTA_TRAZA, resumen
+
+    filas = resumen(por_accion=args.por_accion)
+    if not filas:
+        return _resultado(False, f"No hay registros en {RUTA_TRAZA}")
+    return {"ok": True, "operaciones": filas}
+
+
+#### PARSER ####
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Sistema de turnos en modo comando (sin argumentos: menús)",
+    )
+    modulos = parser.add_subparsers(dest="modulo", required=True)
+
+    turnos = modulos.add_parser("turnos", help="Gestión de turnos")
+    acciones = turnos.add_subparsers(dest="accion", required=True)
+    for nombre, funcion, ayuda in (
+        ("asignar", comando_turnos_asignar, "Asigna un turno libre"),
+        ("cancelar", comando_turnos_cancelar, "Cancela un turno del paciente"),
+    ):
+        accion = acciones.add_parser(nombre, help=ayuda)
+        accion.add_argument("--dni", required=True)
+        accion.add_argument("--fecha", required=True, type=_fecha)
+        accion.add_argument("--horario", required=True, type=_horario)
+        accion.set_defaults(funcion=funcion)
+    accion = acciones.add_parser("paciente", help="Turnos asignados a un paciente")
+    accion.add_argument("--dni", required=True)
+    accion.set_defaults(funcion=comando_turnos_paciente)
+    accion = acciones.add_parser("libres", help="Próximos turnos libres")
+    accion.add_argument("--desde", type=_fecha, help="fecha inicial (por defecto hoy)")
+    accion.add_argument("--desde-hora", type=_horario)
+    accion.add_argument("--hasta-hora", type=_horario)
+    accion.add_argument("--dia-semana", type=int, choices=range(1, 8))
+    accion.add_argument("--dias", type=int, help="cuántos días hacia adelante buscar")
+    accion.add_argument("--cantidad", type=int, default=10)
+    accion.set_defaults(funcion=comando_turnos_libres)
+    accion = acciones.add_parser("importar", help="Asigna turnos desde CSV o JSONL")
+    accion.add_argument("--archivo", required=True)
+    accion.add_argument("--resultado", help="archivo de resultados (CSV)")
+    accion.set_defaults(funcion=comando_turnos_importar)
+
+    pacientes = modulos.add_parser("pacientes", help="Gestión de pacientes")
+    acciones = pacientes.add_subparsers(dest="accion", required=True)
+    accion = acciones.add_parser("alta", help="Registra un paciente")
+    for campo in ("dni", "nombre", "apellido", "telefono", "email"):
+        accion.add_argument(f"--{campo}", required=True)
+    accion.set_defaults(funcion=comando_pacientes_alta)
+    accion = acciones.add_parser("importar", help="Importa pacientes de CSV o JSONL")
+    accion.add_argument("--archivo", required=True)
+    accion.add_argument("--rechazos", help="archivo de rechazos (CSV)")
+    accion.set_defaults(funcion=comando_pacientes_importar)
+    for nombre, funcion, ayuda in (
+        ("ver", comando_pacientes_ver, "Muestra los datos de un paciente"),
+        ("eliminar", comando_pacientes_eliminar, "Elimina un paciente sin turnos"),
+    ):
+        accion = acciones.add_parser(nombre, help=ayuda)
+        accion.add_argument("--dni", required=True)
+        accion.set_defaults(funcion=funcion)
+    accion = acciones.add_parser("telefono", help="Busca pacientes por teléfono")
+    accion.add_argument("--telefono", required=True)
+    accion.set_defaults(funcion=comando_pacientes_telefono)
+
+    config = modulos.add_parser("config", help="Configuración y generación")
+    acciones = config.add_subparsers(dest="accion", required=True)
+    accion = acciones.add_parser("ver", help="Muestra los horarios configurados")
+    accion.set_defaults(funcion=comando_config_ver)
+    accion = acciones.add_parser("horarios", help="Configura los horarios")
+    accion.add_argument("--inicio", required=True, type=int)
+    accion.add_argument("--fin", required=True, type=int)
+    accion.add_argument("--intervalo", required=True, type=int, choices=(15, 20, 30))
+    accion.set_defaults(funcion=comando_config_horarios)
+    accion = acciones.add_parser("generar", help="Genera turnos de uno o más meses")
+    accion.add_argument("--mes", required=True, type=int)
+    accion.add_argument("--anio", required=True, type=int)
+    accion.add_argument("--hasta-mes", type=int)
+    accion.add_argument("--hasta-anio", type=int)
+    accion.set_defaults(funcion=comando_config_generar)
+
+    informes = modulos.add_parser("informes", help="Informes de turnos asignados")
+    acciones = informes.add_subparsers(dest="accion", required=True)
+    accion = acciones.add_parser("dia", help="Turnos asignados de una fecha")
+    accion.add_argument("--fecha", required=True, type=_fecha)
+    accion.set_defaults(funcion=comando_informes_dia)
+    accion = acciones.add_parser("mes", help="Turnos asignados de un mes")
+    accion.add_argument("--mes", required=True, type=int)
+    accion.add_argument("--anio", required=True, type=int)
+    accion.set_defaults(funcion=comando_informes_mes)
+    accion = acciones.add_parser("rango", help="Turnos asignados entre dos fechas")
+    accion.add_argument("--desde", required=True, type=_fecha)
+    accion.add_argument("--hasta", required=True, type=_fecha)
+    accion.add_argument("--dni")
+    accion.add_argument("--desde-hora", type=_horario)
+    accion.add_argument("--hasta-hora", type=_horario)
+    accion.set_defaults(funcion=comando_informes_rango)
+    accion = acciones.add_parser(
+        "reconstruir", help="Regenera los archivos de informe del mes que cambiaron"
+    )
+    accion.add_argument("--mes", required=True, type=int)
+    accion.add_argument("--anio", required=True, type=int)
+    accion.set_defaults(funcion=comando_informes_reconstruir)
+    accion = acciones.add_parser(
+        "ocupacion", help="Ocupación, cancelaciones y anticipación de reservas"
+    )
+    accion.add_argument("--mes", required=True, type=int)
+    accion.add_argument("--anio", required=True, type=int)
+    accion.add_argument("--hasta-mes", type=int)
+    accion.add_argument("--hasta-anio", type=int)
+    accion.add_argument("--csv", help="archivo CSV de salida")
+    accion.set_defaults(funcion=comando_informes_ocupacion)
+    accion = acciones.add_parser(
+        "duplicados", help="Pares de pacientes que pueden ser la misma persona"
+    )
+    accion.set_defaults(funcion=comando_informes_duplicados)
+
+    traza = modulos.add_parser("traza", help="Traza de operaciones (ajuste traza)")
+    acciones = traza.add_subparsers(dest="accion", required=True)
+    accion = acciones.add_parser(
+        "resumen", help="Cantidad, totales y p50/p95/p99 por operación"
+    )
+    accion.add_argument("--por-accion", action="store_true")
+    accion.set_defaults(funcion=comando_traza_resumen)
+
+    return parser
+
+
+def ejecutar(argumentos=None):
+    """Ejecuta un comando y devuelve el código de salida"""
+    from traza import en_accion
+
+    args = crear_parser().parse_args(argumentos)
+    try:
+        with en_accion(f"comando {args.modulo} {args.accion}"):
+            resultado = args.funcion(args)
+    except Exception as e:
+        resultado = _resultado(False, str(e))
+    json.dump(resultado, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0 if resultado.get("ok") else 1
@@ -1,30 +1,7 @@
 import os
 import sys
-import shutil
 
-
-def limpiar_pantalla():
-    """Limpia la pantalla de la consola"""
-    os.system("cls" if os.name == "nt" else "clear")
-
-
-def centrar_texto(texto):
-    """Centra el texto en la pantalla"""
-    try:
-        ancho_terminal = shutil.get_terminal_size().columns
-    except:
-        ancho_terminal = 80
-
-    if len(texto) >= ancho_terminal:
-        return texto
-
-    espacios = (ancho_terminal - len(texto)) // 2
-    return " " * espacios + texto
-
-
-def pausar():
-    """Pausa la ejecución hasta que el usuario presione Enter"""
-    input(centrar_texto("Presione Enter para continuar..."))
+from pantalla import centrar_texto, iniciar, limpiar_pantalla, pausar
 
 
 #### CREACION DE DIRECTORIOS SI NO EXISTEN ####
@@ -62,6 +39,7 @@ def mostrar_menu_principal():
 def main():
     """Función principal del programa"""
     crear_directorios()
+    iniciar()
 
     while True:
         mostrar_menu_principal()
@@ -109,4 +87,9 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Modo comando: no se muestran menús (ver linea_comandos.py)
+        from linea_comandos import ejecutar
+
+        sys.exit(ejecutar(sys.argv[1:]))
     main()
@@ -2,48 +2,52 @@
 import json
 import os
 import re
-import shutil
 
-#Limpiar la pantalla
-def limpiar_pantalla():
-    os.system("cls" if os.name == "nt" else "clear")
+import indice_pacientes
+from ajustes import usa_sqlite
+from pantalla import centrar_texto, limpiar_pantalla, pausar
+from traza import accion, contar, operacion
 
-#Centrar el texto
-def centrar_texto(texto):
-    try:
-        ancho_terminal = shutil.get_terminal_size().columns
-    except:    
-        ancho_terminal = 80
+# Patrones compilados una sola vez (se usan también en la importación masiva)
+PATRON_EMAIL = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+PATRON_TELEFONO = re.compile(r"^[0-9\-\s\+()]+$")
 
-    if len(texto) >= ancho_terminal:
-        return texto
+# Resultados por página en la búsqueda por nombre
+TAMANIO_PAGINA = 10
 
-    espacios = (ancho_terminal - len(texto)) // 2
-    return " " * espacios + texto
-    
-#Pausa hasta que el usuario presione enter
-def pausar():
-    input(centrar_texto("Presione Enter para continuar..."))
-    
-#-------------------------------------------------------    
-    
-#Carga los datos desde el archivo json
+ETIQUETAS_CONTACTO = {"telefono": "teléfono", "email": "email"}
+
+#Carga los datos desde el archivo json (o la base SQLite si está elegida)
+@operacion("pacientes.cargar")
 def cargar_pacientes():
     try:
+        if usa_sqlite():
+            import almacen_sqlite
+
+            return almacen_sqlite.cargar_pacientes()
         if os.path.exists("data/pacientes.json"):
             with open("data/pacientes.json", "r", encoding="utf-8") as f:
-                return json.load(f)
+                pacientes = json.load(f)
+                contar(leidos=f.tell(), cargas=1)
+            return pacientes
         return {}
     except Exception as e:
         print(centrar_texto(f"Error al cargar pacientes: {e}"))
         return {}
 
 #Guarda los datos en el archivo json
+@operacion("pacientes.guardar")
 def guardar_pacientes(pacientes):
     try:
+        if usa_sqlite():
+            import almacen_sqlite
+
+            almacen_sqlite.guardar_pacientes(pacientes)
+            return True
         os.makedirs("data", exist_ok=True)
         with open("data/pacientes.json", "w", encoding="utf-8") as f:
             json.dump(pacientes, f, ensure_ascii=False, indent=2)
+            contar(escritos=f.tell())
         return True
     except Exception as e:
         print(centrar_texto(f"Error al guardar pacientes: {e}"))
@@ -56,14 +60,12 @@ def validar_dni(dni):
 
 #Validar formato email
 def validar_email(email):
-    patron = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return re.match(patron, email) is not None
+    return PATRON_EMAIL.match(email) is not None
 
 #Validar formato telefono
 def validar_telefono(telefono):
-    patron = r"^[0-9\-\s\+()]+$"
     return (
-        re.match(patron, telefono) is not None
+        PATRON_TELEFONO.match(telefono) is not None
         and len(telefono.replace(" ", "").replace("-", "")) >= 8
     )
 
@@ -73,6 +75,31 @@ def validar_nombre(nombre):
 
 #--------------------------------------------------------------------------
 
+#Describe los otros pacientes que ya usan el teléfono o email indicados
+def avisos_contacto(datos, dni=None, campos=tuple(ETIQUETAS_CONTACTO)):
+    return [
+        f"El {ETIQUETAS_CONTACTO[campo]} ya figura en el paciente DNI {otro} "
+        f"({paciente['nombre']} {paciente['apellido']})"
+        for campo, otro, paciente in indice_pacientes.coincidencias_contacto(
+            datos, dni, campos
+        )
+    ]
+
+#Avisa de teléfono o email repetidos; devuelve True si se confirma igual
+def confirmar_contacto(datos, dni=None, campos=tuple(ETIQUETAS_CONTACTO)):
+    avisos = avisos_contacto(datos, dni, campos)
+    if not avisos:
+        return True
+    print()
+    for aviso in avisos:
+        print(centrar_texto(f"⚠️ {aviso}"))
+    respuesta = (
+        input(centrar_texto("¿Guardar de todas formas? (s/n): "))
+        .strip()
+        .lower()
+    )
+    return respuesta == "s"
+
 #solicitar y validar datos de nuevo paciente
 def solicitar_datos_paciente():
     """Solicita y valida los datos de un nuevo paciente"""
@@ -153,7 +180,69 @@ def solicitar_datos_paciente():
     }
 #----------------------------------------------------------------
 
+#Normaliza y valida los datos de un paciente sin interacción
+#Devuelve (datos, motivo): datos normalizados, o None y el motivo del rechazo
+def validar_paciente(dni, nombre, apellido, telefono, email):
+    datos = {
+        "nombre": nombre.strip().title(),
+        "apellido": apellido.strip().title(),
+        "telefono": telefono.strip(),
+        "email": email.strip().lower(),
+    }
+    if not validar_dni(dni):
+        return None, "DNI inválido. Debe tener 7-8 dígitos"
+    if not validar_nombre(datos["nombre"]):
+        return None, "Nombre inválido. Solo letras y espacios"
+    if not validar_nombre(datos["apellido"]):
+        return None, "Apellido inválido. Solo letras y espacios"
+    if not validar_telefono(datos["telefono"]):
+        return None, "Teléfono inválido"
+    if not validar_email(datos["email"]):
+        return None, "Email inválido"
+    return datos, ""
+
+#Registra un paciente sin interacción (modo comando); devuelve (ok, mensaje)
+def registrar_paciente(dni, nombre, apellido, telefono, email):
+    datos, motivo = validar_paciente(dni, nombre, apellido, telefono, email)
+    if datos is None:
+        return False, motivo
+
+    pacientes = cargar_pacientes()
+    if dni in pacientes:
+        return False, "Ya existe un paciente con ese DNI"
+
+    avisos = avisos_contacto(datos)
+    pacientes[dni] = datos
+    firma = indice_pacientes.firma_pacientes()
+    if not guardar_pacientes(pacientes):
+        return False, "Error al guardar el paciente"
+    indice_pacientes.actualizar(dni, datos, firma)
+    nombre_completo = f"{datos['nombre']} {datos['apellido']}"
+    mensaje = f"Paciente {nombre_completo} registrado correctamente"
+    if avisos:
+        mensaje += ". " + ". ".join(avisos)
+    return True, mensaje
+
+#Elimina un paciente sin turnos asignados; devuelve (ok, mensaje)
+def quitar_paciente(dni):
+    pacientes = cargar_pacientes()
+    if dni not in pacientes:
+        return False, "No existe un paciente con ese DNI"
+
+    from turnos import verificar_turnos_paciente
+
+    if verificar_turnos_paciente(dni):
+        return False, "No se puede eliminar. El paciente tiene turnos asignados"
+
+    del pacientes[dni]
+    firma = indice_pacientes.firma_pacientes()
+    if not guardar_pacientes(pacientes):
+        return False, "Error al eliminar el paciente"
+    indice_pacientes.quitar(dni, firma)
+    return True, "Paciente eliminado correctamente"
+
 #Registra un nuevo paciente
+@accion
 def alta_paciente():
     limpiar_pantalla()
     print(centrar_texto("=== ALTA DE PACIENTE ==="))
@@ -184,7 +273,7 @@ def alta_paciente():
 
     datos = solicitar_datos_paciente()
 
-    if datos is None:
+    if datos is None or not confirmar_contacto(datos):
         print(centrar_texto("Operación cancelada"))
         pausar()
         return
@@ -192,7 +281,9 @@ def alta_paciente():
     # Guardar paciente una nueva entrada
     pacientes[dni] = datos 
 
+    firma = indice_pacientes.firma_pacientes()
     if guardar_pacientes(pacientes): 
+        indice_pacientes.actualizar(dni, datos, firma)
         print(
             centrar_texto(
                 f"✅ Paciente {datos['nombre']} {datos['apellido']} registrado correctamente"
@@ -204,6 +295,7 @@ def alta_paciente():
     
 
 #Modificar datos de un paciente
+@accion
 def modificar_paciente():
     limpiar_pantalla()
     print(centrar_texto("=== MODIFICAR PACIENTE ==="))
@@ -287,11 +379,15 @@ def modificar_paciente():
             ).strip()
             if nuevo_telefono == "":
                 continue
-            if validar_telefono(nuevo_telefono):
+            if not validar_telefono(nuevo_telefono):
+                print(centrar_texto("❌ Teléfono inválido"))
+            elif not confirmar_contacto(
+                {**paciente, "telefono": nuevo_telefono}, dni, ("telefono",)
+            ):
+                print(centrar_texto("Teléfono sin cambios"))
+            else:
                 paciente["telefono"] = nuevo_telefono
                 print(centrar_texto("✅ Teléfono actualizado"))
-            else:
-                print(centrar_texto("❌ Teléfono inválido"))
             pausar()
 
         elif opcion == "4":
@@ -302,11 +398,15 @@ def modificar_paciente():
             )
             if nuevo_email == "":
                 continue
-            if validar_email(nuevo_email):
+            if not validar_email(nuevo_email):
+                print(centrar_texto("❌ Email inválido"))
+            elif not confirmar_contacto(
+                {**paciente, "email": nuevo_email}, dni, ("email",)
+            ):
+                print(centrar_texto("Email sin cambios"))
+            else:
                 paciente["email"] = nuevo_email
                 print(centrar_texto("✅ Email actualizado"))
-            else:
-                print(centrar_texto("❌ Email inválido"))
             pausar()
 
         else:
@@ -314,13 +414,16 @@ def modificar_paciente():
             pausar()
 
     pacientes[dni] = paciente 
+    firma = indice_pacientes.firma_pacientes()
     if guardar_pacientes(pacientes): 
+        indice_pacientes.actualizar(dni, paciente, firma)
         print(centrar_texto("✅ Cambios guardados correctamente"))
     else:
         print(centrar_texto("❌ Error al guardar los cambios"))
     pausar()
 
 #Eliminar un paciente
+@accion
 def eliminar_paciente():
     limpiar_pantalla()
     print(centrar_texto("=== ELIMINAR PACIENTE ==="))
@@ -351,6 +454,10 @@ def eliminar_paciente():
         return
 
     paciente = pacientes.get(dni) #guarda temporalmente el paciente a modificar
+
+    from turnos import lineas_resumen_turnos, resumen_turnos_paciente
+
+    resumen = resumen_turnos_paciente(dni)
     
     limpiar_pantalla()
     print(centrar_texto("=== CONFIRMAR ELIMINACIÓN ==="))
@@ -360,34 +467,29 @@ def eliminar_paciente():
     print(centrar_texto(f"Email: {paciente['email']}"))
     print()
 
+    # Con turnos no se puede eliminar: se avisa antes de pedir la confirmación
+    if resumen["futuros"] or resumen["pasados"]:
+        for linea in lineas_resumen_turnos(resumen):
+            print(centrar_texto(linea))
+        print()
+        print(centrar_texto("❌ No se puede eliminar: el paciente tiene turnos"))
+        pausar()
+        return
+
     confirmacion = (
         input(centrar_texto("¿Confirma la eliminación? (s/n): ")).strip().lower()
     )
 
     if confirmacion == "s":
-        # Verificar si tiene turnos asignados
-        from turnos import verificar_turnos_paciente
-
-        if verificar_turnos_paciente(dni):
-            print(
-                centrar_texto(
-                    "❌ No se puede eliminar. El paciente tiene turnos asignados"
-                )
-            )
-            pausar()
-            return
-
-        del pacientes[dni]
-
-        if guardar_pacientes(pacientes): 
-            print(centrar_texto("✅ Paciente eliminado correctamente"))
-        else:
-            print(centrar_texto("❌ Error al eliminar el paciente"))
+        # Verifica que no tenga turnos asignados antes de eliminarlo
+        ok, mensaje = quitar_paciente(dni)
+        print(centrar_texto(f"{'✅' if ok else '❌'} {mensaje}"))
     else:
         print(centrar_texto("Eliminación cancelada"))
     pausar()
 
 #Consulta datos de un paciente
+@accion
 def consultar_paciente():
     limpiar_pantalla()
     print(centrar_texto("=== CONSULTAR PACIENTE ==="))
@@ -424,6 +526,133 @@ def consultar_paciente():
     print(centrar_texto(f"Nombre: {paciente['nombre']} {paciente['apellido']}"))
     print(centrar_texto(f"Teléfono: {paciente['telefono']}"))
     print(centrar_texto(f"Email: {paciente['email']}"))
+    print()
+
+    from turnos import lineas_resumen_turnos, resumen_turnos_paciente
+
+    for linea in lineas_resumen_turnos(resumen_turnos_paciente(dni)):
+        print(centrar_texto(linea))
+    pausar()
+
+#Busca pacientes por el comienzo del nombre o del apellido
+@accion
+def buscar_paciente():
+    limpiar_pantalla()
+    print(centrar_texto("=== BUSCAR PACIENTE ==="))
+    print()
+    print(centrar_texto("Sin distinguir mayúsculas ni acentos"))
+    print(centrar_texto('Por ejemplo "gonz" o "ana lop"'))
+    print()
+
+    texto = input(
+        centrar_texto("Nombre y/o apellido (o su comienzo, 0 para volver): ")
+    ).strip()
+    if texto == "0" or not texto:
+        return
+
+    encontrados = indice_pacientes.buscar_pacientes(texto)
+    if not encontrados:
+        print(centrar_texto("❌ No se encontraron pacientes"))
+        pausar()
+        return
+
+    paginas = (len(encontrados) + TAMANIO_PAGINA - 1) // TAMANIO_PAGINA
+    pagina = 0
+    while True:
+        limpiar_pantalla()
+        print(centrar_texto(f"=== PACIENTES QUE COINCIDEN CON \"{texto}\" ==="))
+        print(
+            centrar_texto(
+                f"{len(encontrados)} encontrados - página {pagina + 1} de {paginas}"
+            )
+        )
+        print()
+        desde = pagina * TAMANIO_PAGINA
+        for dni, paciente in encontrados[desde : desde + TAMANIO_PAGINA]:
+            nombre = f"{paciente['apellido']}, {paciente['nombre']}"
+            print(centrar_texto(f"{dni:>8}  {nombre:<32}  {paciente['telefono']:>15}"))
+        print()
+
+        opcion = (
+            input(
+                centrar_texto("Enter: página siguiente, a: anterior, 0: volver: ")
+            )
+            .strip()
+            .lower()
+        )
+        if opcion == "0":
+            return
+        if opcion == "a":
+            pagina = max(pagina - 1, 0)
+        elif pagina + 1 < paginas:
+            pagina += 1
+        else:
+            return
+
+#Busca pacientes por teléfono (por ejemplo, el de una llamada entrante)
+@accion
+def buscar_paciente_telefono():
+    limpiar_pantalla()
+    print(centrar_texto("=== BUSCAR PACIENTE POR TELÉFONO ==="))
+    print()
+
+    telefono = input(centrar_texto("Teléfono (0 para volver): ")).strip()
+    if telefono == "0" or not telefono:
+        return
+
+    encontrados = indice_pacientes.buscar_por_telefono(telefono)
+    if not encontrados:
+        print(centrar_texto("❌ No hay pacientes con ese teléfono"))
+        pausar()
+        return
+
+    limpiar_pantalla()
+    print(centrar_texto("=== DATOS DEL PACIENTE ==="))
+    for dni, paciente in encontrados:
+        print()
+        print(centrar_texto(f"DNI: {dni}"))
+        print(centrar_texto(f"Nombre: {paciente['nombre']} {paciente['apellido']}"))
+        print(centrar_texto(f"Teléfono: {paciente['telefono']}"))
+        print(centrar_texto(f"Email: {paciente['email']}"))
+    print()
+    pausar()
+
+#Importa pacientes en bloque desde un archivo CSV o JSONL
+@accion
+def importar_pacientes_archivo():
+    limpiar_pantalla()
+    print(centrar_texto("=== IMPORTAR PACIENTES ==="))
+    print()
+    print(centrar_texto("CSV con columnas dni,nombre,apellido,telefono,email"))
+    print(centrar_texto("o JSONL con un objeto por línea con esas claves"))
+    print()
+
+    ruta = input(centrar_texto("Ruta del archivo (0 para volver): ")).strip()
+    if ruta == "0" or not ruta:
+        return
+    if not os.path.exists(ruta):
+        print(centrar_texto("❌ No se encontró el archivo"))
+        pausar()
+        return
+
+    from importacion import importar_pacientes
+
+    try:
+        resumen = importar_pacientes(ruta)
+    except (OSError, ValueError) as e:
+        print(centrar_texto(f"❌ Error al importar: {e}"))
+        pausar()
+        return
+
+    print()
+    print(centrar_texto(f"Registros leídos: {resumen['leidos']}"))
+    print(centrar_texto(f"✅ Pacientes importados: {resumen['aceptados']}"))
+    print(centrar_texto(f"❌ Registros rechazados: {resumen['rechazados']}"))
+    if resumen["rechazados"]:
+        print(centrar_texto(f"Detalle de rechazos en: {resumen['ruta_rechazos']}"))
+    if not resumen["guardado"]:
+        print(centrar_texto("❌ Error al guardar los pacientes importados"))
+    print(centrar_texto(f"Tiempo: {resumen['segundos']:.2f} s"))
     pausar()
 
 #Menu principal 
@@ -438,11 +667,14 @@ def menu_pacientes():
         print(centrar_texto("2. Modificar paciente"))
         print(centrar_texto("3. Eliminar paciente"))
         print(centrar_texto("4. Consultar paciente"))
-        print(centrar_texto("5. Volver al menú principal"))
+        print(centrar_texto("5. Buscar paciente por nombre o apellido"))
+        print(centrar_texto("6. Buscar paciente por teléfono"))
+        print(centrar_texto("7. Importar pacientes desde archivo"))
+        print(centrar_texto("8. Volver al menú principal"))
 
         print(centrar_texto(""))
 
-        opcion = input(centrar_texto("Seleccione una opción (1-5): ")).strip()
+        opcion = input(centrar_texto("Seleccione una opción (1-8): ")).strip()
 
         if opcion == "1":
             alta_paciente()
@@ -453,6 +685,12 @@ def menu_pacientes():
         elif opcion == "4":
             consultar_paciente()
         elif opcion == "5":
+            buscar_paciente()
+        elif opcion == "6":
+            buscar_paciente_telefono()
+        elif opcion == "7":
+            importar_pacientes_archivo()
+        elif opcion == "8":
             break
         else:
             print(centrar_texto("❌ Opción inválida"))
@@ -461,10 +699,15 @@ def menu_pacientes():
 
 # Función para que otros módulos verifiquen si existe un paciente
 
+@operacion("pacientes.obtener")
 def obtener_paciente(dni):
-    """Obtiene los datos de un paciente por DNI"""
-    pacientes = cargar_pacientes()
-    return pacientes.get(dni, None)
+    """Obtiene los datos de un paciente por DNI (no deben modificarse)"""
+    if usa_sqlite():
+        import almacen_sqlite
+
+        return almacen_sqlite.obtener_paciente(dni)
+    # Los pacientes en memoria se vuelven a leer solo si el archivo cambió
+    return indice_pacientes.obtener_pacientes().get(dni)
 
 
 if __name__ == "__main__":
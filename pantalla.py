@@ -0,0 +1,87 @@
+"""
+PANTALLA
+
+Funciones de pantalla compartidas por todos los menús:
+
+- limpiar_pantalla() borra con secuencias de escape en lugar de lanzar un
+  proceso "clear"/"cls" por cada pantalla.
+- centrar_texto() usa el ancho de la terminal guardado; se vuelve a medir
+  solo cuando la ventana cambia de tamaño (señal SIGWINCH) o, donde esa
+  señal no existe, cada SEGUNDOS_ANCHO segundos.
+- iniciar() deja la salida estándar con búfer completo: cada pantalla se
+  arma en memoria y se escribe de una vez cuando input() pide la próxima
+  opción (input() vacía la salida antes de leer).
+"""
+
+import os
+import shutil
+import signal
+import sys
+import time
+
+ANCHO_POR_DEFECTO = 80
+SEGUNDOS_ANCHO = 1.0
+
+# Cursor al inicio, borrar pantalla y borrar el historial de desplazamiento
+BORRAR = "\033[H\033[2J\033[3J"
+
+_estado = {"ancho": None, "medido": 0.0, "senal": False, "vt": os.name != "nt"}
+
+
+def _invalidar_ancho(*_):
+    _estado["ancho"] = None
+
+
+def _escuchar_cambios_de_tamanio():
+    """Instala el aviso de cambio de tamaño (solo en POSIX y en el hilo principal)"""
+    if hasattr(signal, "SIGWINCH"):
+        try:
+            signal.signal(signal.SIGWINCH, _invalidar_ancho)
+            _estado["senal"] = True
+        except ValueError:
+            pass
+
+
+def ancho_terminal():
+    """Ancho de la terminal en columnas, medido solo cuando hace falta"""
+    ahora = time.monotonic()
+    if _estado["ancho"] is None or (
+        not _estado["senal"] and ahora - _estado["medido"] > SEGUNDOS_ANCHO
+    ):
+        try:
+            _estado["ancho"] = shutil.get_terminal_size().columns
+        except (OSError, ValueError):
+            _estado["ancho"] = ANCHO_POR_DEFECTO
+        _estado["medido"] = ahora
+    return _estado["ancho"]
+
+
+def iniciar():
+    """Prepara la terminal para los menús: búfer por pantalla y aviso de tamaño"""
+    _escuchar_cambios_de_tamanio()
+    try:
+        sys.stdout.reconfigure(line_buffering=False)
+    except (AttributeError, ValueError):
+        pass
+
+
+def limpiar_pantalla():
+    """Limpia la pantalla de la consola"""
+    if not _estado["vt"]:
+        # En Windows una llamada vacía habilita las secuencias de escape
+        os.system("")
+        _estado["vt"] = True
+    sys.stdout.write(BORRAR)
+
+
+def centrar_texto(texto):
+    """Centra el texto en la pantalla"""
+    ancho = ancho_terminal()
+    if len(texto) >= ancho:
+        return texto
+    return " " * ((ancho - len(texto)) // 2) + texto
+
+
+def pausar():
+    """Pausa la ejecución hasta que el usuario presione Enter"""
+    input(centrar_texto("Presione Enter para continuar..."))
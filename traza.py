@@ -0,0 +1,213 @@
+"""
+TRAZA DE OPERACIONES
+
+Instrumentación opcional para ver en qué se va el tiempo. Se activa con el
+ajuste traza = "si" (o TURNOS_TRAZA=si) y, mientras está activa, cada
+operación instrumentada agrega una línea JSON a data/traza.jsonl con:
+
+- la acción de menú (o comando) que la originó
+- el tiempo de reloj en milisegundos
+- los bytes leídos y escritos y la cantidad de archivos cargados completos
+
+Las operaciones se marcan con el decorador @operacion("nombre") y las
+pantallas de los menús con @accion. Las lecturas y escrituras de archivos
+avisan con contar(), que suma a todas las operaciones en curso: una
+operación que llama a otra incluye también lo que hizo la interna.
+
+El archivo rota al llegar a TAMANIO_MAXIMO (traza.jsonl.1, .2, ...) y
+resumen() junta todos en cantidades, totales y p50/p95/p99 por operación.
+
+El ajuste se consulta una vez al empezar cada acción (o cada operación que
+no está dentro de una acción), no en cada operación instrumentada: un
+cambio del ajuste vale desde la próxima acción. Desactivada, una operación
+solo mira el valor ya decidido.
+"""
+
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from ajustes import usa_traza
+
+RUTA_TRAZA = os.path.join("data", "traza.jsonl")
+TAMANIO_MAXIMO = 1_000_000
+COPIAS = 3
+
+# activa es None fuera de una acción u operación: el ajuste todavía no se leyó
+_estado = {"accion": "", "en_curso": [], "activa": None}
+
+
+def contar(leidos=0, escritos=0, cargas=0):
+    """Suma bytes y cargas completas de archivos a las operaciones en curso"""
+    for medicion in _estado["en_curso"]:
+        medicion["leidos"] += leidos
+        medicion["escritos"] += escritos
+        medicion["cargas"] += cargas
+
+
+@contextmanager
+def en_accion(nombre):
+    """Marca con el nombre de la acción todo lo que se haga dentro del bloque"""
+    anterior = _estado["accion"], _estado["activa"]
+    _estado["accion"] = nombre
+    _estado["activa"] = usa_traza()
+    try:
+        yield
+    finally:
+        _estado["accion"], _estado["activa"] = anterior
+
+
+def accion(funcion):
+    """Decorador para las pantallas: la acción es modulo.funcion"""
+    nombre = f"{funcion.__module__}.{funcion.__name__}"
+
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with en_accion(nombre):
+            return funcion(*args, **kwargs)
+
+    return envoltura
+
+
+@contextmanager
+def medicion(nombre, **detalle):
+    """Mide el bloque y lo registra en la traza si está activa"""
+    # Fuera de una acción el ajuste se lee aquí y vale para las internas
+    decidida = _estado["activa"] is not None
+    if not decidida:
+        _estado["activa"] = usa_traza()
+    try:
+        if not _estado["activa"]:
+            yield
+            return
+        registro = {"operacion": nombre, "leidos": 0, "escritos": 0, "cargas": 0}
+        _estado["en_curso"].append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            milisegundos = (time.perf_counter() - inicio) * 1000
+            _estado["en_curso"].remove(registro)
+            _escribir(
+                {
+                    "fecha": datetime.now().isoformat(timespec="milliseconds"),
+                    "accion": _estado["accion"],
+                    **registro,
+                    "ms": round(milisegundos, 3),
+                    **detalle,
+                }
+            )
+    finally:
+        if not decidida:
+            _estado["activa"] = None
+
+
+def operacion(nombre):
+    """Decorador que mide cada llamada a la función como la operación dada"""
+
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _estado["activa"] is False:
+                # Traza desactivada en la acción en curso: sin medición
+                return funcion(*args, **kwargs)
+            with medicion(nombre):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def _rotar():
+    for numero in range(COPIAS - 1, 0, -1):
+        origen = f"{RUTA_TRAZA}.{numero}"
+        if os.path.exists(origen):
+            os.replace(origen, f"{RUTA_TRAZA}.{numero + 1}")
+    os.replace(RUTA_TRAZA, f"{RUTA_TRAZA}.1")
+
+
+def _escribir(registro):
+    # La traza nunca debe interrumpir la operación que se está midiendo
+    try:
+        if (
+            os.path.exists(RUTA_TRAZA)
+            and os.path.getsize(RUTA_TRAZA) >= TAMANIO_MAXIMO
+        ):
+            _rotar()
+        os.makedirs(os.path.dirname(RUTA_TRAZA), exist_ok=True)
+        with open(RUTA_TRAZA, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+#### RESUMEN ####
+
+
+def leer_traza():
+    """Genera los registros de la traza, de los archivos rotados al actual"""
+    rutas = [f"{RUTA_TRAZA}.{n}" for n in range(COPIAS, 0, -1)] + [RUTA_TRAZA]
+    for ruta in rutas:
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    continue
+
+
+def _percentiles(tiempos):
+    if len(tiempos) == 1:
+        return tiempos[0], tiempos[0], tiempos[0]
+    cuantiles = statistics.quantiles(tiempos, n=100, method="inclusive")
+    return cuantiles[49], cuantiles[94], cuantiles[98]
+
+
+def resumen(por_accion=False):
+    """Cantidad, totales y p50/p95/p99 (ms) por operación
+
+    Con por_accion se agrupa además por la acción que originó cada una.
+    Devuelve una lista ordenada por tiempo total, de mayor a menor.
+    """
+    grupos = {}
+    for registro in leer_traza():
+        clave = (
+            (registro.get("accion", ""), registro.get("operacion", ""))
+            if por_accion
+            else ("", registro.get("operacion", ""))
+        )
+        grupo = grupos.setdefault(
+            clave, {"tiempos": [], "leidos": 0, "escritos": 0, "cargas": 0}
+        )
+        grupo["tiempos"].append(registro.get("ms", 0))
+        grupo["leidos"] += registro.get("leidos", 0)
+        grupo["escritos"] += registro.get("escritos", 0)
+        grupo["cargas"] += registro.get("cargas", 0)
+
+    filas = []
+    for (nombre_accion, nombre_operacion), grupo in grupos.items():
+        p50, p95, p99 = _percentiles(grupo["tiempos"])
+        fila = {"accion": nombre_accion} if por_accion else {}
+        fila.update(
+            {
+                "operacion": nombre_operacion,
+                "cantidad": len(grupo["tiempos"]),
+                "total_ms": round(sum(grupo["tiempos"]), 3),
+                "p50_ms": round(p50, 3),
+                "p95_ms": round(p95, 3),
+                "p99_ms": round(p99, 3),
+                "leidos": grupo["leidos"],
+                "escritos": grupo["escritos"],
+                "cargas": grupo["cargas"],
+            }
+        )
+        filas.append(fila)
+    filas.sort(key=lambda fila: fila["total_ms"], reverse=True)
+    return filas
@@ -6,57 +6,33 @@ Este módulo se encarga de:
 - Asignar turnos a pacientes
 - Cancelar turnos existentes
 - Buscar turnos por paciente
+- Buscar los próximos turnos libres
+- Importar reservas en bloque desde un archivo
 - Validar fechas y disponibilidad
 """
 
-import json
 import os
-import shutil
 from datetime import datetime
 
-
-def limpiar_pantalla():
-    """Limpia la pantalla de la consola"""
-    os.system("cls" if os.name == "nt" else "clear")
-
-
-def centrar_texto(texto):
-    """Centra el texto en la pantalla"""
-    try:
-        ancho_terminal = shutil.get_terminal_size().columns
-    except:
-        ancho_terminal = 80
-
-    if len(texto) >= ancho_terminal:
-        return texto
-
-    espacios = (ancho_terminal - len(texto)) // 2
-    return " " * espacios + texto
-
-
-def pausar():
-    """Pausa la ejecución hasta que el usuario presione Enter"""
-    input(centrar_texto("Presione Enter para continuar..."))
+from almacen_turnos import OCUPADO, OK, obtener_almacen
+from indice_pacientes import nombre_paciente
+from pantalla import centrar_texto, limpiar_pantalla, pausar
+from traza import accion
 
 
 def cargar_turnos():
-    """Carga los datos de turnos desde el archivo JSON"""
+    """Carga los datos de turnos desde el almacén compartido"""
     try:
-        if os.path.exists("data/turnos.json"):
-            with open("data/turnos.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
+        return {k: dict(v) for k, v in obtener_almacen().todos().items()}
     except Exception as e:
         print(centrar_texto(f"Error al cargar turnos: {e}"))
         return {}
 
 
 def guardar_turnos(turnos):
-    """Guarda los datos de turnos en el archivo JSON"""
+    """Guarda los datos de turnos a través del almacén compartido"""
     try:
-        os.makedirs("data", exist_ok=True)
-        with open("data/turnos.json", "w", encoding="utf-8") as f:
-            json.dump(turnos, f, ensure_ascii=False, indent=2)
+        obtener_almacen().reemplazar(turnos)
         return True
     except Exception as e:
         print(centrar_texto(f"Error al guardar turnos: {e}"))
@@ -77,36 +53,115 @@ def validar_fecha(dia, mes, anio):
 
 def obtener_turnos_disponibles(fecha_str):
     """Obtiene los turnos disponibles para una fecha específica"""
-    turnos = cargar_turnos()
-    turnos_disponibles = []
-
-    for id_turno, turno in turnos.items():
-        if turno.get("fecha") == fecha_str and turno.get("dni_paciente") == "":
-            turnos_disponibles.append((id_turno, turno))
-
-    return sorted(turnos_disponibles, key=lambda x: x[1].get("horario", ""))
+    return obtener_almacen().disponibles(fecha_str)
 
 
 def obtener_turnos_paciente(dni):
     """Obtiene todos los turnos de un paciente específico"""
-    turnos = cargar_turnos()
-    turnos_paciente = []
+    return obtener_almacen().de_paciente(dni)
+
+
+def verificar_turnos_paciente(dni):
+    """Verifica si un paciente tiene turnos asignados"""
+    return obtener_almacen().tiene_turnos(dni)
 
-    for id_turno, turno in turnos.items():
-        if turno.get("dni_paciente") == dni:
-            turnos_paciente.append((id_turno, turno))
 
-    return sorted(
-        turnos_paciente, key=lambda x: (x[1].get("fecha", ""), x[1].get("horario", ""))
+def resumen_turnos_paciente(dni):
+    """Turnos futuros y pasados, próximo, último y cancelaciones del paciente
+
+    Sale del resumen que mantiene el almacén, sin recorrer los turnos.
+    """
+    return obtener_almacen().resumen_paciente(dni)
+
+
+def lineas_resumen_turnos(resumen):
+    """Líneas para mostrar el resumen de turnos de un paciente"""
+    proximo, ultimo = (
+        f"{turno['fecha']} {turno['horario']}" if turno else "-"
+        for turno in (resumen["proximo"], resumen["ultimo"])
     )
+    return [
+        f"Turnos próximos: {resumen['futuros']} - Anteriores: {resumen['pasados']}",
+        f"Próximo turno: {proximo}",
+        f"Último turno: {ultimo}",
+        f"Cancelaciones: {resumen['cancelaciones']}",
+    ]
 
 
-def verificar_turnos_paciente(dni):
-    """Verifica si un paciente tiene turnos asignados"""
-    turnos_paciente = obtener_turnos_paciente(dni)
-    return len(turnos_paciente) > 0
+def reservar_turno(dni, fecha_str, horario):
+    """Asigna sin interacción el turno de una fecha y horario
+
+    Devuelve (ok, mensaje, id_turno).
+    """
+    from pacientes import obtener_paciente
+
+    paciente = obtener_paciente(dni)
+    if not paciente:
+        return False, "No existe un paciente con ese DNI", None
+
+    almacen = obtener_almacen()
+    encontrado = almacen.buscar(fecha_str, horario)
+    if encontrado is None:
+        return False, "No existe un turno en esa fecha y horario", None
+    id_turno, turno = encontrado
+    if turno.get("dni_paciente"):
+        return False, "El turno ya está asignado", id_turno
+
+    resultado = almacen.asignar(id_turno, dni, version=turno.get("version", 0))
+    if resultado == OK:
+        return True, "Turno asignado correctamente", id_turno
+    if resultado == OCUPADO:
+        return False, "El turno ya fue tomado desde otra terminal", id_turno
+    return False, "El turno ya no existe", id_turno
+
+
+def anular_turno(dni, fecha_str, horario):
+    """Cancela sin interacción el turno del paciente en esa fecha y horario
+
+    Devuelve (ok, mensaje, id_turno).
+    """
+    almacen = obtener_almacen()
+    encontrado = almacen.buscar(fecha_str, horario)
+    if encontrado is None or encontrado[1].get("dni_paciente") != dni:
+        return False, "El paciente no tiene un turno en esa fecha y horario", None
+    id_turno, turno = encontrado
+
+    resultado = almacen.liberar(id_turno, version=turno.get("version", 0))
+    if resultado == OK:
+        return True, "Turno cancelado correctamente", id_turno
+    if resultado == OCUPADO:
+        return False, "El turno fue modificado desde otra terminal", id_turno
+    return False, "El turno ya no existe", id_turno
+
+
+def obtener_proximos_libres(
+    fecha_str=None,
+    horario="00:00",
+    cantidad=10,
+    dias_semana=None,
+    desde_hora=None,
+    hasta_hora=None,
+    max_dias=None,
+):
+    """Obtiene los primeros turnos libres desde una fecha y hora (por defecto, ahora)"""
+    ahora = datetime.now()
+    if fecha_str is None:
+        fecha_str = ahora.strftime("%d/%m/%Y")
+    # Si la búsqueda empieza hoy, los horarios que ya pasaron no se ofrecen
+    if datetime.strptime(fecha_str, "%d/%m/%Y").date() == ahora.date():
+        horario = max(horario, ahora.strftime("%H:%M"))
+    return obtener_almacen().proximos_libres(
+        fecha_str,
+        horario,
+        cantidad,
+        dias_semana=dias_semana,
+        desde_hora=desde_hora,
+        hasta_hora=hasta_hora,
+        max_dias=max_dias,
+    )
 
 
+@accion
 def asignar_turno():
     """Asigna un nuevo turno a un paciente"""
     limpiar_pantalla()
@@ -193,33 +248,42 @@ def asignar_turno():
         pausar()
         return
 
-    # Confirmar turno
+    confirmar_asignacion(dni, paciente, id_turno_seleccionado, turno_seleccionado)
+
+
+def confirmar_asignacion(dni, paciente, id_turno_seleccionado, turno_seleccionado):
+    """Pide confirmación y asigna el turno elegido al paciente"""
     limpiar_pantalla()
     print(centrar_texto("=== CONFIRMAR TURNO ==="))
     print(centrar_texto(f"Paciente: {paciente['nombre']} {paciente['apellido']}"))
     print(centrar_texto(f"DNI: {dni}"))
-    print(centrar_texto(f"Fecha: {fecha_str}"))
+    print(centrar_texto(f"Fecha: {turno_seleccionado.get('fecha', 'N/A')}"))
     print(centrar_texto(f"Horario: {turno_seleccionado.get('horario', 'N/A')}"))
     print()
 
     confirmacion = input(centrar_texto("¿Confirma el turno? (s/n): ")).strip().lower()
 
     if confirmacion == "s":
-        turnos = cargar_turnos()
-        turnos[id_turno_seleccionado]["dni_paciente"] = dni
-        turnos[id_turno_seleccionado][
-            "paciente_nombre"
-        ] = f"{paciente['nombre']} {paciente['apellido']}"
-
-        if guardar_turnos(turnos):
-            print(centrar_texto("✅ Turno asignado correctamente"))
-        else:
-            print(centrar_texto("❌ Error al guardar el turno"))
+        try:
+            resultado = obtener_almacen().asignar(
+                id_turno_seleccionado,
+                dni,
+                version=turno_seleccionado.get("version", 0),
+            )
+            if resultado == OK:
+                print(centrar_texto("✅ Turno asignado correctamente"))
+            elif resultado == OCUPADO:
+                print(centrar_texto("❌ El turno ya fue tomado desde otra terminal"))
+            else:
+                print(centrar_texto("❌ El turno ya no existe"))
+        except Exception as e:
+            print(centrar_texto(f"❌ Error al guardar el turno: {e}"))
     else:
         print(centrar_texto("Turno cancelado"))
     pausar()
 
 
+@accion
 def cancelar_turno():
     """Cancela un turno existente"""
     limpiar_pantalla()
@@ -240,11 +304,8 @@ def cancelar_turno():
 
     limpiar_pantalla()
     print(centrar_texto("=== TURNOS DEL PACIENTE ==="))
-    print(
-        centrar_texto(
-            f"Paciente: {turnos_paciente[0][1].get('paciente_nombre', 'N/A')}"
-        )
-    )
+    nombre = nombre_paciente(dni)
+    print(centrar_texto(f"Paciente: {nombre}"))
     print()
 
     for i, (id_turno, turno) in enumerate(turnos_paciente, 1):
@@ -278,9 +339,7 @@ def cancelar_turno():
     # Confirmar cancelación
     limpiar_pantalla()
     print(centrar_texto("=== CONFIRMAR CANCELACIÓN ==="))
-    print(
-        centrar_texto(f"Paciente: {turno_seleccionado.get('paciente_nombre', 'N/A')}")
-    )
+    print(centrar_texto(f"Paciente: {nombre}"))
     print(centrar_texto(f"Fecha: {turno_seleccionado.get('fecha', 'N/A')}"))
     print(centrar_texto(f"Horario: {turno_seleccionado.get('horario', 'N/A')}"))
     print()
@@ -290,20 +349,25 @@ def cancelar_turno():
     )
 
     if confirmacion == "s":
-        turnos = cargar_turnos()
         # Limpiar el turno (vuelve a estar disponible)
-        turnos[id_turno_seleccionado]["dni_paciente"] = ""
-        turnos[id_turno_seleccionado]["paciente_nombre"] = ""
-
-        if guardar_turnos(turnos):
-            print(centrar_texto("✅ Turno cancelado correctamente"))
-        else:
-            print(centrar_texto("❌ Error al cancelar el turno"))
+        try:
+            resultado = obtener_almacen().liberar(
+                id_turno_seleccionado, version=turno_seleccionado.get("version", 0)
+            )
+            if resultado == OK:
+                print(centrar_texto("✅ Turno cancelado correctamente"))
+            elif resultado == OCUPADO:
+                print(centrar_texto("❌ El turno fue modificado desde otra terminal"))
+            else:
+                print(centrar_texto("❌ El turno ya no existe"))
+        except Exception as e:
+            print(centrar_texto(f"❌ Error al cancelar el turno: {e}"))
     else:
         print(centrar_texto("Cancelación cancelada"))
     pausar()
 
 
+@accion
 def buscar_turnos_paciente():
     """Busca y muestra todos los turnos de un paciente"""
     limpiar_pantalla()
@@ -314,16 +378,20 @@ def buscar_turnos_paciente():
     if dni == "0":
         return
 
-    turnos_paciente = obtener_turnos_paciente(dni)
+    resumen = resumen_turnos_paciente(dni)
 
     limpiar_pantalla()
     print(centrar_texto(f"=== TURNOS DEL PACIENTE DNI {dni} ==="))
     print()
 
-    if not turnos_paciente:
+    if not resumen["futuros"] and not resumen["pasados"]:
         print(centrar_texto("❌ No hay turnos asignados a este paciente"))
     else:
-        for i, (id_turno, turno) in enumerate(turnos_paciente, 1):
+        for linea in lineas_resumen_turnos(resumen):
+            print(centrar_texto(linea))
+        print()
+        # El detalle sí necesita leer los meses del paciente
+        for i, (id_turno, turno) in enumerate(obtener_turnos_paciente(dni), 1):
             print(
                 centrar_texto(
                     f"{i}. {turno.get('fecha', 'N/A')} - {turno.get('horario', 'N/A')}"
@@ -334,6 +402,190 @@ def buscar_turnos_paciente():
     pausar()
 
 
+@accion
+def buscar_proximos_libres():
+    """Busca los próximos turnos libres con filtros opcionales y permite asignar uno"""
+    limpiar_pantalla()
+    print(centrar_texto("=== PRÓXIMOS TURNOS LIBRES ==="))
+    print()
+
+    dni = input(centrar_texto("Ingrese DNI del paciente (0 para volver): ")).strip()
+    if dni == "0":
+        return
+
+    from pacientes import obtener_paciente
+
+    paciente = obtener_paciente(dni)
+
+    if not paciente:
+        print(centrar_texto("❌ No existe un paciente con ese DNI"))
+        pausar()
+        return
+
+    print(centrar_texto(f"Paciente: {paciente['nombre']} {paciente['apellido']}"))
+    print()
+    print(centrar_texto("Filtros opcionales (Enter para omitir)"))
+
+    fecha_str = input(centrar_texto("Desde la fecha (dd/mm/aaaa): ")).strip() or None
+    desde_hora = input(centrar_texto("Desde la hora (HH:MM): ")).strip() or None
+    hasta_hora = input(centrar_texto("Hasta la hora (HH:MM): ")).strip() or None
+    dia_input = input(centrar_texto("Día de la semana (1=Lun ... 5=Vie): ")).strip()
+    dias_input = input(centrar_texto("Buscar hasta cuántos días adelante: ")).strip()
+
+    try:
+        if fecha_str is not None:
+            fecha = datetime.strptime(fecha_str, "%d/%m/%Y")
+            valida, mensaje = validar_fecha(fecha.day, fecha.month, fecha.year)
+            if not valida:
+                print(centrar_texto(f"❌ {mensaje}"))
+                pausar()
+                return
+            fecha_str = fecha.strftime("%d/%m/%Y")
+        # "9:00" pasa a "09:00": los horarios se comparan como texto
+        desde_hora, hasta_hora = (
+            datetime.strptime(hora, "%H:%M").strftime("%H:%M") if hora else None
+            for hora in (desde_hora, hasta_hora)
+        )
+        dias_semana = {int(dia_input) - 1} if dia_input else None
+        max_dias = int(dias_input) if dias_input else None
+    except ValueError:
+        print(centrar_texto("❌ Error en los filtros ingresados"))
+        pausar()
+        return
+
+    turnos_libres = obtener_proximos_libres(
+        fecha_str,
+        dias_semana=dias_semana,
+        desde_hora=desde_hora,
+        hasta_hora=hasta_hora,
+        max_dias=max_dias,
+    )
+
+    if not turnos_libres:
+        print(centrar_texto("❌ No hay turnos libres con esos filtros"))
+        pausar()
+        return
+
+    limpiar_pantalla()
+    print(centrar_texto("=== PRÓXIMOS TURNOS LIBRES ==="))
+    print()
+    for i, (id_turno, turno) in enumerate(turnos_libres, 1):
+        print(
+            centrar_texto(
+                f"{i}. {turno.get('fecha', 'N/A')} {turno.get('horario', 'N/A')}"
+            )
+        )
+    print()
+
+    try:
+        opcion = input(
+            centrar_texto(
+                f"Seleccione turno (1-{len(turnos_libres)}) o 0 para volver: "
+            )
+        ).strip()
+        if opcion == "0":
+            return
+        opcion = int(opcion)
+        if 1 <= opcion <= len(turnos_libres):
+            id_turno_seleccionado, turno_seleccionado = turnos_libres[opcion - 1]
+        else:
+            print(centrar_texto("❌ Opción inválida"))
+            pausar()
+            return
+    except ValueError:
+        print(centrar_texto("❌ Ingrese un número válido"))
+        pausar()
+        return
+
+    confirmar_asignacion(dni, paciente, id_turno_seleccionado, turno_seleccionado)
+
+
+@accion
+def importar_reservas_archivo():
+    """Asigna en bloque los turnos de un archivo CSV o JSONL"""
+    limpiar_pantalla()
+    print(centrar_texto("=== IMPORTAR RESERVAS ==="))
+    print()
+    print(centrar_texto("CSV con columnas dni,fecha,horario"))
+    print(centrar_texto("o JSONL con un objeto por línea con esas claves"))
+    print()
+
+    ruta = input(centrar_texto("Ruta del archivo (0 para volver): ")).strip()
+    if ruta == "0" or not ruta:
+        return
+    if not os.path.exists(ruta):
+        print(centrar_texto("❌ No se encontró el archivo"))
+        pausar()
+        return
+
+    from importacion import importar_reservas
+
+    try:
+        resumen = importar_reservas(ruta)
+    except Exception as e:
+        print(centrar_texto(f"❌ Error al importar: {e}"))
+        pausar()
+        return
+
+    print()
+    print(centrar_texto(f"Registros leídos: {resumen['leidos']}"))
+    for resultado, cantidad in sorted(resumen["resultados"].items()):
+        print(centrar_texto(f"{resultado.capitalize()}: {cantidad}"))
+    print(centrar_texto(f"Detalle por registro en: {resumen['ruta_resultado']}"))
+    print(centrar_texto(f"Tiempo: {resumen['segundos']:.2f} s"))
+    pausar()
+
+
+@accion
+def ver_disponibilidad_mes():
+    """Muestra un calendario del mes con la cantidad de turnos libres por día"""
+    limpiar_pantalla()
+    print(centrar_texto("=== DISPONIBILIDAD DEL MES ==="))
+    print()
+
+    try:
+        mes_input = input(centrar_texto("Mes (1-12) o 0 para volver: ")).strip()
+        if mes_input == "0":
+            return
+        mes = int(mes_input)
+
+        anio_input = input(centrar_texto("Año o 0 para volver: ")).strip()
+        if anio_input == "0":
+            return
+        anio = int(anio_input)
+
+        if mes < 1 or mes > 12:
+            print(centrar_texto("❌ Mes inválido"))
+            pausar()
+            return
+    except ValueError:
+        print(centrar_texto("❌ Ingrese números válidos"))
+        pausar()
+        return
+
+    grilla = obtener_almacen().grilla_mes(mes, anio)
+
+    if grilla is None:
+        print(centrar_texto(f"❌ No hay turnos generados para {mes:02d}/{anio}"))
+        pausar()
+        return
+
+    limpiar_pantalla()
+    print(centrar_texto(f"=== DISPONIBILIDAD {mes:02d}/{anio} (día:libres) ==="))
+    print()
+    for linea in grilla.calendario():
+        print(centrar_texto(linea))
+    print()
+    print(
+        centrar_texto(
+            f"Turnos libres: {grilla.total_libres()} de {grilla.total_existentes()}"
+        )
+    )
+    print(centrar_texto(f"Días con lugar: {len(grilla.dias_con_lugar())}"))
+    print()
+    pausar()
+
+
 def menu_turnos():
     """Menú principal del módulo de turnos"""
     while True:
@@ -345,10 +597,13 @@ def menu_turnos():
         print(centrar_texto("1. Asignar turno"))
         print(centrar_texto("2. Cancelar turno"))
         print(centrar_texto("3. Buscar turnos por paciente"))
-        print(centrar_texto("4. Volver al menú principal"))
+        print(centrar_texto("4. Ver disponibilidad del mes"))
+        print(centrar_texto("5. Buscar próximos turnos libres"))
+        print(centrar_texto("6. Importar reservas desde archivo"))
+        print(centrar_texto("7. Volver al menú principal"))
         print(centrar_texto(""))
 
-        opcion = input(centrar_texto("Seleccione una opción (1-4): ")).strip()
+        opcion = input(centrar_texto("Seleccione una opción (1-7): ")).strip()
 
         if opcion == "1":
             asignar_turno()
@@ -357,6 +612,12 @@ def menu_turnos():
         elif opcion == "3":
             buscar_turnos_paciente()
         elif opcion == "4":
+            ver_disponibilidad_mes()
+        elif opcion == "5":
+            buscar_proximos_libres()
+        elif opcion == "6":
+            importar_reservas_archivo()
+        elif opcion == "7":
             break
         else:
             print(centrar_texto("❌ Opción inválida"))